@@ -1,17 +1,14 @@
 import streamlit as st
 import os
-import tempfile
-import time
+import random
 from datetime import datetime
-import base64
-import io
 
 # Import our custom modules
-from enhanced_story_generator import EnhancedStoryGenerator
-from corrected_image_generator import CorrectedImageGenerator
-from professional_pdf_generator import ProfessionalPDFGenerator
+from storybook_pipeline import StorybookPipeline
+from artifact_store import get_artifact_store
 from audio_generator import AudioGenerator
-from config import STORY_PAGES
+from image_encoding import image_data_uri, image_data_uri_async
+from config import STORY_PAGES, AUDIO_PROFILES, DEFAULT_AUDIO_PROFILE, PDF_PROFILES, DEFAULT_PDF_PROFILE, PDF_THUMBNAIL_WIDTH
 
 # Page configuration
 st.set_page_config(
@@ -95,10 +92,16 @@ def main():
         st.session_state.story_pages = []
     if 'images' not in st.session_state:
         st.session_state.images = []
+    if 'image_previews' not in st.session_state:
+        st.session_state.image_previews = []
     if 'pdf_path' not in st.session_state:
         st.session_state.pdf_path = None
     if 'audio_path' not in st.session_state:
         st.session_state.audio_path = None
+    if 'audio_transcode' not in st.session_state:
+        st.session_state.audio_transcode = None
+    if 'book_metadata' not in st.session_state:
+        st.session_state.book_metadata = {}
     
     # Header
     st.markdown("""
@@ -146,6 +149,14 @@ def main():
         st.markdown("2. Click 'Generate Story'")
         st.markdown("3. Download your PDF")
         st.markdown("4. Listen to audio narration")
+        
+        # Disk usage of generated books
+        usage = get_artifact_store().usage()
+        with st.expander("🗄️ Storage"):
+            st.metric("Disk used", f"{usage['used_bytes'] / (1024 * 1024):.1f} MB",
+                      f"{usage['used_fraction']:.0%} of quota", delta_color="off")
+            st.metric("Stored artifacts", usage['artifacts'])
+            st.caption(f"Evicted: {usage['evicted']} · Expired: {usage['expired']} · Orphans swept: {usage['orphans_swept']}")
     
     # Main content area
     col1, col2 = st.columns([2, 1])
@@ -160,10 +171,39 @@ def main():
             help="Be as descriptive as you want! The AI will create a 5-page children's story based on your prompt."
         )
         
+        # Audio output profile
+        profile_names = list(AUDIO_PROFILES)
+        audio_profile = st.selectbox(
+            "🎧 Audio format",
+            profile_names,
+            index=profile_names.index(DEFAULT_AUDIO_PROFILE),
+            format_func=lambda name: AUDIO_PROFILES[name]['label'],
+            help="Mobile uses a compact Opus file that saves bandwidth on slow or shared networks."
+        )
+        
+        # PDF output profile
+        pdf_profile_names = list(PDF_PROFILES)
+        pdf_profile = st.selectbox(
+            "📄 PDF quality",
+            pdf_profile_names,
+            index=pdf_profile_names.index(DEFAULT_PDF_PROFILE),
+            format_func=lambda name: PDF_PROFILES[name]['label'],
+            help="Screen keeps downloads small, Print upsamples illustrations to 300 DPI, Archive keeps every image lossless."
+        )
+        
+        with st.expander("⚙️ Advanced"):
+            story_seed = st.number_input(
+                "Story seed",
+                min_value=0,
+                value=0,
+                step=1,
+                help="Reuse a seed with the same prompt to get the same book back instantly. 0 picks a new one."
+            )
+        
         # Generate button
         if st.button("🚀 Generate Story", type="primary", use_container_width=True):
             if story_prompt.strip():
-                generate_story(story_prompt)
+                generate_story(story_prompt, audio_profile, int(story_seed) or None, pdf_profile)
             else:
                 st.error("Please enter a story prompt!")
     
@@ -180,6 +220,7 @@ def main():
             st.markdown("### 📊 Story Stats")
             st.metric("Pages", STORY_PAGES)
             st.metric("Characters", len(''.join(story_prompt.split())))
+            st.metric("Seed", st.session_state.book_metadata.get('seed', '—'))
             st.metric("Status", "✅ Complete")
     
     # Display generated story
@@ -195,97 +236,151 @@ def main():
     </div>
     """, unsafe_allow_html=True)
 
-def generate_story(prompt):
+def generate_story(prompt, audio_profile=DEFAULT_AUDIO_PROFILE, seed=None, pdf_profile=DEFAULT_PDF_PROFILE):
     """Generate the complete story with progress indicators"""
     with st.spinner("🤖 AI is crafting your magical story..."):
-        # Initialize generators
-        story_gen = EnhancedStoryGenerator()
-        image_gen = CorrectedImageGenerator()
-        pdf_gen = ProfessionalPDFGenerator()
-        audio_gen = AudioGenerator()
+        # One managed artifact directory per book, subject to the disk quota
+        artifact_store = get_artifact_store()
+        temp_dir = artifact_store.create_dir('book')
+        
+        # Stages reuse cached outputs whenever their inputs match an earlier run
+        pipeline = StorybookPipeline(temp_dir)
+        if seed is None:
+            seed = random.randrange(1, 2**31)
         
-        # Step 1: Generate story text
+        # Step 1: Generate story text, character description and title
         progress_bar = st.progress(0)
         status_text = st.empty()
         
-        status_text.text("📝 Generating story text...")
-        story_pages = story_gen.generate_story(prompt)
-        progress_bar.progress(20)
+        status_text.text("📝 Generating story text, characters and title...")
+        story = pipeline.generate_story_text(prompt, seed)
+        progress_bar.progress(40)
         
-        if not story_pages:
+        if not story:
+            artifact_store.release(temp_dir)
             st.error("Failed to generate story text. Please try again.")
             return
         
-        # Step 2: Generate character description and title
-        status_text.text("🎭 Creating character descriptions and title...")
-        character_desc = story_gen.generate_character_description(' '.join(story_pages), prompt)
-        story_title = story_gen.generate_story_title(story_pages, prompt)
-        progress_bar.progress(40)
+        story_pages = story['pages']
+        character_desc = story['character_description']
+        story_title = story['title']
         
-        # Step 3: Generate images
+        # Step 2: Generate images
         status_text.text("🎨 Creating beautiful illustrations...")
         images = []
         image_paths = []
-        
-        temp_dir = tempfile.mkdtemp()
+        vector_paths = []
         
         for i, page_text in enumerate(story_pages):
             # Pass story context for better image generation
-            story_context = f"Story: {prompt[:100]}... Character: {character_desc[:100]}..."
-            img = image_gen.generate_page_image(page_text, character_desc, i + 1, story_context)
+            story_context = pipeline.story_context(prompt, character_desc)
+            # Procedural styles also record the page as shapes, drawn sharp in the PDF
+            vector_path = pipeline.generate_page_vector(page_text, character_desc, i + 1, story_context, seed)
+            vector_paths.append(vector_path)
+            img_path, img = pipeline.generate_page_image(page_text, character_desc, i + 1, story_context, seed,
+                                                         dpi=pipeline.illustration_dpi(pdf_profile, vector_path))
             images.append(img)
-            
-            # Save image
-            img_path = os.path.join(temp_dir, f"page_{i+1}.png")
-            image_gen.save_image(img, img_path)
             image_paths.append(img_path)
             
-            progress_bar.progress(40 + (i + 1) * 10)
+            progress_bar.progress(40 + (i + 1) * 40 // len(story_pages))
         
-        # Step 4: Generate PDF
+        # Step 3: Generate PDF
         status_text.text("📖 Creating your storybook PDF...")
-        pdf_filename = f"storybook_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf"
-        pdf_path = os.path.join(temp_dir, pdf_filename)
-        
-        success = pdf_gen.create_enhanced_storybook_pdf(
-            story_pages, 
-            image_paths, 
-            pdf_path, 
-            story_title,
-            character_desc
-        )
+        pdf_path = pipeline.create_pdf(story_pages, image_paths, story_title, character_desc, pdf_profile, vector_paths)
         
-        if not success:
+        if not pdf_path:
+            artifact_store.release(temp_dir)
             st.error("Failed to create PDF. Please try again.")
             return
         
         progress_bar.progress(80)
         
-        # Step 5: Generate audio
+        # Step 4: Generate audio
         status_text.text("🎵 Creating audio narration...")
-        audio_path = audio_gen.generate_story_audio(story_pages, f"Story: {prompt[:30]}...")
+        audio_gen = pipeline.audio_gen
+        narration_title = f"Story: {prompt[:30]}..."
+        audio_path = pipeline.generate_narration(story_pages, narration_title)
+        
+        # Transcode to the selected profile in the background
+        audio_transcode = audio_gen.transcode_audio_async(audio_path, audio_profile) if audio_path else None
+        
+        # Lightweight HTML and EPUB editions for reading on screen
+        status_text.text("🌐 Preparing web and e-reader editions...")
+        web_path, epub_path = pipeline.export_web(story_pages, images, story_title, character_desc, narration_title)
         progress_bar.progress(100)
         
         # Update session state
         st.session_state.story_generated = True
-        story_state = st.session_state.story_pages = story_pages
+        st.session_state.story_pages = story_pages
         st.session_state.images = images
+        # Encoded in the background so reruns only embed the finished previews
+        st.session_state.image_previews = [image_data_uri_async(image) if image else None for image in images]
         st.session_state.pdf_path = pdf_path
+        st.session_state.thumbnail_paths = pipeline.last_thumbnail_paths
         st.session_state.audio_path = audio_path
+        st.session_state.audio_transcode = audio_transcode
+        st.session_state.web_path = web_path
+        st.session_state.epub_path = epub_path
+        st.session_state.book_metadata = {
+            'title': story_title,
+            'pages': len(story_pages),
+            'created_at': datetime.now().isoformat(timespec='seconds'),
+            'seed': seed,
+            # Profile asked for, and the one the narration is in so far (updated when the transcode finishes)
+            'requested_audio_profile': audio_profile,
+            'audio_profile': DEFAULT_AUDIO_PROFILE,
+            'pdf_profile': pdf_profile
+        }
         st.session_state.temp_dir = temp_dir
         st.session_state.story_title = story_title
         st.session_state.character_desc = character_desc
         
+        # Everything needed to regenerate a single page later
+        st.session_state.book = {
+            'prompt': prompt,
+            'seed': seed,
+            'title': story_title,
+            'character_description': character_desc,
+            'narration_title': narration_title,
+            'pages': story_pages,
+            'image_paths': image_paths,
+            'vector_paths': vector_paths,
+            'variants': [0] * len(story_pages),
+            'pdf_profile': pdf_profile,
+            'pdf_path': pdf_path,
+            'thumbnail_paths': pipeline.last_thumbnail_paths,
+            'audio_path': audio_path
+        }
+        
+        # Re-measure the finished book against the quota
+        artifact_store.enforce_limits(protect=book_artifact_paths())
+        
         status_text.text("✨ Your storybook is ready!")
         st.success("🎉 Story generated successfully! Scroll down to view and download your storybook.")
         
         # Auto-refresh to show the story
         st.rerun()
 
+def book_artifact_paths():
+    """Files the session's book shows or offers for download: its directory and the cached PDF,
+    illustrations and page previews it refers to in the content store"""
+    book = st.session_state.get('book') or {}
+    paths = {st.session_state.get('temp_dir'), st.session_state.get('pdf_path'), book.get('pdf_path')}
+    paths.update(st.session_state.get('thumbnail_paths') or [])
+    for key in ('image_paths', 'vector_paths', 'thumbnail_paths'):
+        paths.update(book.get(key) or [])
+    paths.discard(None)
+    return paths
+
 def display_story():
     """Display the generated story with download options"""
     st.markdown("## 📚 Your Generated Storybook")
     
+    # Keep this book's files, including its content store entries, from being evicted while it is being viewed
+    artifact_store = get_artifact_store()
+    for path in book_artifact_paths():
+        artifact_store.touch(path)
+    
     # Story preview
     for i, (page_text, image) in enumerate(zip(st.session_state.story_pages, st.session_state.images)):
         with st.expander(f"📖 Page {i+1}", expanded=True):
@@ -296,11 +391,14 @@ def display_story():
             
             with col2:
                 if image:
-                    # Convert image to base64 for display
-                    buffered = io.BytesIO()
-                    image.save(buffered, format="PNG")
-                    img_str = base64.b64encode(buffered.getvalue()).decode()
-                    st.image(f"data:image/png;base64,{img_str}", use_container_width=True)
+                    previews = st.session_state.image_previews
+                    preview = previews[i] if i < len(previews) else None
+                    st.image(preview.result() if preview else image_data_uri(image), use_container_width=True)
+            
+            if 'book' in st.session_state:
+                display_page_editor(i + 1, page_text)
+    
+    display_layout_preview()
     
     # Download section
     st.markdown("## 📥 Download Your Storybook")
@@ -320,39 +418,178 @@ def display_story():
                     type="primary"
                 )
     
+    audio_path, audio_profile = get_profiled_audio()
+    
     with col2:
-        if st.session_state.audio_path and os.path.exists(st.session_state.audio_path):
-            with open(st.session_state.audio_path, "rb") as audio_file:
+        if audio_path and os.path.exists(audio_path):
+            with open(audio_path, "rb") as audio_file:
                 audio_data = audio_file.read()
                 st.download_button(
                     label="🎵 Download Audio Narration",
                     data=audio_data,
-                    file_name=f"story_audio_{datetime.now().strftime('%Y%m%d_%H%M%S')}.mp3",
-                    mime="audio/mp3",
+                    file_name=f"story_audio_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{audio_profile['extension']}",
+                    mime=audio_profile['mime'],
                     use_container_width=True,
                     type="secondary"
                 )
     
+    col1, col2 = st.columns(2)
+    
+    with col1:
+        web_path = st.session_state.get('web_path')
+        if web_path and os.path.exists(web_path):
+            with open(web_path, "rb") as web_file:
+                st.download_button(
+                    label="🌐 Download Web Book (HTML)",
+                    data=web_file.read(),
+                    file_name=f"storybook_web_{datetime.now().strftime('%Y%m%d_%H%M%S')}.zip",
+                    mime="application/zip",
+                    use_container_width=True,
+                    help="A small, mobile-friendly web page with per-page narration. Unzip and open index.html."
+                )
+    
+    with col2:
+        epub_path = st.session_state.get('epub_path')
+        if epub_path and os.path.exists(epub_path):
+            with open(epub_path, "rb") as epub_file:
+                st.download_button(
+                    label="📱 Download EPUB",
+                    data=epub_file.read(),
+                    file_name=f"storybook_{datetime.now().strftime('%Y%m%d_%H%M%S')}.epub",
+                    mime="application/epub+zip",
+                    use_container_width=True
+                )
+    
     # Audio player
-    if st.session_state.audio_path:
+    if audio_path:
         st.markdown("## 🎵 Listen to Your Story")
-        st.audio(st.session_state.audio_path, format="audio/mp3")
+        audio_gen = AudioGenerator(st.session_state.temp_dir)
+        if audio_gen.get_audio_url(audio_path):
+            # Streamed from the media server, so players can seek with range requests
+            st.markdown(audio_gen.create_audio_controls_html(audio_path), unsafe_allow_html=True)
+        else:
+            # No public media URL configured: served through Streamlit's media file manager
+            st.audio(audio_path, format=audio_profile['mime'])
     
     # Generate new story button
     if st.button("🔄 Create Another Story", use_container_width=True):
         # Clean up temporary files
-        if 'temp_dir' in st.session_state and os.path.exists(st.session_state.temp_dir):
-            import shutil
-            shutil.rmtree(st.session_state.temp_dir)
+        if 'temp_dir' in st.session_state:
+            get_artifact_store().release(st.session_state.temp_dir)
         
         # Reset session state
         st.session_state.story_generated = False
         st.session_state.story_pages = []
         st.session_state.images = []
+        st.session_state.image_previews = []
         st.session_state.pdf_path = None
+        st.session_state.thumbnail_paths = []
         st.session_state.audio_path = None
+        st.session_state.audio_transcode = None
+        st.session_state.web_path = None
+        st.session_state.epub_path = None
+        st.session_state.book_metadata = {}
+        st.session_state.pop('book', None)
         
         st.rerun()
 
+def display_layout_preview():
+    """Small previews of the PDF's pages, drawn from its layout while it was built"""
+    thumbnail_paths = st.session_state.get('thumbnail_paths') or []
+    captions = ["Cover"] + [f"Page {i}" for i in range(1, len(thumbnail_paths) - 1)] + ["The End"]
+    previews = [(path, caption) for path, caption in zip(thumbnail_paths, captions) if path and os.path.exists(path)]
+    if not previews:
+        return
+    
+    st.markdown("## 📑 Book Layout Preview")
+    st.image([path for path, _ in previews], caption=[caption for _, caption in previews], width=PDF_THUMBNAIL_WIDTH)
+
+def display_page_editor(page_number, page_text):
+    """Controls to edit or regenerate a single page"""
+    with st.popover("✏️ Edit this page", use_container_width=True):
+        edited_text = st.text_area("Page text", value=page_text, key=f"page_text_{page_number}", height=120)
+        
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            if st.button("💾 Apply edit", key=f"apply_{page_number}", use_container_width=True):
+                if edited_text.strip() and edited_text.strip() != page_text:
+                    regenerate_page(page_number, page_text=edited_text)
+        with col2:
+            if st.button("🔄 Rewrite text", key=f"rewrite_{page_number}", use_container_width=True):
+                regenerate_page(page_number, rewrite_text=True)
+        with col3:
+            if st.button("🎨 New illustration", key=f"redraw_{page_number}", use_container_width=True):
+                regenerate_page(page_number, new_illustration=True)
+
+def regenerate_page(page_number, page_text=None, rewrite_text=False, new_illustration=False):
+    """Regenerate one page's text and/or illustration, reusing cached work for the rest of the book"""
+    with st.spinner(f"🎨 Updating page {page_number}..."):
+        artifact_store = get_artifact_store()
+        temp_dir = st.session_state.get('temp_dir')
+        if not temp_dir or not os.path.exists(temp_dir):
+            temp_dir = artifact_store.create_dir('book')
+        
+        pipeline = StorybookPipeline(temp_dir)
+        book, image = pipeline.regenerate_page(
+            st.session_state.book,
+            page_number,
+            page_text=page_text,
+            rewrite_text=rewrite_text,
+            new_illustration=new_illustration
+        )
+        
+        if not book:
+            st.error(f"Failed to update page {page_number}. Please try again.")
+            return
+        
+        audio_transcode = None
+        profile_name = st.session_state.book_metadata.get('requested_audio_profile', DEFAULT_AUDIO_PROFILE)
+        if book['audio_path']:
+            audio_transcode = pipeline.audio_gen.transcode_audio_async(book['audio_path'], profile_name)
+        # The new narration is the standard MP3 until its transcode finishes
+        st.session_state.book_metadata['audio_profile'] = DEFAULT_AUDIO_PROFILE
+        
+        images = list(st.session_state.images)
+        images[page_number - 1] = image
+        web_path, epub_path = pipeline.export_web(book['pages'], images, book['title'],
+                                                  book['character_description'], book['narration_title'])
+        
+        st.session_state.book = book
+        st.session_state.story_pages = book['pages']
+        st.session_state.images = images
+        previews = list(st.session_state.image_previews)
+        if page_number - 1 < len(previews):
+            previews[page_number - 1] = image_data_uri_async(image)
+        st.session_state.image_previews = previews
+        st.session_state.pdf_path = book['pdf_path']
+        st.session_state.thumbnail_paths = book['thumbnail_paths']
+        st.session_state.audio_path = book['audio_path']
+        st.session_state.audio_transcode = audio_transcode
+        st.session_state.web_path = web_path
+        st.session_state.epub_path = epub_path
+        st.session_state.temp_dir = temp_dir
+        st.session_state.pop(f"page_text_{page_number}", None)
+        
+        artifact_store.enforce_limits(protect=book_artifact_paths())
+    
+    st.rerun()
+
+def get_profiled_audio():
+    """Return the narration in the book's audio profile, or the standard MP3 while it is transcoding"""
+    audio_path = st.session_state.audio_path
+    transcode = st.session_state.audio_transcode
+    profile_name = DEFAULT_AUDIO_PROFILE
+    
+    if transcode is not None:
+        if transcode.done():
+            profiled_path, produced_profile = transcode.result()
+            if profiled_path:
+                # Describe the file the transcode actually produced (the MP3 if it fell back)
+                audio_path, profile_name = profiled_path, produced_profile
+                st.session_state.book_metadata['audio_profile'] = produced_profile
+        else:
+            st.info("🎧 Preparing your selected audio format... the standard MP3 is available meanwhile.")
+    return audio_path, AUDIO_PROFILES[profile_name]
+
 if __name__ == "__main__":
     main()
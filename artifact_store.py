@@ -0,0 +1,222 @@
+import os
+import shutil
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from config import ARTIFACT_ROOT, ARTIFACT_QUOTA_BYTES, ARTIFACT_TTL_SECONDS, ARTIFACT_ORPHAN_GRACE_SECONDS, CONTENT_STORE_DIRNAME
+from media_server import unregister_media
+
+
+class ArtifactStore:
+    """Tracks generated files on disk and keeps them within a quota using TTL and LRU eviction"""
+
+    def __init__(self, root=ARTIFACT_ROOT, quota_bytes=ARTIFACT_QUOTA_BYTES, ttl_seconds=ARTIFACT_TTL_SECONDS):
+        self.root = os.path.abspath(root)
+        self.quota_bytes = quota_bytes
+        self.ttl_seconds = ttl_seconds
+        os.makedirs(self.root, exist_ok=True)
+
+        # path -> artifact record, ordered from least to most recently used
+        self._artifacts = OrderedDict()
+        self._lock = threading.RLock()
+        self.metrics = {
+            'created': 0,
+            'expired': 0,
+            'evicted': 0,
+            'released': 0,
+            'orphans_swept': 0,
+            'bytes_freed': 0
+        }
+
+    def create_dir(self, kind, ttl_seconds=None):
+        """Create and register a fresh artifact directory (e.g. one per book)"""
+        path = tempfile.mkdtemp(prefix=f"{kind}_", dir=self.root)
+        self.register(path, kind, ttl_seconds)
+        return path
+
+    def register(self, path, kind='file', ttl_seconds=None, last_access=None, enforce=True):
+        """Start tracking an existing file or directory"""
+        path = os.path.abspath(path)
+        now = time.time()
+        with self._lock:
+            if path not in self._artifacts:
+                self.metrics['created'] += 1
+            self._artifacts[path] = {
+                'kind': kind,
+                'created': now,
+                'last_access': now if last_access is None else last_access,
+                'ttl': self.ttl_seconds if ttl_seconds is None else ttl_seconds,
+                # Files are complete when registered; directories may still be filling up (see enforce_limits)
+                'is_dir': os.path.isdir(path),
+                'size': self._measure(path)
+            }
+            self._artifacts.move_to_end(path)
+        if enforce:
+            self.enforce_limits(protect=path)
+        return path
+
+    def touch(self, path):
+        """Mark an artifact as recently used so LRU eviction keeps it"""
+        path = os.path.abspath(path)
+        with self._lock:
+            record = self._artifacts.get(path)
+            if record is None:
+                return False
+            record['last_access'] = time.time()
+            record['size'] = self._measure(path)
+            self._artifacts.move_to_end(path)
+            return True
+
+    def release(self, path):
+        """Remove an artifact immediately (e.g. when the user starts a new story)"""
+        path = os.path.abspath(path)
+        with self._lock:
+            if self._artifacts.pop(path, None) is None:
+                return 0
+            self.metrics['released'] += 1
+        return self._remove(path)
+
+    def contains(self, path):
+        """Whether the store tracks this artifact"""
+        with self._lock:
+            return os.path.abspath(path) in self._artifacts
+
+    def enforce_limits(self, protect=None):
+        """Drop expired artifacts, then evict least recently used ones until under quota.
+
+        ``protect`` is a path or a collection of paths that are kept either way.
+        Sizes are those recorded by register and touch; directories are measured again.
+        """
+        if isinstance(protect, str):
+            protect = [protect]
+        protect = {os.path.abspath(path) for path in protect or () if path}
+        now = time.time()
+        expired = []
+        evicted = []
+
+        with self._lock:
+            for path, record in list(self._artifacts.items()):
+                if path not in protect and record['ttl'] and now - record['last_access'] > record['ttl']:
+                    expired.append(path)
+                    del self._artifacts[path]
+
+            # Recorded sizes stand for files; only directories (book and audio dirs) grow after registration
+            for path, record in self._artifacts.items():
+                if record['is_dir']:
+                    record['size'] = self._measure(path)
+            used_bytes = sum(record['size'] for record in self._artifacts.values())
+
+            for path in list(self._artifacts):
+                if used_bytes <= self.quota_bytes:
+                    break
+                if path in protect:
+                    continue
+                used_bytes -= self._artifacts.pop(path)['size']
+                evicted.append(path)
+
+            self.metrics['expired'] += len(expired)
+            self.metrics['evicted'] += len(evicted)
+
+        freed = 0
+        for path in expired + evicted:
+            freed += self._remove(path)
+        return freed
+
+    def sweep_orphans(self, grace_seconds=ARTIFACT_ORPHAN_GRACE_SECONDS):
+        """Remove untracked leftovers under the root from earlier runs; adopt recent ones"""
+        now = time.time()
+        swept = 0
+        try:
+            entries = os.listdir(self.root)
+        except OSError as e:
+            print(f"Error listing artifact root {self.root}: {e}")
+            return 0
+
+        for name in entries:
+            path = os.path.join(self.root, name)
+            if name == CONTENT_STORE_DIRNAME or self.contains(path):
+                # The content store tracks its own entries individually
+                continue
+            try:
+                age = now - os.path.getmtime(path)
+            except OSError:
+                continue
+            if age > grace_seconds:
+                self._remove(path)
+                swept += 1
+            else:
+                # Possibly still in use by a sibling process; let TTL decide
+                self.register(path, kind=name.split('_', 1)[0])
+
+        with self._lock:
+            self.metrics['orphans_swept'] += swept
+        return swept
+
+    def usage(self):
+        """Report disk usage and lifecycle metrics"""
+        with self._lock:
+            by_kind = {}
+            for record in self._artifacts.values():
+                stats = by_kind.setdefault(record['kind'], {'count': 0, 'bytes': 0})
+                stats['count'] += 1
+                stats['bytes'] += record['size']
+            used_bytes = sum(record['size'] for record in self._artifacts.values())
+            return {
+                'root': self.root,
+                'quota_bytes': self.quota_bytes,
+                'used_bytes': used_bytes,
+                'used_fraction': used_bytes / self.quota_bytes if self.quota_bytes else 0.0,
+                'artifacts': len(self._artifacts),
+                'by_kind': by_kind,
+                **self.metrics
+            }
+
+    def _measure(self, path):
+        """Size of a file, or the total size of a directory tree"""
+        try:
+            if os.path.isfile(path):
+                return os.path.getsize(path)
+            total = 0
+            for dirpath, _, filenames in os.walk(path):
+                for filename in filenames:
+                    try:
+                        total += os.path.getsize(os.path.join(dirpath, filename))
+                    except OSError:
+                        pass
+            return total
+        except OSError:
+            return 0
+
+    def _remove(self, path):
+        """Delete an artifact from disk, returning the bytes freed"""
+        size = self._measure(path)
+        try:
+            if os.path.isdir(path):
+                for dirpath, _, filenames in os.walk(path):
+                    for filename in filenames:
+                        unregister_media(os.path.join(dirpath, filename))
+                shutil.rmtree(path, ignore_errors=True)
+            elif os.path.exists(path):
+                unregister_media(path)
+                os.remove(path)
+        except OSError as e:
+            print(f"Error removing artifact {path}: {e}")
+            return 0
+        with self._lock:
+            self.metrics['bytes_freed'] += size
+        return size
+
+
+_artifact_store = None
+_artifact_store_lock = threading.Lock()
+
+
+def get_artifact_store():
+    """Return the process-wide artifact store, sweeping orphans on first use"""
+    global _artifact_store
+    with _artifact_store_lock:
+        if _artifact_store is None:
+            _artifact_store = ArtifactStore()
+            _artifact_store.sweep_orphans()
+        return _artifact_store
@@ -1,11 +1,33 @@
 from gtts import gTTS
 import os
-import tempfile
-from config import AUDIO_LANGUAGE
+import mimetypes
+import shutil
+import subprocess
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from config import (AUDIO_LANGUAGE, AUDIO_PROFILES, DEFAULT_AUDIO_PROFILE, AUDIO_TRANSCODE_WORKERS, FFMPEG_BINARY,
+                    MEDIA_SERVER_PUBLIC_URL)
+from media_server import get_media_server, unregister_media
+from artifact_store import get_artifact_store
+
+_transcode_pool = None
+_transcode_pool_lock = threading.Lock()
+
+
+def _get_transcode_pool():
+    """Shared worker pool that keeps ffmpeg transcodes off the request path"""
+    global _transcode_pool
+    with _transcode_pool_lock:
+        if _transcode_pool is None:
+            _transcode_pool = ThreadPoolExecutor(max_workers=AUDIO_TRANSCODE_WORKERS,
+                                                 thread_name_prefix="audio-transcode")
+        return _transcode_pool
+
 
 class AudioGenerator:
-    def __init__(self):
-        self.temp_dir = tempfile.mkdtemp()
+    def __init__(self, output_dir=None):
+        # Write into the caller's book directory, or a managed artifact directory of our own
+        self.temp_dir = output_dir or get_artifact_store().create_dir('audio')
         self.audio_files = []
     
     def generate_story_audio(self, story_pages, story_title="My Storybook"):
@@ -48,16 +70,98 @@ class AudioGenerator:
             print(f"Error generating page audio: {e}")
             return None
     
+    def transcode_audio(self, audio_file_path, profile_name=DEFAULT_AUDIO_PROFILE):
+        """Transcode gTTS output to an audio profile.
+
+        Returns (path, profile name) for the file actually produced: the source MP3 and
+        DEFAULT_AUDIO_PROFILE when the profile needs no transcode or transcoding fails,
+        or (None, None) without a source file.
+        """
+        profile = AUDIO_PROFILES.get(profile_name)
+        if not audio_file_path or not os.path.exists(audio_file_path):
+            return None, None
+        if profile is None:
+            print(f"Unknown audio profile '{profile_name}', keeping standard MP3")
+            return audio_file_path, DEFAULT_AUDIO_PROFILE
+        if not profile['codec']:
+            # gTTS already produces the standard MP3
+            return audio_file_path, DEFAULT_AUDIO_PROFILE
+        
+        ffmpeg = shutil.which(FFMPEG_BINARY)
+        if not ffmpeg:
+            print(f"ffmpeg not found, keeping standard MP3 instead of '{profile_name}' profile")
+            return audio_file_path, DEFAULT_AUDIO_PROFILE
+        
+        base_name = os.path.splitext(audio_file_path)[0]
+        output_path = f"{base_name}_{profile_name}.{profile['extension']}"
+        
+        try:
+            command = self._build_transcode_command(ffmpeg, audio_file_path, output_path, profile)
+            subprocess.run(command, check=True, capture_output=True, timeout=300)
+            self.audio_files.append(output_path)
+            return output_path, profile_name
+            
+        except Exception as e:
+            print(f"Error transcoding audio to '{profile_name}' profile: {e}")
+            return audio_file_path, DEFAULT_AUDIO_PROFILE
+    
+    def transcode_audio_async(self, audio_file_path, profile_name=DEFAULT_AUDIO_PROFILE):
+        """Schedule a transcode on the shared worker pool and return its Future of (path, profile name)"""
+        return _get_transcode_pool().submit(self.transcode_audio, audio_file_path, profile_name)
+    
+    def _build_transcode_command(self, ffmpeg, source_path, output_path, profile):
+        """Build the ffmpeg command line for an audio profile"""
+        command = [ffmpeg, '-y', '-loglevel', 'error', '-i', source_path, '-vn',
+                   '-c:a', profile['codec']]
+        if profile.get('channels'):
+            command += ['-ac', str(profile['channels'])]
+        if profile.get('sample_rate'):
+            command += ['-ar', str(profile['sample_rate'])]
+        if profile.get('bitrate'):
+            command += ['-b:a', profile['bitrate']]
+        if profile['codec'] == 'libopus':
+            # Tuned for speech at low bitrates
+            command += ['-application', 'voip']
+        command.append(output_path)
+        return command
+    
     def _combine_story_text(self, story_pages, story_title):
         """Combine all story pages into one text for full audio narration"""
-        full_text = f"Welcome to {story_title}. "
-        full_text += "Let's begin our magical story. "
-        
+        return ' '.join(self.narration_segments(story_pages, story_title))
+    
+    def narration_segments(self, story_pages, story_title):
+        """Split the narration into an intro, one segment per page and an outro"""
+        segments = [f"Welcome to {story_title}. Let's begin our magical story."]
         for i, page_text in enumerate(story_pages, 1):
-            full_text += f"Page {i}: {page_text} "
-        
-        full_text += "The end. Thank you for reading with us!"
-        return full_text
+            segments.append(f"Page {i}: {page_text}")
+        segments.append("The end. Thank you for reading with us!")
+        return segments
+    
+    def generate_segment_audio(self, text, output_path):
+        """Generate audio for one narration segment at the given path"""
+        try:
+            tts = gTTS(text=text, lang=AUDIO_LANGUAGE, slow=False)
+            tts.save(output_path)
+            return True
+            
+        except Exception as e:
+            print(f"Error generating audio segment: {e}")
+            return False
+    
+    def combine_audio_segments(self, segment_paths, output_path):
+        """Join MP3 segments into one narration file (MP3 frames concatenate cleanly)"""
+        try:
+            with open(output_path, 'wb') as output_file:
+                for segment_path in segment_paths:
+                    with open(segment_path, 'rb') as segment_file:
+                        shutil.copyfileobj(segment_file, output_file)
+            
+            self.audio_files.append(output_path)
+            return output_path
+            
+        except Exception as e:
+            print(f"Error combining audio segments: {e}")
+            return None
     
     def get_audio_file_path(self, filename):
         """Get the full path to an audio file"""
@@ -67,6 +171,7 @@ class AudioGenerator:
         """Clean up temporary audio files"""
         try:
             for audio_file in self.audio_files:
+                unregister_media(audio_file)
                 if os.path.exists(audio_file):
                     os.remove(audio_file)
             self.audio_files.clear()
@@ -85,11 +190,16 @@ class AudioGenerator:
         if not audio_file_path or not os.path.exists(audio_file_path):
             return ""
         
+        # Reference the narration by URL so the browser streams it with range requests; inline it otherwise
+        audio_src = self.get_audio_url(audio_file_path)
+        if not audio_src:
+            audio_src = f"data:{self._audio_mime_type(audio_file_path)};base64,{self._file_to_base64(audio_file_path)}"
+        
         html_code = f"""
         <div style="margin: 20px 0; padding: 15px; background: #f8f9fa; border-radius: 10px; border-left: 4px solid #007bff;">
             <h4 style="margin: 0 0 10px 0; color: #007bff;">🎵 Story Audio Narration</h4>
-            <audio controls style="width: 100%;">
-                <source src="data:audio/mp3;base64,{self._file_to_base64(audio_file_path)}" type="audio/mp3">
+            <audio controls preload="metadata" style="width: 100%;">
+                <source src="{audio_src}" type="{self._audio_mime_type(audio_file_path)}">
                 Your browser does not support the audio element.
             </audio>
             <p style="margin: 10px 0 0 0; font-size: 12px; color: #666;">
@@ -99,8 +209,33 @@ class AudioGenerator:
         """
         return html_code
     
+    def get_audio_url(self, audio_file_path):
+        """Get a streaming URL for an audio file from the media server.
+
+        None unless MEDIA_SERVER_PUBLIC_URL says where browsers can reach the server.
+        """
+        if not MEDIA_SERVER_PUBLIC_URL:
+            return None
+        try:
+            server = get_media_server()
+            if not server.running:
+                return None
+            return server.register(audio_file_path)
+        except Exception as e:
+            print(f"Error registering audio file with media server: {e}")
+            return None
+    
+    def _audio_mime_type(self, audio_file_path):
+        """Get the MIME type for an audio file"""
+        extension = os.path.splitext(audio_file_path)[1].lstrip('.').lower()
+        for profile in AUDIO_PROFILES.values():
+            if profile['extension'] == extension:
+                return profile['mime']
+        mime_type, _ = mimetypes.guess_type(audio_file_path)
+        return mime_type or 'audio/mpeg'
+    
     def _file_to_base64(self, file_path):
-        """Convert audio file to base64 for HTML embedding"""
+        """Convert audio file to base64 for HTML embedding (fallback when the media server is unavailable)"""
         try:
             import base64
             with open(file_path, "rb") as audio_file:
@@ -0,0 +1,53 @@
+"""Render-time benchmark for illustrations at several DPIs.
+
+Draws the same pages for each procedural style at each DPI (see
+illustration_size) and reports milliseconds per page next to the output
+size, showing how render time grows with the pixel count. Styles that ask a
+model for images are timed on their procedural drawing only.
+
+Usage:
+    python benchmarks/illustration_dpi.py --pages 5 --dpi 80 150 300
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from illustration_renderer import create_illustration_renderer, illustration_size
+
+STYLES = ('corrected', 'gemini', 'working', 'simple_ai', 'working_ai', 'professional')
+
+
+def render(renderer, page_number, seed, dpi):
+    return renderer._render_page("The fox followed the river past the mill.", "A small red fox with a blue scarf",
+                                 page_number, "", random.Random(seed), illustration_size(dpi))
+
+
+def render_ms(renderer, pages, dpi):
+    """Milliseconds per page, after one untimed page so sprites and base layers are cached"""
+    render(renderer, 1, 'warm-up', dpi)
+    started = time.perf_counter()
+    for page_number in range(1, pages + 1):
+        render(renderer, page_number, page_number, dpi)
+    return (time.perf_counter() - started) / pages * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--pages', type=int, default=5, help="pages drawn per style and DPI")
+    parser.add_argument('--dpi', type=int, nargs='+', default=[80, 150, 300], help="resolutions to render at")
+    args = parser.parse_args()
+
+    sizes = [illustration_size(dpi) for dpi in args.dpi]
+    print(f"{args.pages} pages per style; ms per page")
+    print(f"{'style':<14}" + "".join(f"{f'{dpi} DPI ({w}x{h})':>22}" for dpi, (w, h) in zip(args.dpi, sizes)))
+    for style in STYLES:
+        renderer = create_illustration_renderer(style)
+        print(f"{style:<14}" + "".join(f"{render_ms(renderer, args.pages, dpi):>22.1f}" for dpi in args.dpi))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+"""Post-processing benchmark for the procedural illustration styles.
+
+Draws the same pages for each style, then times the fused effects stage
+(one colour matrix pass plus one kernel, see IllustrationRenderer.apply_effects)
+against the step-by-step ImageEnhance chain followed by a downsample, and
+reports how far apart the two outputs are.
+
+Usage:
+    python benchmarks/illustration_effects.py --pages 5 --repeat 3
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PIL import Image, ImageChops, ImageDraw, ImageStat
+from config import IMAGE_WIDTH, IMAGE_HEIGHT
+from illustration_renderer import create_illustration_renderer
+
+STYLES = ('corrected', 'working', 'simple_ai', 'working_ai', 'professional')
+
+
+def draw_canvases(renderer, pages):
+    """Supersampled page canvases before post-processing"""
+    width, height = IMAGE_WIDTH * renderer.SUPERSAMPLE, IMAGE_HEIGHT * renderer.SUPERSAMPLE
+    canvases = []
+    for page_number in range(1, pages + 1):
+        img = renderer._base_layer(width, height, page_number)
+        renderer._draw_page(img, ImageDraw.Draw(img), width, height, "The fox followed the river past the mill.",
+                            "A small red fox with a blue scarf", page_number, "", random.Random(page_number))
+        canvases.append(img)
+    return canvases
+
+
+def chained(renderer, img):
+    img = renderer._apply_effects_chained(img)
+    if renderer.SUPERSAMPLE != 1:
+        img = img.resize((IMAGE_WIDTH, IMAGE_HEIGHT), Image.Resampling.LANCZOS)
+    return img
+
+
+def best_ms(fn, canvases, repeat):
+    """Fastest of ``repeat`` runs over all canvases, in milliseconds per page"""
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for img in canvases:
+            fn(img)
+        elapsed = (time.perf_counter() - started) / len(canvases) * 1000
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--pages', type=int, default=5, help="pages drawn per style")
+    parser.add_argument('--repeat', type=int, default=3, help="timing runs per style (the fastest is reported)")
+    args = parser.parse_args()
+
+    print(f"{args.pages} pages per style, best of {args.repeat}")
+    print(f"{'style':<14}{'canvas':>11}{'chained ms':>12}{'fused ms':>10}{'speedup':>9}{'mean diff':>11}{'max diff':>10}")
+    for style in STYLES:
+        renderer = create_illustration_renderer(style)
+        canvases = draw_canvases(renderer, args.pages)
+        chained_ms = best_ms(lambda img: chained(renderer, img), canvases, args.repeat)
+        fused_ms = best_ms(lambda img: renderer.apply_effects(img, renderer.SUPERSAMPLE), canvases, args.repeat)
+
+        mean_diff, max_diff = 0.0, 0
+        for img in canvases:
+            # The outermost pixels are left unfiltered by kernels, so compare the interior
+            diff = ImageChops.difference(chained(renderer, img), renderer.apply_effects(img, renderer.SUPERSAMPLE))
+            diff = diff.crop((2, 2, diff.width - 2, diff.height - 2))
+            mean_diff += sum(ImageStat.Stat(diff).mean) / 3 / len(canvases)
+            max_diff = max(max_diff, max(high for _, high in diff.getextrema()))
+
+        canvas = f"{canvases[0].width}x{canvases[0].height}"
+        print(f"{style:<14}{canvas:>11}{chained_ms:>12.1f}{fused_ms:>10.1f}{chained_ms / fused_ms:>8.1f}x"
+              f"{mean_diff:>11.2f}{max_diff:>10}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,55 @@
+"""Encoding benchmark for page illustrations.
+
+Renders a few pages in the default illustration style and times each image
+encoding profile (IMAGE_ENCODING_PROFILES) and the encodings used for PDF
+profiles (PDF_PROFILES), reporting the average time and size per page.
+
+Usage:
+    python benchmarks/image_encoding.py --pages 5 --repeat 3
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import IMAGE_ENCODING_PROFILES, PDF_PROFILES
+from illustration_renderer import create_illustration_renderer
+from image_encoding import encode_image, encoding_profile, pdf_image_encoding
+
+
+def best_ms(profile, images, repeat):
+    """Fastest of ``repeat`` runs over all images, in milliseconds per page, and the average size in bytes"""
+    best, size = None, 0
+    for _ in range(repeat):
+        started = time.perf_counter()
+        size = sum(len(encode_image(image, profile)[0]) for image in images) / len(images)
+        elapsed = (time.perf_counter() - started) / len(images) * 1000
+        best = elapsed if best is None else min(best, elapsed)
+    return best, size
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--pages', type=int, default=5, help="pages rendered")
+    parser.add_argument('--repeat', type=int, default=3, help="timing runs per profile (the fastest is reported)")
+    args = parser.parse_args()
+
+    renderer = create_illustration_renderer()
+    images = [renderer.generate_page_image("The fox followed the river past the mill.",
+                                           "A small red fox with a blue scarf", page_number, seed=page_number)
+              for page_number in range(1, args.pages + 1)]
+
+    profiles = [(name, profile) for name, profile in IMAGE_ENCODING_PROFILES.items()]
+    profiles += [(f"pdf {name}", pdf_image_encoding(profile)) for name, profile in PDF_PROFILES.items()]
+
+    print(f"{args.pages} pages of {images[0].width}x{images[0].height}, best of {args.repeat}")
+    print(f"{'profile':<16}{'format':>8}{'encode ms':>11}{'KB':>9}")
+    for name, profile in profiles:
+        ms, size = best_ms(profile, images, args.repeat)
+        print(f"{name:<16}{encoding_profile(profile)['format']:>8}{ms:>11.1f}{size / 1024:>9.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+"""Time-to-first-page benchmark for linearized and regular storybook PDFs.
+
+Builds the same book with and without linearization and estimates how long a
+viewer that reads the download front to back waits before it can draw page 1.
+A regular PDF keeps its cross-reference table at the end, so the whole file
+has to arrive first; a linearized one can be drawn as soon as its first-page
+section (the /E offset in the linearization dictionary) is in.
+
+Usage:
+    python benchmarks/pdf_first_page.py --pages 40 --kbps 1000 --rtt-ms 150
+"""
+import argparse
+import os
+import re
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pikepdf
+from illustration_renderer import create_illustration_renderer
+from professional_pdf_generator import ProfessionalPDFGenerator
+
+_FIRST_PAGE_END = re.compile(rb'/Linearized\b.*?/E\s+(\d+)', re.DOTALL)
+
+
+def first_page_bytes(pdf_path):
+    """Bytes a front-to-back reader needs before it can render page 1"""
+    with open(pdf_path, 'rb') as f:
+        head = f.read(4096)
+    match = _FIRST_PAGE_END.search(head)
+    if match:
+        return int(match.group(1))
+    return os.path.getsize(pdf_path)
+
+
+def transfer_seconds(byte_count, kbps, rtt_ms):
+    return rtt_ms / 1000 + byte_count * 8 / (kbps * 1000)
+
+
+def make_book(work_dir, pages):
+    """Story text and illustrations for a synthetic book"""
+    image_gen = create_illustration_renderer('corrected')
+    story_pages = []
+    image_paths = []
+    for page_number in range(1, pages + 1):
+        text = (f"On page {page_number} the little fox followed the river past the old mill, "
+                "counting fireflies and wondering where the stars went during the day. ") * 3
+        image_path = os.path.join(work_dir, f"page_{page_number}.png")
+        image = image_gen.generate_page_image(text, "A small red fox with a blue scarf", page_number)
+        image_gen.save_image(image, image_path)
+        story_pages.append(text)
+        image_paths.append(image_path)
+    return story_pages, image_paths
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--pages', type=int, default=20, help="story pages in the book")
+    parser.add_argument('--profile', default='screen', help="PDF output profile")
+    parser.add_argument('--kbps', type=float, default=1000, help="link speed in kilobits per second")
+    parser.add_argument('--rtt-ms', type=float, default=150, help="round-trip latency in milliseconds")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="pdf_first_page_") as work_dir:
+        story_pages, image_paths = make_book(work_dir, args.pages)
+        generator = ProfessionalPDFGenerator()
+
+        print(f"{args.pages} pages, '{args.profile}' profile, {args.kbps:g} kbit/s, {args.rtt_ms:g} ms RTT")
+        print(f"{'output':<12}{'size':>10}{'build s':>10}{'page 1 bytes':>14}{'first page s':>14}{'full file s':>13}")
+        for label, linearize in (('regular', False), ('linearized', True)):
+            output_path = os.path.join(work_dir, f"{label}.pdf")
+            started = time.perf_counter()
+            if not generator.create_enhanced_storybook_pdf(story_pages, image_paths, output_path, "The Fox and the Fireflies",
+                                                           "A small red fox with a blue scarf",
+                                                           profile=args.profile, linearize=linearize):
+                print(f"{label}: build failed")
+                continue
+            build_seconds = time.perf_counter() - started
+
+            with pikepdf.open(output_path) as pdf:
+                if linearize and not pdf.is_linearized:
+                    print(f"{label}: output is not linearized")
+
+            size = os.path.getsize(output_path)
+            needed = first_page_bytes(output_path)
+            print(f"{label:<12}{size:>10}{build_seconds:>10.2f}{needed:>14}"
+                  f"{transfer_seconds(needed, args.kbps, args.rtt_ms):>14.2f}"
+                  f"{transfer_seconds(size, args.kbps, args.rtt_ms):>13.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,82 @@
+"""Vector versus raster illustrations in story page PDFs.
+
+Draws the same pages for each procedural style twice: as a raster image at
+the print profile's DPI (see illustration_dpi) and as vector shapes (see
+generate_page_vector). Each is laid out as a page fragment with the print
+profile, and the script reports drawing and layout time per page plus the
+PDF size.
+
+Usage:
+    python benchmarks/pdf_vector.py --pages 5 --profile print
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import PDF_PROFILES
+from illustration_renderer import create_illustration_renderer, illustration_size
+from professional_pdf_generator import ProfessionalPDFGenerator
+from vector_illustration import save_vector
+
+STYLES = ('corrected', 'gemini', 'working', 'simple_ai', 'working_ai')
+PAGE_TEXT = "The fox followed the river past the mill."
+CHARACTER = "A small red fox with a blue scarf"
+
+
+def draw_raster(renderer, page_number, dpi, path):
+    image = renderer._render_page(PAGE_TEXT, CHARACTER, page_number, "", random.Random(page_number),
+                                  illustration_size(dpi))
+    return renderer.save_image(image, path)
+
+
+def draw_vector(renderer, page_number, dpi, path):
+    return save_vector(renderer.generate_page_vector(PAGE_TEXT, CHARACTER, page_number, "", page_number), path)
+
+
+def run(pdf_gen, renderer, draw, pages, profile, work_dir, vector):
+    """(draw ms per page, layout ms per page, PDF KB per page)"""
+    dpi = PDF_PROFILES[profile]['image_dpi'] if PDF_PROFILES[profile]['upsample'] else None
+    draw_ms = layout_ms = size = 0
+    for page_number in range(1, pages + 1):
+        image_path = os.path.join(work_dir, f"page_{page_number}.png")
+        vector_path = os.path.join(work_dir, f"page_{page_number}.json")
+        output_path = os.path.join(work_dir, f"page_{page_number}.pdf")
+        # The vector page keeps a raster copy for its preview, as the pipeline does
+        draw_raster(renderer, page_number, None, image_path)
+
+        started = time.perf_counter()
+        draw(renderer, page_number, dpi, vector_path if vector else image_path)
+        draw_ms += time.perf_counter() - started
+
+        started = time.perf_counter()
+        pdf_gen.create_page_fragment(PAGE_TEXT, image_path, page_number, output_path, profile,
+                                     vector_path=vector_path if vector else None)
+        layout_ms += time.perf_counter() - started
+        size += os.path.getsize(output_path)
+    return draw_ms / pages * 1000, layout_ms / pages * 1000, size / pages / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--pages', type=int, default=5, help="pages drawn per style")
+    parser.add_argument('--profile', default='print', choices=sorted(PDF_PROFILES), help="PDF profile")
+    args = parser.parse_args()
+
+    pdf_gen = ProfessionalPDFGenerator()
+    print(f"{args.pages} pages per style, '{args.profile}' profile")
+    print(f"{'style':<12}{'output':<8}{'draw ms':>9}{'layout ms':>11}{'KB/page':>9}")
+    for style in STYLES:
+        renderer = create_illustration_renderer(style)
+        for output, draw, vector in (('raster', draw_raster, False), ('vector', draw_vector, True)):
+            with tempfile.TemporaryDirectory(prefix="pdf_vector_") as work_dir:
+                draw_ms, layout_ms, kb = run(pdf_gen, renderer, draw, args.pages, args.profile, work_dir, vector)
+            print(f"{style:<12}{output:<8}{draw_ms:>9.1f}{layout_ms:>11.1f}{kb:>9.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+import hashlib
+import re
+import threading
+from collections import OrderedDict, namedtuple
+from config import CHARACTER_SPEC_CACHE_SIZE
+
+# What the illustrations need to know about the main character. colors is a tuple of (part, colour name)
+# pairs for 'body' (fur, skin, feathers, ...), 'eyes', 'hair' and 'clothing'; the rest are tuples of words
+CharacterSpec = namedtuple('CharacterSpec', ['species', 'colors', 'clothing', 'features'])
+
+COLOR_NAMES = {
+    'red': '#e74c3c', 'crimson': '#dc143c', 'orange': '#ff8c00', 'yellow': '#ffd700', 'golden': '#ffc125',
+    'gold': '#ffc125', 'green': '#32cd32', 'emerald': '#2ecc71', 'teal': '#20b2aa', 'turquoise': '#40e0d0',
+    'blue': '#4169e1', 'navy': '#000080', 'purple': '#9370db', 'violet': '#8a2be2', 'lavender': '#b57edc',
+    'pink': '#ff69b4', 'brown': '#a0522d', 'chocolate': '#7b3f00', 'black': '#2c2c2c', 'white': '#f8f8ff',
+    'gray': '#a9a9a9', 'grey': '#a9a9a9', 'silver': '#c0c0c0', 'ginger': '#d2691e', 'copper': '#b87333',
+    'cream': '#fffdd0', 'rainbow': '#ff69b4'
+}
+SPECIES = ['fox', 'bear', 'rabbit', 'bunny', 'cat', 'kitten', 'dog', 'puppy', 'owl', 'bird', 'dragon', 'unicorn',
+           'mouse', 'elephant', 'lion', 'tiger', 'turtle', 'frog', 'penguin', 'monkey', 'squirrel', 'hedgehog',
+           'robot', 'fairy', 'mermaid', 'dinosaur', 'girl', 'boy', 'child', 'princess', 'prince', 'wizard', 'hero',
+           'creature']
+CLOTHING = ['cape', 'cloak', 'hat', 'cap', 'dress', 'shirt', 'scarf', 'boots', 'shoes', 'jacket', 'coat', 'overalls',
+            'crown', 'backpack', 'glasses', 'bow', 'vest', 'sweater', 'skirt', 'tutu', 'clothing', 'clothes']
+FEATURES = ['wings', 'tail', 'horn', 'horns', 'ears', 'whiskers', 'freckles', 'antlers', 'spots', 'stripes', 'mane',
+            'beak', 'paws', 'sparkly', 'fluffy', 'tiny', 'small', 'big', 'round']
+# Species drawn with a skin-coloured face rather than the body colour
+PEOPLE = {'girl', 'boy', 'child', 'princess', 'prince', 'wizard', 'hero', 'fairy', 'mermaid'}
+# Words naming the part of the body a colour describes
+BODY_WORDS = {'fur': 'body', 'skin': 'body', 'feathers': 'body', 'scales': 'body', 'body': 'body',
+              'eyes': 'eyes', 'eye': 'eyes', 'hair': 'hair', 'mane': 'hair'}
+
+_specs = OrderedDict()
+_specs_lock = threading.Lock()
+
+
+def parse_character_description(description):
+    """Structured CharacterSpec for a free-text character description.
+
+    Parsed once per distinct description; later calls with the same text
+    return the cached spec.
+    """
+    key = hashlib.sha256((description or "").encode('utf-8')).hexdigest()
+    with _specs_lock:
+        spec = _specs.get(key)
+        if spec is not None:
+            _specs.move_to_end(key)
+            return spec
+
+    spec = _parse(description or "")
+    with _specs_lock:
+        _specs[key] = spec
+        while len(_specs) > CHARACTER_SPEC_CACHE_SIZE:
+            _specs.popitem(last=False)
+    return spec
+
+
+def _parse(description):
+    words = re.findall(r"[a-z]+", description.lower())
+    species = next((word for word in words if word in SPECIES), None)
+    colors, clothing, features = {}, [], []
+    for i, word in enumerate(words):
+        if word in CLOTHING and word not in clothing:
+            clothing.append(word)
+        if word in FEATURES and word not in features:
+            features.append(word)
+        if word not in COLOR_NAMES:
+            continue
+        # A colour describes the first part or garment named within the next few words: "bright green eyes"
+        for noun in words[i + 1:i + 4]:
+            part = 'clothing' if noun in CLOTHING else BODY_WORDS.get(noun)
+            if part:
+                colors.setdefault(part, word)
+                break
+    return CharacterSpec(species, tuple(sorted(colors.items())), tuple(clothing), tuple(features))
+
+
+def describe_character_spec(spec):
+    """One-line summary of a spec for prompts, e.g. "fox; golden body, green eyes; wearing cape" """
+    parts = [spec.species or 'character']
+    if spec.colors:
+        parts.append(", ".join(f"{color} {part}" for part, color in spec.colors))
+    if spec.clothing:
+        parts.append("wearing " + ", ".join(spec.clothing))
+    if spec.features:
+        parts.append("with " + ", ".join(spec.features))
+    return "; ".join(parts)
+
+
+def character_color(spec, part, default):
+    """Hex colour of a part of the character, or default if the description doesn't name one"""
+    name = dict(spec.colors).get(part)
+    return COLOR_NAMES[name] if name else default
@@ -1,4 +1,5 @@
 import os
+import tempfile
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -14,12 +15,176 @@ MAX_CHARACTER_DESCRIPTION = 200
 # Image Configuration
 IMAGE_WIDTH = 400
 IMAGE_HEIGHT = 300
+# Resolution the size above stands for (5 inches wide on a PDF page); illustrations for print are drawn
+# at a higher DPI from the same layout (see illustration_size in illustration_renderer.py)
+IMAGE_DPI = 80
+# Illustration style drawn for story pages (see ILLUSTRATION_STYLES in illustration_renderer.py)
+DEFAULT_ILLUSTRATION_STYLE = os.getenv('ILLUSTRATION_STYLE', 'corrected')
+# Seconds to wait for a model illustration before drawing the page procedurally
+ILLUSTRATION_MODEL_TIMEOUT = float(os.getenv('ILLUSTRATION_MODEL_TIMEOUT', '30'))
+# Pre-rendered page backgrounds (border, panel, sky gradient) kept in memory per (style, size, scheme)
+ILLUSTRATION_BASE_CACHE_SIZE = 32
+# Anti-aliased sprites for clouds, stars, orbs and grass: drawn at this multiple of their size and downsampled
+SPRITE_SUPERSAMPLE = 4
+SPRITE_CACHE_SIZE = 1024
+# Reference sizes that soft clouds are drawn at and scaled down from (the largest serve high-DPI pages)
+SPRITE_LEVELS = (32, 64, 128, 256, 512)
+# Differently arranged clouds and grass rows to choose from per size
+SPRITE_VARIANTS = 4
+# Vertical gradients in vector illustrations are drawn as at most this many bands of flat colour
+VECTOR_GRADIENT_BANDS = 64
+# Parsed character descriptions kept in memory, keyed by a hash of the text
+CHARACTER_SPEC_CACHE_SIZE = 64
+# Image encodings by use: fast PNG for cached intermediates, small WebP for in-app previews,
+# optimized PNG for files kept or shipped losslessly (PDF images follow PDF_PROFILES)
+IMAGE_ENCODING_PROFILES = {
+    'intermediate': {'format': 'PNG', 'compress_level': 1},
+    'preview': {'format': 'WEBP', 'quality': 80, 'method': 4, 'fallback': 'JPEG'},
+    'archive': {'format': 'PNG', 'compress_level': 9, 'optimize': True}
+}
+IMAGE_ENCODE_WORKERS = 2
 
 # PDF Configuration
 PDF_PAGE_WIDTH = 612
 PDF_PAGE_HEIGHT = 792
 PDF_MARGIN = 50
+# Long books and anthologies are laid out in chunks of this many story pages and merged
+PDF_STREAM_CHUNK_PAGES = 20
+PDF_STREAM_THRESHOLD_PAGES = 40
+# Worker processes for batch PDF rendering (ReportLab layout is CPU-bound)
+PDF_BATCH_WORKERS = int(os.getenv('PDF_BATCH_WORKERS', str(os.cpu_count() or 1)))
+
+# PDF output profiles (image resolution and encoding, plus a post-processing pass)
+PDF_PROFILES = {
+    'screen': {
+        'label': 'Screen (small download)',
+        'image_dpi': 96,
+        'upsample': False,
+        # Whichever of JPEG and lossless comes out smaller for each image
+        'image_format': 'auto',
+        'jpeg_quality': 82,
+        'object_streams': True,
+        # Fast web view: viewers can show page 1 before the rest of the file arrives
+        'linearize': True,
+        'archival': False,
+        # Procedural illustrations are embedded as vector drawings (see vector_illustration.py)
+        'vector_images': True
+    },
+    'print': {
+        'label': 'Print (300 DPI)',
+        'image_dpi': 300,
+        'upsample': True,
+        'image_format': 'PNG',
+        'jpeg_quality': None,
+        'object_streams': False,
+        'linearize': False,
+        'archival': False,
+        'vector_images': True
+    },
+    'archive': {
+        'label': 'Archive (lossless, PDF/A-style metadata)',
+        'image_dpi': None,
+        'upsample': False,
+        'image_format': 'PNG',
+        'jpeg_quality': None,
+        'object_streams': False,
+        'linearize': False,
+        'archival': True,
+        # PDF/A forbids transparency, which the drawings use for soft clouds and glows
+        'vector_images': False
+    }
+}
+DEFAULT_PDF_PROFILE = os.getenv('PDF_PROFILE', 'screen')
+# Page previews drawn from the layout while PDFs are built (pixels wide, palette size)
+PDF_THUMBNAIL_WIDTH = 120
+PDF_THUMBNAIL_COLORS = 64
+
+# Font Configuration (TrueType fonts are embedded in PDFs as subsets and used for image text;
+# without them PDFs fall back to the built-in Helvetica family, which covers Latin scripts only)
+FONT_FAMILY_NAME = 'StoryFont'
+FONT_SEARCH_PATHS = [path for path in os.getenv('FONT_DIR', '').split(os.pathsep) if path] + [
+    '/usr/share/fonts/truetype/dejavu',
+    '/usr/share/fonts/dejavu',
+    '/usr/share/fonts/truetype/noto',
+    '/usr/share/fonts/noto',
+    '/usr/share/fonts/truetype/liberation',
+    '/Library/Fonts',
+    'C:\\Windows\\Fonts'
+]
+# Candidate font families, in order of preference; missing styles fall back to the regular face
+FONT_FAMILIES = [
+    {
+        'regular': 'DejaVuSans.ttf',
+        'bold': 'DejaVuSans-Bold.ttf',
+        'italic': 'DejaVuSans-Oblique.ttf',
+        'bold_italic': 'DejaVuSans-BoldOblique.ttf'
+    },
+    {
+        'regular': 'NotoSans-Regular.ttf',
+        'bold': 'NotoSans-Bold.ttf',
+        'italic': 'NotoSans-Italic.ttf',
+        'bold_italic': 'NotoSans-BoldItalic.ttf'
+    },
+    {
+        'regular': 'LiberationSans-Regular.ttf',
+        'bold': 'LiberationSans-Bold.ttf',
+        'italic': 'LiberationSans-Italic.ttf',
+        'bold_italic': 'LiberationSans-BoldItalic.ttf'
+    }
+]
+
+# Web Export Configuration (HTML bundle and EPUB)
+WEB_IMAGE_WIDTHS = [IMAGE_WIDTH // 2, IMAGE_WIDTH]
+WEB_IMAGE_QUALITY = 80
 
 # Audio Configuration
 AUDIO_SPEED = 1.0
 AUDIO_LANGUAGE = 'en'
+
+# Audio output profiles (gTTS produces the 'standard' MP3; others are transcoded with ffmpeg)
+AUDIO_PROFILES = {
+    'mobile': {
+        'label': 'Mobile (Opus, mono, low bandwidth)',
+        'extension': 'ogg',
+        'mime': 'audio/ogg',
+        'codec': 'libopus',
+        'bitrate': '24k',
+        'channels': 1,
+        'sample_rate': 24000
+    },
+    'standard': {
+        'label': 'Standard (MP3)',
+        'extension': 'mp3',
+        'mime': 'audio/mpeg',
+        'codec': None
+    },
+    'archive': {
+        'label': 'Archive (FLAC, lossless)',
+        'extension': 'flac',
+        'mime': 'audio/flac',
+        'codec': 'flac',
+        'bitrate': None,
+        'channels': 1,
+        'sample_rate': 24000
+    }
+}
+DEFAULT_AUDIO_PROFILE = 'standard'
+AUDIO_TRANSCODE_WORKERS = 2
+FFMPEG_BINARY = os.getenv('FFMPEG_BINARY', 'ffmpeg')
+
+# Media Server Configuration (streams audio and other artifacts by URL)
+# Artifacts are served without authentication, so only local clients can reach them unless a deployment
+# sets MEDIA_SERVER_HOST (e.g. '0.0.0.0' behind a proxy) and MEDIA_SERVER_PUBLIC_URL
+MEDIA_SERVER_HOST = os.getenv('MEDIA_SERVER_HOST', '127.0.0.1')
+MEDIA_SERVER_PORT = int(os.getenv('MEDIA_SERVER_PORT', '8765'))
+# URL browsers reach the media server at; unset, audio is played through Streamlit instead of streamed by URL
+MEDIA_SERVER_PUBLIC_URL = os.getenv('MEDIA_SERVER_PUBLIC_URL', '')
+MEDIA_CHUNK_SIZE = 64 * 1024
+
+# Artifact Storage Configuration (books, images and audio on local disk)
+ARTIFACT_ROOT = os.getenv('ARTIFACT_ROOT', os.path.join(tempfile.gettempdir(), 'storybook_artifacts'))
+ARTIFACT_QUOTA_BYTES = int(os.getenv('ARTIFACT_QUOTA_MB', '2048')) * 1024 * 1024
+ARTIFACT_TTL_SECONDS = int(os.getenv('ARTIFACT_TTL_SECONDS', str(6 * 60 * 60)))
+ARTIFACT_ORPHAN_GRACE_SECONDS = int(os.getenv('ARTIFACT_ORPHAN_GRACE_SECONDS', str(60 * 60)))
+CONTENT_STORE_DIRNAME = 'cas'
+CONTENT_TTL_SECONDS = int(os.getenv('CONTENT_TTL_SECONDS', str(7 * 24 * 60 * 60)))
@@ -0,0 +1,141 @@
+import os
+import json
+import hashlib
+import threading
+import uuid
+from config import CONTENT_STORE_DIRNAME, CONTENT_TTL_SECONDS
+from artifact_store import get_artifact_store
+
+
+def content_key(kind, inputs):
+    """Stable hash of a stage's inputs, used as its cache key"""
+    payload = json.dumps({'kind': kind, 'inputs': inputs}, sort_keys=True, default=str, ensure_ascii=False)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def file_digest(file_path, chunk_size=1024 * 1024):
+    """SHA-256 of a file's contents"""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ContentStore:
+    """Content-addressed cache of stage outputs, keyed by a hash of each stage's inputs.
+
+    New entries don't trigger eviction on their own; callers enforce the artifact
+    store's limits once a book is finished, protecting the entries it uses.
+    """
+
+    def __init__(self, artifact_store=None, ttl_seconds=CONTENT_TTL_SECONDS):
+        self.artifact_store = artifact_store or get_artifact_store()
+        self.root = os.path.join(self.artifact_store.root, CONTENT_STORE_DIRNAME)
+        self.ttl_seconds = ttl_seconds
+        self.stats = {'hits': 0, 'misses': 0}
+        self._lock = threading.Lock()
+        os.makedirs(self.root, exist_ok=True)
+        self._adopt_existing()
+
+    def path_for(self, kind, key, extension):
+        """Location of an entry on disk"""
+        return os.path.join(self.root, kind, key[:2], f"{key}.{extension}")
+
+    def get(self, kind, inputs, extension):
+        """Return the cached output path for these inputs, or None"""
+        path = self.path_for(kind, content_key(kind, inputs), extension)
+        if not os.path.exists(path):
+            return None
+        self._mark_used(path)
+        return path
+
+    def get_or_create(self, kind, inputs, extension, builder):
+        """Return the cached output for these inputs, running builder(path) to produce it on a miss"""
+        key = content_key(kind, inputs)
+        path = self.path_for(kind, key, extension)
+
+        if os.path.exists(path):
+            with self._lock:
+                self.stats['hits'] += 1
+            self._mark_used(path)
+            return path
+
+        with self._lock:
+            self.stats['misses'] += 1
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Build under a unique name and move into place so readers never see partial files
+        temp_path = os.path.join(os.path.dirname(path), f"{key}.{uuid.uuid4().hex}.tmp.{extension}")
+        try:
+            if builder(temp_path) is False or not os.path.exists(temp_path):
+                return None
+            os.replace(temp_path, path)
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+
+        # Not enforced here: near the quota that could evict earlier outputs of the book being built
+        self.artifact_store.register(path, kind=f"cas:{kind}", ttl_seconds=self.ttl_seconds, enforce=False)
+        return path
+
+    def get_or_create_json(self, kind, inputs, builder):
+        """Cache a JSON-serialisable value produced by builder()"""
+        def write_json(temp_path):
+            value = builder()
+            if value is None:
+                return False
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump(value, f, ensure_ascii=False)
+            return True
+
+        path = self.get_or_create(kind, inputs, 'json', write_json)
+        if not path:
+            return None
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def _mark_used(self, path):
+        """Refresh LRU position, persisting it in the mtime so it survives restarts"""
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        if not self.artifact_store.touch(path):
+            self.artifact_store.register(path, kind=f"cas:{os.path.basename(os.path.dirname(os.path.dirname(path)))}",
+                                         ttl_seconds=self.ttl_seconds, enforce=False)
+
+    def _adopt_existing(self):
+        """Track entries written by earlier runs so they count toward the quota"""
+        existing = []
+        for dirpath, _, filenames in os.walk(self.root):
+            kind = os.path.relpath(dirpath, self.root).split(os.sep)[0]
+            for filename in filenames:
+                path = os.path.join(dirpath, filename)
+                try:
+                    if '.tmp.' in filename:
+                        # Left behind by an interrupted build
+                        os.remove(path)
+                    elif not self.artifact_store.contains(path):
+                        existing.append((os.path.getmtime(path), path, kind))
+                except OSError:
+                    pass
+
+        # Oldest first, so LRU order matches the persisted access times
+        for last_access, path, kind in sorted(existing):
+            self.artifact_store.register(path, kind=f"cas:{kind}", ttl_seconds=self.ttl_seconds,
+                                         last_access=last_access, enforce=False)
+        self.artifact_store.enforce_limits()
+
+
+_content_store = None
+_content_store_lock = threading.Lock()
+
+
+def get_content_store():
+    """Return the process-wide content store"""
+    global _content_store
+    with _content_store_lock:
+        if _content_store is None:
+            _content_store = ContentStore()
+        return _content_store
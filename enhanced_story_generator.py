@@ -3,9 +3,14 @@ from config import GEMINI_API_KEY, STORY_PAGES, MAX_STORY_LENGTH, MAX_CHARACTER_
 import random
 
 class EnhancedStoryGenerator:
+    # Bump whenever the prompt templates change so cached stories are regenerated
+    TEMPLATE_VERSION = 1
+    MODEL_NAME = 'gemini-1.5-flash'
+    
     def __init__(self):
         genai.configure(api_key=GEMINI_API_KEY)
-        self.model = genai.GenerativeModel('gemini-1.5-flash')
+        self.model = genai.GenerativeModel(self.MODEL_NAME)
+        self.rng = random.Random()
         
         # Story themes and elements for variety
         self.story_themes = [
@@ -26,8 +31,17 @@ class EnhancedStoryGenerator:
             "clever fox", "kind bear", "imaginative child", "talking tree"
         ]
     
-    def generate_story(self, prompt):
-        """Generate a high-quality 5-page children's story based on the prompt"""
+    def generate_story(self, prompt, seed=None, fallback=True):
+        """Generate a high-quality 5-page children's story based on the prompt.
+
+        If the model fails or leaves pages out, the missing pages come from
+        canned text; with ``fallback=False`` the call returns None instead so
+        callers can tell a model story from a stand-in (see fallback_story).
+        """
+        if seed is not None:
+            # Seed theme/setting/character choices so a (prompt, seed) pair is reproducible
+            self.rng.seed(seed)
+        
         try:
             # Create a comprehensive story prompt
             story_prompt = self._create_comprehensive_story_prompt(prompt)
@@ -36,21 +50,21 @@ class EnhancedStoryGenerator:
             response = self.model.generate_content(story_prompt)
             
             if response and response.text:
-                return self._parse_and_enhance_story(response.text, prompt)
-            else:
-                return self._generate_fallback_story(prompt)
+                pages = self._parse_and_enhance_story(response.text, prompt, fallback)
+                if pages:
+                    return pages
                 
         except Exception as e:
             print(f"Error generating story: {e}")
-            return self._generate_fallback_story(prompt)
+        return self.fallback_story(prompt) if fallback else None
     
     def _create_comprehensive_story_prompt(self, user_prompt):
         """Create a detailed, structured prompt for high-quality story generation"""
         
         # Select random elements for variety
-        theme = random.choice(self.story_themes)
-        setting = random.choice(self.story_settings)
-        character_type = random.choice(self.character_types)
+        theme = self.rng.choice(self.story_themes)
+        setting = self.rng.choice(self.story_settings)
+        character_type = self.rng.choice(self.character_types)
         
         prompt = f"""
         Create a delightful, engaging 5-page children's story that will captivate young readers aged 4-8.
@@ -94,8 +108,8 @@ class EnhancedStoryGenerator:
         
         return prompt
     
-    def _parse_and_enhance_story(self, story_text, original_prompt):
-        """Parse the generated story and enhance it if needed"""
+    def _parse_and_enhance_story(self, story_text, original_prompt, fallback=True):
+        """Parse the generated story and enhance it if needed; None if pages are missing and not fallback"""
         pages = []
         lines = story_text.split('\n')
         
@@ -108,6 +122,8 @@ class EnhancedStoryGenerator:
                     pages.append(enhanced_text)
         
         # Ensure we have exactly 5 pages
+        if len(pages) < STORY_PAGES and not fallback:
+            return None
         while len(pages) < STORY_PAGES:
             pages.append(self._generate_fallback_page(len(pages) + 1, original_prompt))
         
@@ -135,11 +151,15 @@ class EnhancedStoryGenerator:
         ]
         
         if len(text) < 40:
-            phrase = random.choice(descriptive_phrases)
+            phrase = self.rng.choice(descriptive_phrases)
             return f"{text} {phrase}."
         
         return text
     
+    def fallback_story(self, prompt):
+        """Canned story used when the model gives none"""
+        return [self._generate_fallback_page(page_number, prompt) for page_number in range(1, STORY_PAGES + 1)]
+    
     def _generate_fallback_page(self, page_number, original_prompt):
         """Generate a fallback page if AI generation fails"""
         fallback_pages = [
@@ -155,8 +175,47 @@ class EnhancedStoryGenerator:
         else:
             return "The story continues with more magical adventures and wonderful discoveries."
     
-    def generate_character_description(self, story_text, story_prompt):
-        """Generate detailed, consistent character descriptions for image generation"""
+    def regenerate_page_text(self, story_pages, page_index, original_prompt):
+        """Rewrite a single page so it still fits between its neighbours"""
+        try:
+            previous_page = story_pages[page_index - 1] if page_index > 0 else "(this is the first page)"
+            next_page = story_pages[page_index + 1] if page_index + 1 < len(story_pages) else "(this is the last page)"
+            
+            page_prompt = f"""
+            Rewrite page {page_index + 1} of this {len(story_pages)}-page children's story for readers aged 4-8.
+            
+            USER REQUEST: "{original_prompt}"
+            PREVIOUS PAGE: {previous_page}
+            CURRENT PAGE: {story_pages[page_index]}
+            NEXT PAGE: {next_page}
+            
+            REQUIREMENTS:
+            - 3-4 sentences, engaging and descriptive
+            - Keep the same characters and continue naturally from the previous page
+            - Lead naturally into the next page
+            - Say something fresh rather than repeating the current page
+            
+            Return only the new page text, nothing else.
+            """
+            
+            response = self.model.generate_content(page_prompt)
+            if response and response.text:
+                page_text = response.text.strip()
+                if page_text.upper().startswith('PAGE') and ':' in page_text:
+                    page_text = page_text.split(':', 1)[1].strip()
+                return self._enhance_page_text(page_text)
+            else:
+                return story_pages[page_index]
+                
+        except Exception as e:
+            print(f"Error regenerating page {page_index + 1}: {e}")
+            return story_pages[page_index]
+    
+    def generate_character_description(self, story_text, story_prompt, fallback=True):
+        """Generate detailed, consistent character descriptions for image generation.
+
+        Falls back to a canned description if the model fails, or returns None with ``fallback=False``.
+        """
         try:
             character_prompt = f"""
             Based on this children's story, create a detailed character description for consistent image generation across all pages.
@@ -183,14 +242,12 @@ class EnhancedStoryGenerator:
             response = self.model.generate_content(character_prompt)
             if response and response.text:
                 return response.text.strip()
-            else:
-                return self._generate_fallback_character_description()
                 
         except Exception as e:
             print(f"Error generating character description: {e}")
-            return self._generate_fallback_character_description()
+        return self.fallback_character_description() if fallback else None
     
-    def _generate_fallback_character_description(self):
+    def fallback_character_description(self):
         """Generate a fallback character description"""
         fallback_descriptions = [
             "A friendly, round-faced character with bright blue eyes, wearing colorful clothing in warm tones. Always smiling with a cheerful expression, medium-sized with soft, rounded features.",
@@ -198,10 +255,13 @@ class EnhancedStoryGenerator:
             "A magical creature with sparkly wings, pastel colors, and a gentle, wise expression. Medium-sized with flowing, ethereal features and warm, inviting eyes."
         ]
         
-        return random.choice(fallback_descriptions)
+        return self.rng.choice(fallback_descriptions)
     
-    def generate_story_title(self, story_pages, original_prompt):
-        """Generate an engaging title for the story"""
+    def generate_story_title(self, story_pages, original_prompt, fallback=True):
+        """Generate an engaging title for the story.
+
+        Falls back to the prompt's first words if the model fails, or returns None with ``fallback=False``.
+        """
         try:
             title_prompt = f"""
             Create an engaging, memorable title for this children's story.
@@ -228,14 +288,12 @@ class EnhancedStoryGenerator:
                 if len(title) > 50:
                     title = title[:50] + "..."
                 return title
-            else:
-                return self._generate_fallback_title(original_prompt)
                 
         except Exception as e:
             print(f"Error generating title: {e}")
-            return self._generate_fallback_title(original_prompt)
+        return self.fallback_title(original_prompt) if fallback else None
     
-    def _generate_fallback_title(self, original_prompt):
+    def fallback_title(self, original_prompt):
         """Generate a fallback title based on the prompt"""
         words = original_prompt.split()[:5]
         title = " ".join(words).capitalize()
@@ -0,0 +1,118 @@
+import os
+import threading
+from PIL import ImageFont
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+from reportlab.lib.fonts import addMapping
+from config import FONT_FAMILY_NAME, FONT_SEARCH_PATHS, FONT_FAMILIES
+
+# Built-in PDF fonts used when no TrueType files are installed
+_BASE_PDF_FONTS = {
+    'regular': 'Helvetica',
+    'bold': 'Helvetica-Bold',
+    'italic': 'Helvetica-Oblique',
+    'bold_italic': 'Helvetica-BoldOblique'
+}
+
+
+class FontRegistry:
+    """Loads each TrueType font once per process and shares it between PDF and image generators"""
+
+    def __init__(self, search_paths=FONT_SEARCH_PATHS, families=FONT_FAMILIES, family_name=FONT_FAMILY_NAME):
+        self.search_paths = search_paths
+        self.families = families
+        self.family_name = family_name
+        self._lock = threading.Lock()
+        self._paths = None
+        self._pdf_fonts = None
+        self._image_fonts = {}
+
+    def font_path(self, style='regular'):
+        """Location of the TrueType file for a style, or None if no family is installed"""
+        with self._lock:
+            if self._paths is None:
+                self._paths = self._find_family()
+            return self._paths.get(style) or self._paths.get('regular')
+
+    def pdf_fonts(self):
+        """ReportLab font names for each style, registering the TrueType family on first use.
+
+        TTFont embeds only the glyphs a document uses, so registered fonts are
+        subset automatically. Styles the family lacks use its regular face;
+        with no family installed, the built-in Helvetica family is used.
+        """
+        with self._lock:
+            if self._pdf_fonts is not None:
+                return self._pdf_fonts
+
+        fonts = dict(_BASE_PDF_FONTS)
+        regular_path = self.font_path('regular')
+        if regular_path:
+            for style in _BASE_PDF_FONTS:
+                font_name = self.family_name if style == 'regular' else f"{self.family_name}-{style}"
+                path = self.font_path(style)
+                try:
+                    if font_name not in pdfmetrics.getRegisteredFontNames():
+                        pdfmetrics.registerFont(TTFont(font_name, path))
+                    fonts[style] = font_name
+                except Exception as e:
+                    print(f"Error registering font {path}: {e}")
+                    fonts = dict(_BASE_PDF_FONTS)
+                    break
+
+            if fonts['regular'] == self.family_name:
+                # Let <b> and <i> markup inside paragraphs pick the matching faces
+                addMapping(self.family_name, 0, 0, fonts['regular'])
+                addMapping(self.family_name, 1, 0, fonts['bold'])
+                addMapping(self.family_name, 0, 1, fonts['italic'])
+                addMapping(self.family_name, 1, 1, fonts['bold_italic'])
+
+        with self._lock:
+            self._pdf_fonts = fonts
+            return fonts
+
+    def image_font(self, size, style='regular'):
+        """PIL font for drawing text on images, loaded once per (style, size)"""
+        key = (style, size)
+        with self._lock:
+            font = self._image_fonts.get(key)
+        if font is not None:
+            return font
+
+        path = self.font_path(style)
+        try:
+            font = ImageFont.truetype(path, size) if path else ImageFont.load_default(size)
+        except Exception as e:
+            print(f"Error loading image font {path}: {e}")
+            font = ImageFont.load_default()
+
+        with self._lock:
+            return self._image_fonts.setdefault(key, font)
+
+    def _find_family(self):
+        """Paths of the first family whose regular face is installed, so all styles match"""
+        for family in self.families:
+            paths = {style: self._find_file(filename) for style, filename in family.items()}
+            if paths.get('regular'):
+                return {style: path for style, path in paths.items() if path}
+        return {}
+
+    def _find_file(self, filename):
+        for directory in self.search_paths:
+            path = os.path.join(directory, filename)
+            if os.path.isfile(path):
+                return path
+        return None
+
+
+_font_registry = None
+_font_registry_lock = threading.Lock()
+
+
+def get_font_registry():
+    """Return the process-wide font registry"""
+    global _font_registry
+    with _font_registry_lock:
+        if _font_registry is None:
+            _font_registry = FontRegistry()
+        return _font_registry
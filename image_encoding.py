@@ -0,0 +1,77 @@
+import base64
+import io
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from PIL import features
+from config import IMAGE_ENCODING_PROFILES, IMAGE_ENCODE_WORKERS
+
+MIME_TYPES = {'PNG': 'image/png', 'JPEG': 'image/jpeg', 'WEBP': 'image/webp'}
+EXTENSIONS = {'PNG': 'png', 'JPEG': 'jpg', 'WEBP': 'webp'}
+
+_encode_pool = None
+_encode_pool_lock = threading.Lock()
+
+
+def _get_encode_pool():
+    """Shared worker pool that keeps image encoding off the caller's thread"""
+    global _encode_pool
+    with _encode_pool_lock:
+        if _encode_pool is None:
+            _encode_pool = ThreadPoolExecutor(max_workers=IMAGE_ENCODE_WORKERS, thread_name_prefix="image-encode")
+        return _encode_pool
+
+
+def encoding_profile(profile):
+    """Encoding settings for a profile name or dict, with WebP swapped for its fallback if Pillow lacks it"""
+    settings = dict(IMAGE_ENCODING_PROFILES[profile] if isinstance(profile, str) else profile)
+    if settings['format'] == 'WEBP' and not features.check('webp'):
+        settings['format'] = settings.get('fallback', 'JPEG')
+    return settings
+
+
+def pdf_image_encoding(pdf_profile):
+    """Encoding for images placed in a PDF built with this PDF profile (see PDF_PROFILES)"""
+    if pdf_profile['image_format'] in ('JPEG', 'auto'):
+        # JPEG data is embedded in the PDF as is ('auto' compares it with a lossless copy)
+        return {'format': 'JPEG', 'quality': pdf_profile['jpeg_quality'], 'optimize': True}
+    # ReportLab decodes lossless images and deflates them itself, so the file only has to be quick to read
+    return dict(IMAGE_ENCODING_PROFILES['intermediate'])
+
+
+def encode_image(image, profile='intermediate'):
+    """Encode an image with a profile; returns (bytes, format)"""
+    settings = encoding_profile(profile)
+    image_format = settings['format']
+    if image_format in ('JPEG', 'WEBP') and image.mode not in ('RGB', 'L'):
+        image = image.convert('RGB')
+
+    options = {}
+    if image_format == 'PNG':
+        options = {'compress_level': settings.get('compress_level', 6), 'optimize': settings.get('optimize', False)}
+    elif image_format == 'JPEG':
+        options = {'quality': settings.get('quality', 85), 'optimize': settings.get('optimize', False)}
+    elif image_format == 'WEBP':
+        options = {'quality': settings.get('quality', 80), 'method': settings.get('method', 4)}
+
+    buffer = io.BytesIO()
+    image.save(buffer, image_format, **options)
+    return buffer.getvalue(), image_format
+
+
+def save_encoded_image(image, filename, profile='intermediate'):
+    """Encode an image with a profile and write it to filename"""
+    data, _ = encode_image(image, profile)
+    with open(filename, 'wb') as f:
+        f.write(data)
+    return True
+
+
+def image_data_uri(image, profile='preview'):
+    """Data URI of an image encoded with a profile"""
+    data, image_format = encode_image(image, profile)
+    return f"data:{MIME_TYPES[image_format]};base64,{base64.b64encode(data).decode()}"
+
+
+def image_data_uri_async(image, profile='preview'):
+    """Start building a data URI on the shared pool; the future's result is the URI string"""
+    return _get_encode_pool().submit(image_data_uri, image, profile)
@@ -0,0 +1,205 @@
+import os
+import re
+import mimetypes
+import secrets
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse
+from config import MEDIA_SERVER_HOST, MEDIA_SERVER_PORT, MEDIA_SERVER_PUBLIC_URL, MEDIA_CHUNK_SIZE
+
+_RANGE_PATTERN = re.compile(r'^bytes=(\d*)-(\d*)$')
+# _parse_range result for a range outside the file (answered with 416)
+UNSATISFIABLE = 'unsatisfiable'
+
+
+class _MediaRequestHandler(BaseHTTPRequestHandler):
+    """Serve registered files as byte streams with HTTP range support"""
+    server_version = "StorybookMedia/1.0"
+
+    def do_HEAD(self):
+        self._serve(send_body=False)
+
+    def do_GET(self):
+        self._serve(send_body=True)
+
+    def _serve(self, send_body):
+        token = urlparse(self.path).path.strip('/').split('/')[0]
+        file_path = self.server.media_server.resolve(token)
+        if not file_path or not os.path.exists(file_path):
+            self.send_error(404, "Media not found")
+            return
+
+        file_size = os.path.getsize(file_path)
+        start, end = 0, file_size - 1
+        status = 200
+
+        range_header = self.headers.get('Range')
+        byte_range = self._parse_range(range_header, file_size) if range_header else None
+        if byte_range == UNSATISFIABLE:
+            self.send_response(416)
+            self.send_header('Content-Range', f'bytes */{file_size}')
+            self.end_headers()
+            return
+        if byte_range is not None:
+            start, end = byte_range
+            status = 206
+
+        length = end - start + 1
+        self.send_response(status)
+        self.send_header('Content-Type', self.server.media_server.mime_type(file_path))
+        self.send_header('Accept-Ranges', 'bytes')
+        self.send_header('Content-Length', str(length))
+        self.send_header('Cache-Control', 'private, max-age=3600')
+        self.send_header('Access-Control-Allow-Origin', '*')
+        if status == 206:
+            self.send_header('Content-Range', f'bytes {start}-{end}/{file_size}')
+        self.end_headers()
+
+        if not send_body:
+            return
+
+        try:
+            with open(file_path, 'rb') as media_file:
+                media_file.seek(start)
+                remaining = length
+                while remaining > 0:
+                    chunk = media_file.read(min(MEDIA_CHUNK_SIZE, remaining))
+                    if not chunk:
+                        break
+                    self.wfile.write(chunk)
+                    remaining -= len(chunk)
+        except (BrokenPipeError, ConnectionResetError):
+            # Players routinely drop connections while seeking
+            pass
+
+    def _parse_range(self, range_header, file_size):
+        """Parse a single 'bytes=start-end' range into (start, end), or UNSATISFIABLE.
+
+        Several ranges or an unparseable header give None: RFC 9110 lets a server
+        ignore such a Range header and send the whole file.
+        """
+        match = _RANGE_PATTERN.match(range_header.strip())
+        if not match:
+            return None
+        if file_size == 0:
+            return UNSATISFIABLE
+
+        first, last = match.groups()
+        if not first and not last:
+            return None
+        if not first:
+            # Suffix range: the final N bytes
+            suffix = int(last)
+            if suffix == 0:
+                return UNSATISFIABLE
+            return max(0, file_size - suffix), file_size - 1
+
+        start = int(first)
+        if last and int(last) < start:
+            # Not a valid range-spec
+            return None
+        if start >= file_size:
+            return UNSATISFIABLE
+        end = int(last) if last else file_size - 1
+        return start, min(end, file_size - 1)
+
+    def log_message(self, format, *args):
+        # Keep the Streamlit console readable
+        pass
+
+
+class MediaServer:
+    """Small static endpoint that streams artifacts (audio, images) by URL"""
+
+    def __init__(self, host=MEDIA_SERVER_HOST, port=MEDIA_SERVER_PORT, public_url=MEDIA_SERVER_PUBLIC_URL):
+        self.host = host
+        self.port = port
+        self.public_url = public_url.rstrip('/')
+        self._tokens = {}
+        self._paths = {}
+        self._lock = threading.Lock()
+        self._httpd = None
+        self._thread = None
+
+    def start(self):
+        """Start serving in a background thread (no-op if already running)"""
+        with self._lock:
+            if self._httpd is not None:
+                return True
+            try:
+                self._httpd = ThreadingHTTPServer((self.host, self.port), _MediaRequestHandler)
+                self._httpd.daemon_threads = True
+                self._httpd.media_server = self
+                self._thread = threading.Thread(target=self._httpd.serve_forever, name="media-server", daemon=True)
+                self._thread.start()
+                return True
+            except OSError as e:
+                print(f"Error starting media server on {self.host}:{self.port}: {e}")
+                self._httpd = None
+                return False
+
+    def stop(self):
+        """Stop the background server"""
+        with self._lock:
+            if self._httpd is not None:
+                self._httpd.shutdown()
+                self._httpd.server_close()
+                self._httpd = None
+                self._thread = None
+
+    @property
+    def running(self):
+        return self._httpd is not None
+
+    def register(self, file_path):
+        """Register a file and return the URL it is served under"""
+        file_path = os.path.abspath(file_path)
+        with self._lock:
+            token = self._tokens.get(file_path)
+            if token is None:
+                token = secrets.token_urlsafe(16)
+                self._tokens[file_path] = token
+                self._paths[token] = file_path
+        filename = os.path.basename(file_path)
+        return f"{self.public_url}/{token}/{filename}"
+
+    def unregister(self, file_path):
+        """Stop serving a file"""
+        file_path = os.path.abspath(file_path)
+        with self._lock:
+            token = self._tokens.pop(file_path, None)
+            if token is not None:
+                self._paths.pop(token, None)
+
+    def resolve(self, token):
+        """Map a URL token back to its file path"""
+        with self._lock:
+            return self._paths.get(token)
+
+    def mime_type(self, file_path):
+        """Guess the content type for a served file"""
+        mime_type, _ = mimetypes.guess_type(file_path)
+        return mime_type or 'application/octet-stream'
+
+
+_media_server = None
+_media_server_lock = threading.Lock()
+
+
+def get_media_server():
+    """Return the process-wide media server, starting it on first use"""
+    global _media_server
+    with _media_server_lock:
+        if _media_server is None:
+            _media_server = MediaServer()
+        server = _media_server
+    server.start()
+    return server
+
+
+def unregister_media(file_path):
+    """Stop serving a file without starting the media server"""
+    with _media_server_lock:
+        server = _media_server
+    if server is not None:
+        server.unregister(file_path)
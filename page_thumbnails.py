@@ -0,0 +1,175 @@
+from PIL import Image, ImageDraw
+from reportlab.lib.enums import TA_CENTER, TA_RIGHT
+from reportlab.pdfbase import pdfmetrics
+from reportlab.platypus import Paragraph, Image as RLImage
+from config import PDF_THUMBNAIL_WIDTH, PDF_THUMBNAIL_COLORS
+from font_registry import get_font_registry
+from vector_illustration import VectorImage
+
+# Text smaller than this many pixels is drawn as a grey bar instead of unreadable glyphs
+_MIN_TEXT_PIXELS = 7
+_PAGE_GAP = 4
+
+
+class PageLayoutRecorder:
+    """Records what a ReportLab build places on each page.
+
+    Attached to a document template, it notes every image, line of text and rule
+    as it is laid out, so page previews can be drawn from the layout itself
+    instead of rasterizing the finished PDF.
+    """
+
+    def __init__(self, page_size, fonts):
+        self.page_size = page_size
+        # ReportLab font name -> style ('regular', 'bold', ...)
+        self.styles_by_font = {font_name: style for style, font_name in fonts.items()}
+        self.pages = []
+
+    def attach(self, doc):
+        """Start recording flowables as the document places them"""
+        doc.afterFlowable = lambda flowable: self.flowable_placed(doc, flowable)
+
+    def add_rule(self, page_number, x1, y1, x2, y2, color, width):
+        self._page(page_number).append({'kind': 'rule', 'points': (x1, y1, x2, y2), 'color': color, 'width': width})
+
+    def add_text(self, page_number, x, y, text, font_name, size, color, align='left'):
+        """A single line of text with its baseline at y; x is its left, centre or right edge per align"""
+        self._page(page_number).append({
+            'kind': 'text', 'x': x, 'y': y, 'text': text, 'style': self.styles_by_font.get(font_name, 'regular'),
+            'size': size, 'width': pdfmetrics.stringWidth(text, font_name, size), 'color': color, 'align': align
+        })
+
+    def flowable_placed(self, doc, flowable):
+        """afterFlowable hook: the frame's cursor sits below the flowable and its space after"""
+        frame = doc.frame
+        bottom = frame._y + flowable.getSpaceAfter()
+        left = frame._x + frame._leftExtraIndent
+
+        if isinstance(flowable, (RLImage, VectorImage)):
+            left = flowable._hAlignAdjust(left, frame._getAvailableWidth() - flowable.drawWidth)
+            self._page(doc.page).append({
+                'kind': 'image', 'x': left, 'y': bottom, 'width': flowable.drawWidth,
+                'height': flowable.drawHeight, 'path': flowable.filename
+            })
+            return
+
+        # Prewrapped paragraphs keep the laid-out Paragraph they draw
+        paragraph = getattr(flowable, '_paragraph', flowable)
+        if isinstance(paragraph, Paragraph):
+            self._add_paragraph(doc.page, paragraph, left, bottom + flowable.height)
+
+    def _add_paragraph(self, page_number, paragraph, left, top):
+        """One text entry per broken line, aligned the way the paragraph draws it"""
+        style = paragraph.style
+        block = paragraph.blPara
+        color = style.textColor.rgb()
+        line_width = paragraph.width - style.leftIndent - style.rightIndent
+        baseline = top - style.fontSize
+        for index, line in enumerate(block.lines):
+            if block.kind == 0:
+                text = ' '.join(line[1])
+                font_name = style.fontName
+            else:
+                text = ''.join(getattr(word, 'text', '') for word in line.words)
+                font_name = line.words[0].fontName if line.words else style.fontName
+
+            if style.alignment == TA_CENTER:
+                self.add_text(page_number, left + style.leftIndent + line_width / 2, baseline, text.strip(),
+                              font_name, style.fontSize, color, 'center')
+            elif style.alignment == TA_RIGHT:
+                self.add_text(page_number, left + style.leftIndent + line_width, baseline, text.strip(),
+                              font_name, style.fontSize, color, 'right')
+            else:
+                indent = style.leftIndent + (style.firstLineIndent if index == 0 else 0)
+                self.add_text(page_number, left + indent, baseline, text.strip(), font_name, style.fontSize, color)
+            baseline -= style.leading
+
+    def _page(self, page_number):
+        while len(self.pages) < page_number:
+            self.pages.append([])
+        return self.pages[page_number - 1]
+
+
+class PageThumbnailRenderer:
+    """Draws small page previews from recorded layouts"""
+
+    def __init__(self, width=PDF_THUMBNAIL_WIDTH, colors=PDF_THUMBNAIL_COLORS):
+        self.width = width
+        self.colors = colors
+        self.fonts = get_font_registry()
+
+    def render_page(self, items, page_size):
+        """Preview of one page, scaled to the thumbnail width"""
+        page_width, page_height = page_size
+        scale = self.width / page_width
+        thumbnail = Image.new('RGB', (self.width, round(page_height * scale)), (255, 255, 255))
+        draw = ImageDraw.Draw(thumbnail)
+
+        def point(x, y):
+            return x * scale, (page_height - y) * scale
+
+        for item in items:
+            if item['kind'] == 'image':
+                left, top = point(item['x'], item['y'] + item['height'])
+                size = (max(1, round(item['width'] * scale)), max(1, round(item['height'] * scale)))
+                try:
+                    with Image.open(item['path']) as source:
+                        source.draft('RGB', size)
+                        thumbnail.paste(source.convert('RGB').resize(size, Image.BILINEAR), (round(left), round(top)))
+                except Exception as e:
+                    print(f"Error drawing image {item['path']} in thumbnail: {e}")
+                    draw.rectangle([left, top, left + size[0], top + size[1]], fill=(225, 225, 225))
+            elif item['kind'] == 'rule':
+                x1, y1, x2, y2 = item['points']
+                draw.line([point(x1, y1), point(x2, y2)], fill=self._color(item['color']),
+                          width=max(1, round(item['width'] * scale)))
+            elif item['kind'] == 'text' and item['text']:
+                self._draw_text(draw, item, scale, point)
+
+        return thumbnail
+
+    def render(self, pages, page_size):
+        """Previews of all pages side by side in one image"""
+        thumbnails = [self.render_page(items, page_size) for items in pages] or [self.render_page([], page_size)]
+        strip = Image.new('RGB', (sum(t.width for t in thumbnails) + _PAGE_GAP * (len(thumbnails) - 1),
+                                  thumbnails[0].height), (255, 255, 255))
+        left = 0
+        for thumbnail in thumbnails:
+            strip.paste(thumbnail, (left, 0))
+            left += thumbnail.width + _PAGE_GAP
+        return strip
+
+    def save(self, pages, page_size, output_path):
+        """Write the previews as a small palette PNG"""
+        try:
+            self.render(pages, page_size).quantize(self.colors).save(output_path, 'PNG', optimize=True)
+            return True
+        except Exception as e:
+            print(f"Error saving page thumbnail: {e}")
+            return False
+
+    def _draw_text(self, draw, item, scale, point):
+        size = item['size'] * scale
+        x, baseline = point(item['x'], item['y'])
+        color = self._color(item['color'])
+        if size >= _MIN_TEXT_PIXELS:
+            font = self.fonts.image_font(round(size), item['style'])
+            anchor = {'center': 'ms', 'right': 'rs'}.get(item['align'], 'ls')
+            draw.text((x, baseline), item['text'], font=font, fill=color, anchor=anchor)
+            return
+
+        # Greeked line: as wide as the text, half an em tall
+        text_width = item['width'] * scale
+        if item['align'] == 'center':
+            x -= text_width / 2
+        elif item['align'] == 'right':
+            x -= text_width
+        bar_height = max(1, size * 0.5)
+        draw.rectangle([x, baseline - bar_height, x + text_width, baseline], fill=self._blend(color))
+
+    def _color(self, rgb):
+        return tuple(round(channel * 255) for channel in rgb)
+
+    def _blend(self, color):
+        """Lighten greeked text so blocks of it read as grey rather than solid ink"""
+        return tuple(round(channel + (255 - channel) * 0.45) for channel in color)
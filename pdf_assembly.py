@@ -0,0 +1,180 @@
+import hashlib
+from collections import deque
+from decimal import Decimal
+import pikepdf
+
+# Page attributes a page may inherit from its ancestors in the page tree
+_INHERITABLE_PAGE_KEYS = ('/Resources', '/MediaBox', '/CropBox', '/Rotate')
+
+
+class StreamingPDFWriter:
+    """Writes a PDF object by object straight to disk.
+
+    Pages are copied from existing PDFs (e.g. ReportLab part files) one part at a
+    time: objects are serialised as they are reached and stream data is copied
+    raw, one stream at a time, so memory stays bounded by the largest single
+    object rather than by the size of the combined document.
+
+    Self-contained streams are hashed by content, and repeats across parts
+    (the same illustration or placeholder in several books of an anthology,
+    identical embedded font files) point at the first copy instead of being
+    written again.
+    """
+
+    def __init__(self, output_file):
+        self.out = output_file
+        self.offsets = {}
+        self.next_number = 1
+        self.page_numbers = []
+        self.streams_by_digest = {}
+        self.stats = {'images': 0, 'duplicate_images': 0, 'duplicate_streams': 0, 'bytes_saved': 0}
+        self.catalog_number = self._reserve()
+        self.pages_number = self._reserve()
+        self.out.write(b'%PDF-1.4\n%\xe2\xe3\xcf\xd3\n')
+
+    def append_pdf(self, pdf_path):
+        """Append every page of a PDF file"""
+        with pikepdf.open(pdf_path) as source:
+            self._copy_pages(source)
+
+    def close(self, info=None):
+        """Write the page tree, catalog, document info and cross-reference table"""
+        kids = b' '.join(b'%d 0 R' % number for number in self.page_numbers)
+        self._write_object(self.pages_number,
+                           b'<< /Type /Pages /Count %d /Kids [%s] >>' % (len(self.page_numbers), kids))
+        self._write_object(self.catalog_number,
+                           b'<< /Type /Catalog /Pages %d 0 R >>' % self.pages_number)
+
+        trailer_info = b''
+        if info:
+            info_number = self._reserve()
+            entries = b' '.join(pikepdf.Name(key).unparse() + b' ' + pikepdf.String(str(value)).unparse()
+                                for key, value in info.items())
+            self._write_object(info_number, b'<< ' + entries + b' >>')
+            trailer_info = b' /Info %d 0 R' % info_number
+
+        xref_offset = self.out.tell()
+        self.out.write(b'xref\n0 %d\n0000000000 65535 f \n' % self.next_number)
+        for number in range(1, self.next_number):
+            self.out.write(b'%010d 00000 n \n' % self.offsets[number])
+        self.out.write(b'trailer\n<< /Size %d /Root %d 0 R%s >>\nstartxref\n%d\n%%%%EOF\n'
+                       % (self.next_number, self.catalog_number, trailer_info, xref_offset))
+
+    def _reserve(self):
+        number = self.next_number
+        self.next_number += 1
+        return number
+
+    def _write_object(self, number, body, stream_data=None):
+        self.offsets[number] = self.out.tell()
+        self.out.write(b'%d 0 obj\n' % number)
+        self.out.write(body)
+        if stream_data is not None:
+            self.out.write(b'\nstream\n')
+            self.out.write(stream_data)
+            self.out.write(b'\nendstream')
+        self.out.write(b'\nendobj\n')
+
+    def _copy_pages(self, source):
+        """Copy a source document's pages and everything they reference"""
+        numbers = {}
+        pending = deque()
+
+        def reference(obj):
+            key = obj.objgen
+            if key not in numbers:
+                digest, raw = self._stream_digest(obj, serialize_dict)
+                is_image = digest is not None and obj.stream_dict.get('/Subtype') == pikepdf.Name.Image
+                if digest is not None and digest in self.streams_by_digest:
+                    numbers[key] = self.streams_by_digest[digest]
+                    self.stats['duplicate_images' if is_image else 'duplicate_streams'] += 1
+                    self.stats['bytes_saved'] += len(raw)
+                else:
+                    numbers[key] = self._reserve()
+                    if digest is not None:
+                        self.streams_by_digest[digest] = numbers[key]
+                        if is_image:
+                            self.stats['images'] += 1
+                    pending.append((obj, raw))
+            return b'%d 0 R' % numbers[key]
+
+        def serialize(value):
+            if isinstance(value, pikepdf.Object):
+                if value.is_indirect:
+                    return reference(value)
+                if isinstance(value, pikepdf.Dictionary):
+                    return serialize_dict(value)
+                if isinstance(value, pikepdf.Array):
+                    return serialize_array(value)
+                return value.unparse()
+            if isinstance(value, bool):
+                return b'true' if value else b'false'
+            if isinstance(value, int):
+                return b'%d' % value
+            if isinstance(value, (float, Decimal)):
+                return format(value, 'f').encode('ascii')
+            if value is None:
+                return b'null'
+            raise TypeError(f"Cannot serialize PDF value of type {type(value).__name__}")
+
+        def serialize_array(array):
+            return b'[' + b' '.join(serialize(item) for item in array) + b']'
+
+        def serialize_dict(dictionary, skip=(), extra=b''):
+            entries = [pikepdf.Name(key).unparse() + b' ' + serialize(dictionary.get(key))
+                       for key in dictionary.keys() if key not in skip]
+            return b'<< ' + b' '.join(entries) + extra + b' >>'
+
+        for page in source.pages:
+            page_obj = page.obj
+            inherited = b''
+            for key in _INHERITABLE_PAGE_KEYS:
+                if key not in page_obj:
+                    value = self._inherited_value(page_obj, key)
+                    if value is not None:
+                        inherited += b' ' + pikepdf.Name(key).unparse() + b' ' + serialize(value)
+
+            page_number = self._reserve()
+            numbers[page_obj.objgen] = page_number
+            self.page_numbers.append(page_number)
+            self._write_object(page_number, serialize_dict(
+                page_obj, skip=('/Parent',),
+                extra=inherited + b' /Parent %d 0 R' % self.pages_number
+            ))
+
+            # Write everything this page references before moving on
+            while pending:
+                obj, raw = pending.popleft()
+                number = numbers[obj.objgen]
+                if isinstance(obj, pikepdf.Stream):
+                    if raw is None:
+                        raw = obj.read_raw_bytes()
+                    body = serialize_dict(obj.stream_dict, skip=('/Length',), extra=b' /Length %d' % len(raw))
+                    self._write_object(number, body, raw)
+                elif isinstance(obj, pikepdf.Dictionary):
+                    self._write_object(number, serialize_dict(obj))
+                elif isinstance(obj, pikepdf.Array):
+                    self._write_object(number, serialize_array(obj))
+                else:
+                    self._write_object(number, obj.unparse())
+
+    def _stream_digest(self, obj, serialize_dict):
+        """Content hash of a self-contained stream, with its raw data; (None, None) otherwise"""
+        if not isinstance(obj, pikepdf.Stream):
+            return None, None
+        stream_dict = obj.stream_dict
+        if any(isinstance(stream_dict.get(key), pikepdf.Object) and stream_dict.get(key).is_indirect
+               for key in stream_dict.keys()):
+            # Soft masks and other referenced parts would need hashing too; keep it simple
+            return None, None
+        raw = obj.read_raw_bytes()
+        digest = hashlib.sha256(serialize_dict(stream_dict, skip=('/Length',)) + raw).hexdigest()
+        return digest, raw
+
+    def _inherited_value(self, page_obj, key):
+        parent = page_obj.get('/Parent')
+        while parent is not None:
+            if key in parent:
+                return parent.get(key)
+            parent = parent.get('/Parent')
+        return None
@@ -1,5 +1,5 @@
 from reportlab.lib.pagesizes import letter, A4
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Image as RLImage, PageBreak
+from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Image as RLImage, PageBreak, Flowable
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib.units import inch, mm
 from reportlab.lib.colors import HexColor, Color
@@ -8,23 +8,109 @@ from reportlab.pdfgen import canvas
 from reportlab.lib import utils
 from reportlab.pdfbase import pdfmetrics
 from reportlab.pdfbase.ttfonts import TTFont
+from reportlab import rl_config
+from PIL import Image as PILImage, ImageCms
+import pikepdf
 import os
 import io
+import copy
+import time
+import threading
+import hashlib
+import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from config import PDF_STREAM_CHUNK_PAGES, PDF_STREAM_THRESHOLD_PAGES, PDF_PROFILES, DEFAULT_PDF_PROFILE, PDF_BATCH_WORKERS
+from pdf_assembly import StreamingPDFWriter
+from font_registry import get_font_registry
+from page_thumbnails import PageLayoutRecorder, PageThumbnailRenderer
+from image_encoding import encode_image, pdf_image_encoding
+from vector_illustration import VectorImage, load_vector
+
+# Write streams as binary; ASCII85 wrapping makes every image about a quarter larger
+rl_config.useA85 = 0
+
+# Glyphs every fragment's font subsets start with, so separately built fragments
+# embed identical font files that are stored once when the book is assembled
+_FRAGMENT_GLYPHS = (''.join(chr(code) for code in range(32, 127)) +
+                    ''.join(chr(code) for code in range(0xA1, 0x100)) +
+                    '\u2018\u2019\u201c\u201d\u2013\u2014\u2026\u2022')
+
+
+class _PrewrappedParagraph(Flowable):
+    """A fixed paragraph parsed and line-broken once per frame width, then reused by every book"""
+    
+    _layouts = {}
+    _layouts_lock = threading.Lock()
+    
+    def __init__(self, text, style, version):
+        Flowable.__init__(self)
+        self.text = text
+        self.style = style
+        self.version = version
+        self._paragraph = None
+    
+    def wrap(self, availWidth, availHeight):
+        # The face's file as well as its name: the font registry may register a different family under the same name
+        font_file = getattr(pdfmetrics.getFont(self.style.fontName).face, 'filename', None)
+        key = (self.version, self.style.name, self.style.fontName, font_file, self.text, round(availWidth, 2))
+        with self._layouts_lock:
+            layout = self._layouts.get(key)
+        if layout is None:
+            paragraph = Paragraph(self.text, self.style)
+            width, height = paragraph.wrap(availWidth, availHeight)
+            layout = (paragraph, width, height)
+            with self._layouts_lock:
+                self._layouts[key] = layout
+        
+        # Shallow copy: the broken lines are shared, drawing state is per instance
+        paragraph, self.width, self.height = layout
+        self._paragraph = copy.copy(paragraph)
+        return self.width, self.height
+    
+    def split(self, availWidth, availHeight):
+        # Too tall for the frame: split as a plain Paragraph would; the parts are laid out afresh
+        return Paragraph(self.text, self.style).split(availWidth, availHeight)
+    
+    def getSpaceBefore(self):
+        return self.style.spaceBefore
+    
+    def getSpaceAfter(self):
+        return self.style.spaceAfter
+    
+    def draw(self):
+        # Draw in this flowable's coordinate space so the output matches a plain Paragraph
+        self._paragraph.canv = self.canv
+        try:
+            self._paragraph.draw()
+        finally:
+            del self._paragraph.canv
 
 class ProfessionalPDFGenerator:
+    # Bump whenever layout or styles change so cached PDFs are rebuilt
+    RENDERER_VERSION = 4
+    
     def __init__(self):
         self.styles = getSampleStyleSheet()
-        self._setup_professional_styles()
         self._setup_custom_fonts()
+        self._setup_professional_styles()
+        self._begin_document(DEFAULT_PDF_PROFILE)
+        self.last_build_report = None
+        self.thumbnail_renderer = PageThumbnailRenderer()
     
     def _setup_custom_fonts(self):
         """Setup custom fonts for professional appearance"""
         try:
-            # Try to register custom fonts if available
-            # Fallback to default fonts if custom fonts not found
-            pass
-        except:
-            pass
+            # Registered once per process and shared by every generator; embedded as subsets
+            self.fonts = get_font_registry().pdf_fonts()
+        except Exception as e:
+            print(f"Error setting up custom fonts: {e}")
+            self.fonts = {
+                'regular': 'Helvetica',
+                'bold': 'Helvetica-Bold',
+                'italic': 'Helvetica-Oblique',
+                'bold_italic': 'Helvetica-BoldOblique'
+            }
     
     def _setup_professional_styles(self):
         """Setup professional paragraph styles for the storybook"""
@@ -37,7 +123,7 @@ class ProfessionalPDFGenerator:
             textColor=HexColor('#2E86AB'),
             spaceAfter=30,
             alignment=TA_CENTER,
-            fontName='Helvetica-Bold',
+            fontName=self.fonts['bold'],
             leading=40,
             spaceBefore=20
         )
@@ -50,7 +136,7 @@ class ProfessionalPDFGenerator:
             textColor=HexColor('#666666'),
             spaceAfter=25,
             alignment=TA_CENTER,
-            fontName='Helvetica',
+            fontName=self.fonts['regular'],
             leading=22
         )
         
@@ -62,7 +148,7 @@ class ProfessionalPDFGenerator:
             textColor=HexColor('#2C3E50'),
             spaceAfter=20,
             alignment=TA_JUSTIFY,
-            fontName='Helvetica',
+            fontName=self.fonts['regular'],
             leading=24,
             firstLineIndent=20,
             leftIndent=20,
@@ -77,7 +163,7 @@ class ProfessionalPDFGenerator:
             textColor=HexColor('#7F8C8D'),
             spaceAfter=15,
             alignment=TA_RIGHT,
-            fontName='Helvetica-Oblique',
+            fontName=self.fonts['italic'],
             leading=18
         )
         
@@ -89,7 +175,7 @@ class ProfessionalPDFGenerator:
             textColor=HexColor('#34495E'),
             spaceAfter=15,
             alignment=TA_LEFT,
-            fontName='Helvetica',
+            fontName=self.fonts['regular'],
             leading=20,
             leftIndent=30,
             rightIndent=30,
@@ -107,22 +193,39 @@ class ProfessionalPDFGenerator:
             textColor=HexColor('#95A5A6'),
             spaceAfter=10,
             alignment=TA_CENTER,
-            fontName='Helvetica-Oblique',
+            fontName=self.fonts['italic'],
             leading=16
         )
     
-    def create_storybook_pdf(self, story_pages, image_paths, output_filename, story_title="My Storybook", character_description=""):
+    def _create_doc_template(self, output_filename, title=""):
+        """Create the A4 document template shared by all professional layouts"""
+        # Use A4 size for better international compatibility
+        return SimpleDocTemplate(
+            output_filename,
+            pagesize=A4,
+            rightMargin=25*mm,
+            leftMargin=25*mm,
+            topMargin=30*mm,
+            bottomMargin=25*mm,
+            pageCompression=1,
+            # Otherwise every page references ReportLab's default Helvetica
+            initialFontName=self.fonts['regular'],
+            title=title,
+            creator='AI Storybook Creator'
+        )
+    
+    def create_storybook_pdf(self, story_pages, image_paths, output_filename, story_title="My Storybook", character_description="",
+                             profile=None, linearize=None):
         """Create a professional PDF storybook with crisp text and beautiful layout"""
+        if len(story_pages) > PDF_STREAM_THRESHOLD_PAGES:
+            # Long books are laid out in bounded chunks instead of one big flowable list
+            return self.create_storybook_pdf_streaming(zip(story_pages, image_paths), output_filename,
+                                                       story_title, character_description, profile=profile,
+                                                       linearize=linearize)
+        
+        self._begin_document(profile, linearize)
         try:
-            # Use A4 size for better international compatibility
-            doc = SimpleDocTemplate(
-                output_filename,
-                pagesize=A4,
-                rightMargin=25*mm,
-                leftMargin=25*mm,
-                topMargin=30*mm,
-                bottomMargin=25*mm
-            )
+            doc = self._create_doc_template(output_filename, story_title)
             
             story_content = []
             
@@ -137,16 +240,391 @@ class ProfessionalPDFGenerator:
             story_content.extend(self._create_professional_back_cover(story_title))
             
             # Build the PDF with professional quality
-            doc.build(story_content)
+            doc.build(story_content,
+                      onFirstPage=self._add_professional_headers_footers,
+                      onLaterPages=self._add_professional_headers_footers)
             
             # Apply additional professional enhancements
             self._apply_professional_enhancements(output_filename)
             
+            self._finish_document(output_filename)
             return True
             
         except Exception as e:
             print(f"Error creating professional PDF: {e}")
             return False
+        finally:
+            self._cleanup_document()
+    
+    def create_storybook_pdf_streaming(self, pages, output_filename, story_title="My Storybook", character_description="",
+                                       chunk_pages=PDF_STREAM_CHUNK_PAGES, profile=None, linearize=None):
+        """Create a storybook from an iterable of (page_text, image_path) pairs with bounded memory"""
+        book = {'title': story_title, 'character_description': character_description, 'pages': pages}
+        return self.create_anthology_pdf([book], output_filename, chunk_pages, document_title=story_title, profile=profile,
+                                         linearize=linearize)
+    
+    def create_anthology_pdf(self, books, output_filename, chunk_pages=PDF_STREAM_CHUNK_PAGES, document_title="Storybook Collection",
+                             profile=None, linearize=None):
+        """Compile books into one PDF, laying out a chunk of pages at a time.
+        
+        ``books`` is an iterable of dicts with 'title', optional 'character_description'
+        and 'pages' (an iterable of (page_text, image_path) pairs). Pages are consumed
+        lazily and each chunk is laid out as a small part file whose pages are then
+        streamed into the output, so only the current chunk's flowables and images
+        are ever held in memory and the output grows as the book is built.
+        """
+        output_dir = os.path.dirname(os.path.abspath(output_filename))
+        part_dir = tempfile.mkdtemp(prefix="pdf_parts_", dir=output_dir)
+        part_path = os.path.join(part_dir, "part.pdf")
+        self._begin_document(profile, linearize)
+        try:
+            with open(output_filename, 'wb') as output_file:
+                writer = StreamingPDFWriter(output_file)
+                for flowables in self._iter_anthology_chunks(books, chunk_pages):
+                    # Lay out one chunk, then stream its pages into the output right away;
+                    # images already written by an earlier part are shared, not copied again
+                    self._create_doc_template(part_path).build(
+                        flowables,
+                        onFirstPage=self._add_professional_headers_footers,
+                        onLaterPages=self._add_professional_headers_footers
+                    )
+                    writer.append_pdf(part_path)
+                writer.close(info={
+                    '/Title': document_title,
+                    '/Creator': 'AI Storybook Creator'
+                })
+            
+            # Apply additional professional enhancements
+            self._apply_professional_enhancements(output_filename)
+            
+            self._finish_document(output_filename)
+            return True
+            
+        except Exception as e:
+            print(f"Error creating streamed PDF: {e}")
+            return False
+        finally:
+            shutil.rmtree(part_dir, ignore_errors=True)
+            self._cleanup_document()
+    
+    def create_title_fragment(self, title, character_description, output_filename, profile=None, thumbnail_path=None):
+        """Lay out the title page as a standalone PDF fragment"""
+        content = self._create_professional_title_page(title, character_description)
+        return self._build_fragment(content, output_filename, profile, title, thumbnail_path)
+    
+    def create_page_fragment(self, page_text, image_path, page_number, output_filename, profile=None, thumbnail_path=None,
+                             vector_path=None):
+        """Lay out one story page as a standalone PDF fragment.
+        
+        Fragments depend only on their own page, so they can be cached and
+        reassembled with assemble_fragments when other pages change.
+        With ``thumbnail_path``, a small PNG preview of the page is drawn from
+        the same layout pass. With ``vector_path`` (see save_vector), the
+        illustration is drawn as vector shapes instead of placing image_path.
+        """
+        content = self._create_professional_story_page(page_text, image_path, page_number, page_number, vector_path)
+        return self._build_fragment(content, output_filename, profile, thumbnail_path=thumbnail_path)
+    
+    def create_back_cover_fragment(self, title, output_filename, profile=None, thumbnail_path=None):
+        """Lay out the back cover as a standalone PDF fragment"""
+        content = self._create_professional_back_cover(title)
+        return self._build_fragment(content, output_filename, profile, title, thumbnail_path)
+    
+    def assemble_fragments(self, fragment_paths, output_filename, title="My Storybook", profile=None, linearize=None):
+        """Join PDF fragments into a book and apply the profile's finishing pass.
+        
+        Pages are copied as they are, so no layout happens here; images repeated
+        across fragments are written once.
+        """
+        self._begin_document(profile, linearize)
+        try:
+            with open(output_filename, 'wb') as output_file:
+                writer = StreamingPDFWriter(output_file)
+                for fragment_path in fragment_paths:
+                    writer.append_pdf(fragment_path)
+                writer.close(info={
+                    '/Title': title,
+                    '/Creator': 'AI Storybook Creator'
+                })
+            self.last_image_stats = {
+                'images': writer.stats['images'],
+                'duplicate_images': writer.stats['duplicate_images']
+            }
+            
+            # Apply additional professional enhancements
+            self._apply_professional_enhancements(output_filename)
+            
+            self._finish_document(output_filename)
+            return True
+            
+        except Exception as e:
+            print(f"Error assembling PDF fragments: {e}")
+            return False
+        finally:
+            self._cleanup_document()
+    
+    def _build_fragment(self, content, output_filename, profile=None, title="", thumbnail_path=None):
+        """Lay out flowables as a standalone fragment; finishing passes wait for assembly"""
+        self._begin_document(profile, linearize=False)
+        try:
+            doc = self._create_doc_template(output_filename, title)
+            if thumbnail_path:
+                # Note where everything lands so the preview needs no second rendering pass
+                self._layout_recorder = PageLayoutRecorder(doc.pagesize, self.fonts)
+                self._layout_recorder.attach(doc)
+            doc.build(self._strip_page_breaks(content),
+                      onFirstPage=self._start_fragment,
+                      onLaterPages=self._add_professional_headers_footers)
+            
+            if self._layout_recorder:
+                # Drawn before cleanup, while the profile's prepared images still exist
+                self.thumbnail_renderer.save(self._layout_recorder.pages, doc.pagesize, thumbnail_path)
+            
+            self._finish_document(output_filename)
+            return True
+            
+        except Exception as e:
+            print(f"Error creating PDF fragment: {e}")
+            return False
+        finally:
+            self._cleanup_document()
+    
+    def _start_fragment(self, pdf_canvas, doc):
+        """First-page callback for fragments: fix the font subsets' contents, then draw as usual"""
+        for font_name in set(self.fonts.values()):
+            font = pdfmetrics.getFont(font_name)
+            if isinstance(font, TTFont):
+                # Assigns the glyphs in a fixed order; fonts the page never uses are not embedded
+                font.splitString(_FRAGMENT_GLYPHS, pdf_canvas._doc)
+        self._add_professional_headers_footers(pdf_canvas, doc)
+    
+    def render_batch(self, books, workers=PDF_BATCH_WORKERS, profile=None):
+        """Render many books to separate PDFs across a pool of worker processes.
+        
+        ``books`` is a list of dicts with 'output_filename', 'pages', 'image_paths' and
+        optionally 'title', 'character_description', 'profile' and 'linearize'. Books travel to the
+        workers as text and file paths and come back as output paths, so no image data
+        is pickled. Each worker builds one generator (styles, fonts, cached layouts)
+        when it starts and reuses it for every book it renders.
+        
+        Returns per-book results in input order, plus aggregate throughput.
+        """
+        specs = [dict(book, profile=book.get('profile') or profile) for book in books]
+        results = [None] * len(specs)
+        started = time.perf_counter()
+        
+        workers = max(1, min(workers or 1, len(specs)))
+        if workers == 1:
+            # Not worth starting processes for; render here with this generator
+            for index, spec in enumerate(specs):
+                results[index] = _render_book(self, spec)
+        else:
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_batch_worker) as pool:
+                futures = {pool.submit(_render_batch_book, spec): index for index, spec in enumerate(specs)}
+                for future in as_completed(futures):
+                    index = futures[future]
+                    try:
+                        results[index] = future.result()
+                    except Exception as e:
+                        print(f"Error rendering {specs[index]['output_filename']} in batch: {e}")
+                        results[index] = {
+                            'output_filename': specs[index]['output_filename'],
+                            'success': False,
+                            'pages': len(specs[index]['pages']),
+                            'bytes': 0,
+                            'seconds': 0.0,
+                            'pages_per_second': 0.0,
+                            'report': None
+                        }
+        
+        wall_seconds = time.perf_counter() - started
+        rendered = [result for result in results if result['success']]
+        pages = sum(result['pages'] for result in rendered)
+        busy_seconds = sum(result['seconds'] for result in results)
+        return {
+            'books': results,
+            'workers': workers,
+            'succeeded': len(rendered),
+            'failed': len(results) - len(rendered),
+            'pages': pages,
+            'bytes': sum(result['bytes'] for result in rendered),
+            'wall_seconds': round(wall_seconds, 3),
+            'books_per_second': round(len(rendered) / wall_seconds, 2) if wall_seconds else 0.0,
+            'pages_per_second': round(pages / wall_seconds, 2) if wall_seconds else 0.0,
+            # Time spent inside book renders, summed over workers
+            'worker_seconds': round(busy_seconds, 3)
+        }
+    
+    def _iter_anthology_chunks(self, books, chunk_pages):
+        """Yield lists of flowables, each laid out as its own part file"""
+        for book in books:
+            title = book['title']
+            yield self._strip_page_breaks(self._create_professional_title_page(title, book.get('character_description', '')))
+            
+            chunk = []
+            chunk_count = 0
+            for page_number, (page_text, image_path) in enumerate(book['pages'], 1):
+                if chunk:
+                    chunk.append(PageBreak())
+                # Passing page_number as the total keeps the page from adding its own break
+                chunk.extend(self._create_professional_story_page(page_text, image_path, page_number, page_number))
+                chunk_count += 1
+                if chunk_count == chunk_pages:
+                    yield chunk
+                    chunk = []
+                    chunk_count = 0
+            if chunk:
+                yield chunk
+            
+            yield self._strip_page_breaks(self._create_professional_back_cover(title))
+    
+    def _begin_document(self, profile=None, linearize=None):
+        """Select the output profile and start a new document's image tables.
+        
+        ``linearize`` overrides the profile's fast web view setting when not None.
+        """
+        profile_name = profile or DEFAULT_PDF_PROFILE
+        if profile_name not in PDF_PROFILES:
+            print(f"Unknown PDF profile '{profile_name}', using '{DEFAULT_PDF_PROFILE}'")
+            profile_name = DEFAULT_PDF_PROFILE
+        self.profile_name = profile_name
+        self.profile = PDF_PROFILES[profile_name]
+        self.linearize = self.profile['linearize'] if linearize is None else linearize
+        
+        # JPEG content digest -> first path seen with that content
+        self._image_paths_by_digest = {}
+        # (path, placed size) -> image file encoded for the profile
+        self._prepared_images = {}
+        self._image_work_dir = None
+        self._layout_recorder = None
+        self.last_image_stats = {'images': 0, 'duplicate_images': 0}
+        self._build_started = time.perf_counter()
+    
+    def _finish_document(self, output_filename):
+        """Record the finished document's size and build time"""
+        self.last_build_report = {
+            'profile': self.profile_name,
+            'linearized': self.linearize,
+            'bytes': os.path.getsize(output_filename),
+            'build_seconds': round(time.perf_counter() - self._build_started, 3),
+            **self.last_image_stats
+        }
+    
+    def _cleanup_document(self):
+        """Remove images prepared for the document that was just built"""
+        if self._image_work_dir:
+            shutil.rmtree(self._image_work_dir, ignore_errors=True)
+            self._image_work_dir = None
+        self._prepared_images = {}
+        self._layout_recorder = None
+    
+    def _prepare_image(self, image_path, width, height):
+        """Return an image file encoded for the active profile at its placed size, deduplicated if it is JPEG"""
+        key = (image_path, round(width), round(height))
+        if key not in self._prepared_images:
+            prepared_path = self._encode_image(image_path, width, height)
+            self.last_image_stats['images'] += 1
+            self._prepared_images[key] = self._canonical_jpeg_path(prepared_path)
+        return self._prepared_images[key]
+    
+    def _encode_image(self, image_path, width, height):
+        """Resample and re-encode an image according to the profile's DPI and format"""
+        profile = self.profile
+        try:
+            with PILImage.open(image_path) as source:
+                source.load()
+                image = source
+                
+                target_size = None
+                if profile['image_dpi']:
+                    target_size = (max(1, round(width / inch * profile['image_dpi'])),
+                                   max(1, round(height / inch * profile['image_dpi'])))
+                    downsampling = target_size[0] < image.width or target_size[1] < image.height
+                    if not downsampling and not profile['upsample']:
+                        target_size = None
+                
+                needs_flatten = image.mode not in ('RGB', 'L')
+                if target_size is None and not needs_flatten and profile['image_format'] in (source.format, 'PNG'):
+                    # Already in the right shape; ReportLab stores it losslessly as is
+                    return image_path
+                
+                if needs_flatten:
+                    # Alpha is not allowed in archival files and JPEG has none; composite onto white
+                    rgba = image.convert('RGBA')
+                    image = PILImage.new('RGB', rgba.size, (255, 255, 255))
+                    image.paste(rgba, mask=rgba.split()[3])
+                if target_size is not None and target_size != image.size:
+                    image = image.resize(target_size, PILImage.LANCZOS)
+                
+                encoded_format = profile['image_format']
+                if encoded_format in ('JPEG', 'auto'):
+                    encoded, _ = encode_image(image, pdf_image_encoding(profile))
+                if encoded_format == 'auto':
+                    # Flat illustrations often compress better losslessly than as JPEG; a default-level PNG
+                    # is about the size of the Flate stream ReportLab will write for it
+                    lossless = io.BytesIO()
+                    image.save(lossless, 'PNG')
+                    if lossless.tell() < len(encoded):
+                        encoded = lossless.getvalue()
+                        encoded_format = 'PNG'
+                    else:
+                        encoded_format = 'JPEG'
+                elif encoded_format != 'JPEG':
+                    encoded, _ = encode_image(image, pdf_image_encoding(profile))
+                
+                if encoded_format != 'JPEG' and target_size is None and not needs_flatten:
+                    return image_path
+                
+                if self._image_work_dir is None:
+                    self._image_work_dir = tempfile.mkdtemp(prefix="pdf_images_")
+                extension = 'jpg' if encoded_format == 'JPEG' else 'png'
+                output_path = os.path.join(self._image_work_dir, f"{len(self._prepared_images)}.{extension}")
+                with open(output_path, 'wb') as f:
+                    f.write(encoded)
+                return output_path
+        except Exception as e:
+            print(f"Error preparing image {image_path} for the {self.profile_name} profile: {e}")
+            return image_path
+    
+    def _canonical_jpeg_path(self, image_path):
+        """Return the first JPEG file seen with the same content in this document.
+        
+        ReportLab embeds JPEG files as they are and shares one XObject per file
+        name, so mapping identical JPEGs (fallback placeholders, reused
+        illustrations) to a single path embeds them once. Other images are
+        decoded and already shared by content, so they are left alone.
+        """
+        try:
+            with open(image_path, 'rb') as f:
+                if f.read(2) != b'\xff\xd8':
+                    return image_path
+        except OSError as e:
+            print(f"Error reading image {image_path}: {e}")
+            return image_path
+        
+        try:
+            digest = hashlib.sha256()
+            with open(image_path, 'rb') as f:
+                for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                    digest.update(chunk)
+        except OSError as e:
+            print(f"Error hashing image {image_path}: {e}")
+            return image_path
+        
+        key = digest.hexdigest()
+        if key in self._image_paths_by_digest:
+            self.last_image_stats['duplicate_images'] += 1
+            return self._image_paths_by_digest[key]
+        self._image_paths_by_digest[key] = image_path
+        return image_path
+    
+    def _strip_page_breaks(self, content):
+        """Remove leading and trailing page breaks, which would add blank pages to a part"""
+        while content and isinstance(content[0], PageBreak):
+            content = content[1:]
+        while content and isinstance(content[-1], PageBreak):
+            content = content[:-1]
+        return content
     
     def _create_professional_title_page(self, title, character_description):
         """Create a professional title page"""
@@ -160,7 +638,7 @@ class ProfessionalPDFGenerator:
         content.append(title_para)
         
         # Add subtitle
-        subtitle = Paragraph("A Magical Children's Story", self.subtitle_style)
+        subtitle = self._static_paragraph("A Magical Children's Story", self.subtitle_style)
         content.append(subtitle)
         
         # Add decorative separator
@@ -178,7 +656,7 @@ class ProfessionalPDFGenerator:
         <b>Created with AI Storybook Creator</b><br/>
         Powered by Gemini AI and Professional Design
         """
-        author_para = Paragraph(author_info, self.decorative_style)
+        author_para = self._static_paragraph(author_info, self.decorative_style)
         content.append(author_para)
         
         # Add page break
@@ -186,7 +664,7 @@ class ProfessionalPDFGenerator:
         
         return content
     
-    def _create_professional_story_page(self, page_text, image_path, page_number, total_pages):
+    def _create_professional_story_page(self, page_text, image_path, page_number, total_pages, vector_path=None):
         """Create a single professional story page"""
         content = []
         
@@ -202,7 +680,10 @@ class ProfessionalPDFGenerator:
                 img_height = 3.5*inch
                 
                 # Create professional image with caption
-                img = RLImage(image_path, width=img_width, height=img_height)
+                if vector_path and os.path.exists(vector_path):
+                    img = VectorImage(load_vector(vector_path), img_width, img_height, filename=image_path)
+                else:
+                    img = RLImage(self._prepare_image(image_path, img_width, img_height), width=img_width, height=img_height)
                 content.append(img)
                 content.append(Spacer(1, 15*mm))
                 
@@ -260,7 +741,7 @@ class ProfessionalPDFGenerator:
         content.append(Spacer(1, 40*mm))
         
         # Add back cover title
-        back_title = Paragraph("The End", self.title_style)
+        back_title = self._static_paragraph("The End", self.title_style)
         content.append(back_title)
         
         content.append(Spacer(1, 30*mm))
@@ -281,57 +762,120 @@ class ProfessionalPDFGenerator:
         <b>Thank you for reading!</b><br/>
         May your imagination continue to soar and your adventures never end.
         """
-        closing_para = Paragraph(closing_text, self.decorative_style)
+        closing_para = self._static_paragraph(closing_text, self.decorative_style)
         content.append(closing_para)
         
         return content
     
+    def _static_paragraph(self, text, style):
+        """Paragraph whose text never changes between books, laid out once and reused"""
+        return _PrewrappedParagraph(text, style, self.RENDERER_VERSION)
+    
     def _apply_professional_enhancements(self, pdf_filename):
         """Apply additional professional enhancements to the PDF"""
         try:
-            # This method can be used to add watermarks, headers, footers, etc.
-            # For now, we'll focus on the content quality
-            pass
+            # Headers and footers are drawn while pages are laid out; what remains
+            # is the active profile's pass over the finished file
+            self._optimize_pdf_quality(pdf_filename)
         except Exception as e:
             print(f"Error applying professional enhancements: {e}")
     
-    def create_enhanced_storybook_pdf(self, story_pages, image_paths, output_filename, story_title, character_description):
-        """Create an enhanced version with additional professional features"""
+    def create_enhanced_storybook_pdf(self, story_pages, image_paths, output_filename, story_title, character_description,
+                                      profile=DEFAULT_PDF_PROFILE, linearize=None):
+        """Create an enhanced version with additional professional features.
+        
+        ``profile`` names an entry of PDF_PROFILES ('screen', 'print' or 'archive').
+        ``linearize`` writes a fast web view file whose first page displays before
+        the download finishes; None follows the profile (on for screen).
+        The size and build time of the result are left in ``last_build_report``.
+        """
         try:
-            # Create the base PDF
-            success = self.create_storybook_pdf(story_pages, image_paths, output_filename, story_title, character_description)
-            
-            if success:
-                # Apply additional enhancements
-                self._add_professional_headers_footers(output_filename)
-                self._optimize_pdf_quality(output_filename)
-            
-            return success
+            return self.create_storybook_pdf(story_pages, image_paths, output_filename, story_title, character_description,
+                                             profile=profile, linearize=linearize)
             
         except Exception as e:
             print(f"Error creating enhanced PDF: {e}")
             return False
     
-    def _add_professional_headers_footers(self, pdf_filename):
-        """Add professional headers and footers to the PDF"""
+    def _add_professional_headers_footers(self, pdf_canvas, doc):
+        """Draw the running header and footer rules; used as the page callback of every layout"""
         try:
-            # This would add running headers and footers
-            # Implementation depends on specific requirements
-            pass
+            page_width, page_height = doc.pagesize
+            left = doc.leftMargin
+            right = page_width - doc.rightMargin
+            header_y = page_height - doc.topMargin + 8*mm
+            footer_y = doc.bottomMargin - 8*mm
+            
+            pdf_canvas.saveState()
+            pdf_canvas.setStrokeColor(HexColor('#2E86AB'))
+            pdf_canvas.setLineWidth(0.5)
+            pdf_canvas.line(left, header_y, right, header_y)
+            pdf_canvas.line(left, footer_y, right, footer_y)
+            
+            # No titles or page counts, so chunked parts of a book look the same as a single build
+            pdf_canvas.setFont(self.fonts['italic'], 9)
+            pdf_canvas.setFillColor(HexColor('#95A5A6'))
+            pdf_canvas.drawCentredString(page_width / 2, footer_y - 5*mm, "AI Storybook Creator")
+            pdf_canvas.restoreState()
+            
+            if self._layout_recorder:
+                page_number = pdf_canvas.getPageNumber()
+                for y in (header_y, footer_y):
+                    self._layout_recorder.add_rule(page_number, left, y, right, y, HexColor('#2E86AB').rgb(), 0.5)
+                self._layout_recorder.add_text(page_number, page_width / 2, footer_y - 5*mm, "AI Storybook Creator",
+                                               self.fonts['italic'], 9, HexColor('#95A5A6').rgb(), 'center')
         except Exception as e:
             print(f"Error adding headers/footers: {e}")
     
     def _optimize_pdf_quality(self, pdf_filename):
-        """Optimize PDF quality for professional printing"""
+        """Run the active profile's pass over the finished PDF (object streams, linearization, archival metadata)"""
+        profile = self.profile
+        if not profile['object_streams'] and not profile['archival'] and not self.linearize:
+            return
         try:
-            # This would optimize the PDF for high-quality printing
-            # Implementation depends on specific requirements
-            pass
+            with pikepdf.open(pdf_filename, allow_overwriting_input=True) as pdf:
+                if profile['archival']:
+                    self._add_archival_metadata(pdf)
+                # Leave image and page streams as encoded; only the object layout changes
+                pdf.save(
+                    pdf_filename,
+                    object_stream_mode=(pikepdf.ObjectStreamMode.generate if profile['object_streams']
+                                        else pikepdf.ObjectStreamMode.disable),
+                    stream_decode_level=pikepdf.StreamDecodeLevel.none,
+                    recompress_flate=False,
+                    linearize=self.linearize
+                )
         except Exception as e:
             print(f"Error optimizing PDF quality: {e}")
     
-    def create_print_ready_pdf(self, story_pages, image_paths, output_filename, story_title, character_description):
+    def _add_archival_metadata(self, pdf):
+        """Add XMP metadata and an sRGB output intent, as PDF/A expects.
+        
+        PDF/A conformance is not declared, since the fonts fall back to the
+        unembedded Helvetica family when no TrueType files are installed.
+        """
+        # /Trapped has no XMP counterpart and would only be dropped with a warning
+        if '/Trapped' in pdf.docinfo:
+            del pdf.docinfo['/Trapped']
+        with pdf.open_metadata(set_pikepdf_as_editor=False) as metadata:
+            metadata.load_from_docinfo(pdf.docinfo)
+            metadata['xmp:CreatorTool'] = 'AI Storybook Creator'
+        
+        icc_profile = ImageCms.ImageCmsProfile(ImageCms.createProfile('sRGB')).tobytes()
+        icc_stream = pdf.make_stream(icc_profile)
+        icc_stream['/N'] = 3
+        output_intent = pikepdf.Dictionary(
+            Type=pikepdf.Name.OutputIntent,
+            S=pikepdf.Name.GTS_PDFA1,
+            OutputConditionIdentifier=pikepdf.String('sRGB IEC61966-2.1'),
+            DestOutputProfile=icc_stream
+        )
+        pdf.Root.OutputIntents = pikepdf.Array([pdf.make_indirect(output_intent)])
+    
+    def create_print_ready_pdf(self, story_pages, image_paths, output_filename, story_title, character_description,
+                               profile='print'):
         """Create a print-ready PDF with professional standards"""
+        self._begin_document(profile)
         try:
             # Use higher resolution and print-optimized settings
             doc = SimpleDocTemplate(
@@ -354,12 +898,16 @@ class ProfessionalPDFGenerator:
             
             # Build the print-ready PDF
             doc.build(story_content)
+            self._optimize_pdf_quality(output_filename)
             
+            self._finish_document(output_filename)
             return True
             
         except Exception as e:
             print(f"Error creating print-ready PDF: {e}")
             return False
+        finally:
+            self._cleanup_document()
     
     def _create_print_title_page(self, title, character_description):
         """Create a print-optimized title page"""
@@ -404,7 +952,7 @@ class ProfessionalPDFGenerator:
                 img_width = 5.5*inch
                 img_height = 4*inch
                 
-                img = RLImage(image_path, width=img_width, height=img_height)
+                img = RLImage(self._prepare_image(image_path, img_width, img_height), width=img_width, height=img_height)
                 content.append(img)
                 
                 content.append(Spacer(1, 10*mm))
@@ -421,3 +969,43 @@ class ProfessionalPDFGenerator:
             content.append(PageBreak())
         
         return content
+
+
+# Generator owned by each batch worker process, built once by the pool initializer
+_batch_generator = None
+
+
+def _init_batch_worker():
+    """Set up styles, fonts and layout caches once per worker process"""
+    global _batch_generator
+    _batch_generator = ProfessionalPDFGenerator()
+
+
+def _render_batch_book(spec):
+    """Render one book in a batch worker"""
+    return _render_book(_batch_generator, spec)
+
+
+def _render_book(generator, spec):
+    """Render one book spec and time it"""
+    started = time.perf_counter()
+    success = generator.create_enhanced_storybook_pdf(
+        spec['pages'],
+        spec['image_paths'],
+        spec['output_filename'],
+        spec.get('title', "My Storybook"),
+        spec.get('character_description', ""),
+        profile=spec.get('profile') or DEFAULT_PDF_PROFILE,
+        linearize=spec.get('linearize')
+    )
+    seconds = time.perf_counter() - started
+    pages = len(spec['pages'])
+    return {
+        'output_filename': spec['output_filename'],
+        'success': bool(success),
+        'pages': pages,
+        'bytes': os.path.getsize(spec['output_filename']) if success else 0,
+        'seconds': round(seconds, 3),
+        'pages_per_second': round(pages / seconds, 2) if success and seconds else 0.0,
+        'report': generator.last_build_report if success else None
+    }
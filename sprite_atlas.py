@@ -0,0 +1,294 @@
+import math
+import random
+import threading
+from collections import OrderedDict, namedtuple
+from PIL import Image, ImageDraw, ImageColor
+from config import SPRITE_SUPERSAMPLE, SPRITE_CACHE_SIZE, SPRITE_LEVELS
+from vector_illustration import VectorCanvas
+
+# A pre-rendered RGBA element (a VectorCanvas in a vector atlas); anchor is where the element's own origin
+# (its centre, or the left end of a ground line) sits inside the image
+Sprite = namedtuple('Sprite', ['image', 'anchor'])
+
+
+class SpriteAtlas:
+    """Pre-rendered, anti-aliased RGBA sprites for the small repeated elements of illustrations.
+
+    Each sprite is drawn once per process at SPRITE_SUPERSAMPLE times its size
+    and downsampled, so placing a cloud, star, orb or row of grass on a page is
+    a single paste instead of a run of ImageDraw calls. Sizes are in the
+    caller's design pixels; ``scale`` gives canvas pixels per design pixel, so
+    a page drawn at a higher DPI gets the same shapes at a higher resolution.
+
+    A vector atlas records the same drawing as VectorCanvas shapes instead,
+    for illustrations embedded in PDFs as vectors.
+    """
+
+    def __init__(self, supersample=SPRITE_SUPERSAMPLE, max_sprites=SPRITE_CACHE_SIZE, levels=SPRITE_LEVELS, vector=False):
+        self.vector = vector
+        self.supersample = 1 if vector else supersample
+        self.max_sprites = max_sprites
+        self.levels = levels
+        self._sprites = OrderedDict()
+        self._lock = threading.Lock()
+
+    def sprite(self, key, build):
+        """Cached sprite for key, calling build() to render it the first time"""
+        with self._lock:
+            sprite = self._sprites.get(key)
+            if sprite is not None:
+                self._sprites.move_to_end(key)
+                return sprite
+
+        sprite = build()
+        with self._lock:
+            self._sprites[key] = sprite
+            while len(self._sprites) > self.max_sprites:
+                self._sprites.popitem(last=False)
+        return sprite
+
+    def level(self, size):
+        """Smallest pre-rendered size at least as large as size, for sprites scaled on placement"""
+        for level in self.levels:
+            if level >= size:
+                return level
+        return self.levels[-1]
+
+    def puff_cloud(self, size, variant, puffs=3, fill='#ffffff', outline='#e0e0e0', scale=1):
+        """Cloud of opaque overlapping circles; variants differ in how the puffs are arranged"""
+        def draw(draw, s):
+            rng = random.Random(f"puff-cloud:{size}:{puffs}:{variant}")
+            for _ in range(puffs):
+                cx = (extent + rng.randint(-size//3, size//3)) * s
+                cy = (extent + rng.randint(-size//4, size//4)) * s
+                radius = rng.randint(size//2, size) // 2 * s
+                draw.ellipse([cx - radius, cy - radius, cx + radius, cy + radius], fill=fill, outline=outline, width=round(s))
+
+        extent = size//3 + size//2 + 1
+        return self.sprite(('puff_cloud', size, variant, puffs, fill, outline, scale),
+                           lambda: self._render(2 * extent, 2 * extent, (extent, extent), draw, scale=scale))
+
+    def soft_cloud(self, size, variant, puffs, opacity):
+        """Translucent white cloud at a reference size; overlapping puffs get denser, as blended circles do.
+
+        Rendered at the next level up from size and scaled down when placed,
+        so a handful of sprites serve every cloud size.
+        """
+        level = self.level(size)
+
+        def build():
+            rng = random.Random(f"soft-cloud:{puffs}:{variant}")
+            s = self.supersample
+            extent = level//3 + level//2 + 1
+            circles = []
+            for _ in range(puffs):
+                cx = (extent + rng.randint(-level//3, level//3)) * s
+                cy = (extent + rng.randint(-level//4, level//4)) * s
+                radius = rng.randint(level//2, level) // 2 * s
+                circles.append([cx - radius, cy - radius, cx + radius, cy + radius])
+            if self.vector:
+                # Translucent shapes in a PDF blend the way the composited puffs do
+                canvas = VectorCanvas(2 * extent, 2 * extent)
+                for circle in circles:
+                    canvas.ellipse(circle, fill=(255, 255, 255, int(255 * opacity)))
+                return Sprite(canvas, (extent, extent))
+
+            canvas = Image.new('RGBA', (2 * extent * s, 2 * extent * s), (255, 255, 255, 0))
+            puff = Image.new('RGBA', canvas.size, (255, 255, 255, 0))
+            puff_draw = ImageDraw.Draw(puff)
+            for circle in circles:
+                puff_draw.rectangle([0, 0, canvas.width, canvas.height], fill=(255, 255, 255, 0))
+                puff_draw.ellipse(circle, fill=(255, 255, 255, int(255 * opacity)))
+                canvas = Image.alpha_composite(canvas, puff)
+            return Sprite(canvas.resize((2 * extent, 2 * extent), Image.Resampling.LANCZOS), (extent, extent))
+
+        return self._scaled(('soft_cloud', level, variant, puffs, opacity), build, level, size)
+
+    def soft_disc(self, size, opacity):
+        """Translucent white disc, scaled from the next level up"""
+        level = self.level(size)
+
+        def draw(draw, s):
+            draw.ellipse([0, 0, level * s - 1, level * s - 1], fill=(255, 255, 255, int(255 * opacity)))
+
+        return self._scaled(('soft_disc', level, opacity),
+                            lambda: self._render(level, level, (level / 2, level / 2), draw, background=(255, 255, 255, 0)),
+                            level, size)
+
+    def star(self, size, points, fill, outline, scale=1):
+        """Sparkle polygon alternating between full and half radius"""
+        step = 360 / points
+        offsets = []
+        for i in range(points):
+            angle = i * step * 3.14159 / 180
+            radius = size if i % 2 == 0 else size // 2
+            offsets.append(radius * (angle * 0.5))
+        extent = int(max(offsets)) + 2
+
+        def draw(draw, s):
+            draw.polygon([((1 + o) * s, (1 + o) * s) for o in offsets], fill=fill, outline=outline, width=round(s))
+
+        return self.sprite(('star', size, points, fill, outline, scale),
+                           lambda: self._render(extent + 2, extent + 2, (1, 1), draw, scale=scale))
+
+    def orb(self, radius, color, highlight_radius, outline_width=1, glow_radius=0, glow_strength=0.6, scale=1):
+        """Coloured orb with a white highlight, optionally inside a soft glow"""
+        extent = max(radius + outline_width, glow_radius) + 1
+
+        def draw(draw, s):
+            origin = extent * s
+            draw.ellipse([origin - radius * s, origin - radius * s, origin + radius * s, origin + radius * s],
+                         fill=color, outline='#ffffff', width=round(outline_width * s))
+            draw.ellipse([origin - highlight_radius * s, origin - highlight_radius * s,
+                          origin + highlight_radius * s, origin + highlight_radius * s], fill='#ffffff')
+
+        def build():
+            orb = self._render(2 * extent, 2 * extent, (extent, extent), draw, scale=scale)
+            if not glow_radius:
+                return orb
+            if self.vector:
+                canvas = VectorCanvas(2 * extent, 2 * extent)
+                canvas.glow(extent, extent, glow_radius, color, glow_strength)
+                canvas.place(orb.image, 0, 0)
+                return Sprite(canvas, orb.anchor)
+            glow = Image.new('RGBA', orb.image.size, ImageColor.getrgb(color) + (0,))
+            mask = Image.new('L', orb.image.size, 0)
+            glow_extent = round(glow_radius * scale)
+            mask.paste(self._glow_mask(glow_extent, glow_strength),
+                       (round(extent * scale) - glow_extent, round(extent * scale) - glow_extent))
+            glow.putalpha(mask)
+            return Sprite(Image.alpha_composite(glow, orb.image), orb.anchor)
+
+        return self.sprite(('orb', radius, color, highlight_radius, outline_width, glow_radius, glow_strength, scale),
+                           build)
+
+    def grass(self, width, step, height_range, sway, colors, line_width, variant, scale=1):
+        """A row of grass blades growing up from a ground line; anchored at the line's left end"""
+        top = height_range[1] + line_width + 1
+        left = sway + line_width + 1
+
+        def draw(draw, s):
+            rng = random.Random(f"grass:{width}:{step}:{height_range}:{sway}:{variant}")
+            for i in range(0, width, step):
+                grass_height = rng.randint(*height_range)
+                grass_color = rng.choice(colors)
+                base_x = (left + i) * s
+                draw.line([(base_x, top * s), (base_x + rng.randint(-sway, sway) * s, (top - grass_height) * s)],
+                          fill=grass_color, width=round(line_width * s))
+
+        return self.sprite(('grass', width, step, tuple(height_range), sway, tuple(colors), line_width, variant, scale),
+                           lambda: self._render(width + 2 * left, top + line_width + 1, (left, top), draw, scale=scale))
+
+    def character(self, spec, draw_parts, scale=1):
+        """Character from a spec dict, drawn with draw_parts(draw, center_x, center_y, spec) around its body centre.
+
+        Lengths in the spec are scaled up for the supersampled canvas. The sprite
+        is square around the body centre, so poses can rotate it in place.
+        """
+        def build():
+            s = self.supersample * scale
+            reach = spec['size'] // 2 + spec['head_gap'] + spec['head_radius'] + spec['head_outline']
+            extent = int(max(reach, spec['size'] * 0.71)) + 2
+            if self.vector:
+                canvas = VectorCanvas(2 * extent, 2 * extent)
+                draw_parts(canvas, extent, extent, spec)
+                return Sprite(canvas, (extent, extent))
+            canvas = Image.new('RGBA', (round(2 * extent * s), round(2 * extent * s)), (0, 0, 0, 0))
+            draw_parts(ImageDraw.Draw(canvas), canvas.width // 2, canvas.height // 2, scale_spec(spec, s))
+            size = round(2 * extent * scale)
+            return Sprite(canvas.resize((size, size), Image.Resampling.LANCZOS), (size // 2, size // 2))
+
+        return self.sprite(('character', freeze(spec), scale), build)
+
+    def posed(self, spec, sprite, angle, zoom, scale=1):
+        """Character sprite rotated by angle degrees and zoomed about its anchor; scale is the sprite's"""
+        def build():
+            if self.vector:
+                return self._posed_vector(sprite, angle, zoom)
+            image = sprite.image.rotate(angle, Image.Resampling.BICUBIC) if angle else sprite.image
+            if zoom != 1:
+                image = image.resize((round(image.width * zoom), round(image.height * zoom)), Image.Resampling.BICUBIC)
+            return Sprite(image, (image.width / 2, image.height / 2))
+
+        return self.sprite(('character', freeze(spec), scale, angle, zoom), build)
+
+    def _posed_vector(self, sprite, angle, zoom):
+        """Vector sprite turned anticlockwise by angle degrees about its centre and zoomed, as posed() does to images"""
+        canvas = sprite.image
+        cx, cy = canvas.width / 2, canvas.height / 2
+        cos, sin = zoom * math.cos(math.radians(angle)), zoom * math.sin(math.radians(angle))
+        # Rows run downwards, so an anticlockwise turn maps (x, y) to (x cos + y sin, -x sin + y cos)
+        transform = (cos, -sin, sin, cos, zoom * cx - (cos * cx + sin * cy), zoom * cy - (-sin * cx + cos * cy))
+        width, height = round(canvas.width * zoom), round(canvas.height * zoom)
+        return Sprite(canvas.transformed(transform, width, height), (width / 2, height / 2))
+
+    def _glow_mask(self, radius, strength):
+        """Alpha that fades linearly from strength at the centre to nothing at radius"""
+        # radial_gradient reaches 255 only in the corners, i.e. 128 * sqrt(2) pixels from the centre
+        lut = [int(255 * strength * max(0.0, 1 - v * 1.4142 / 255)) for v in range(256)]
+        return Image.radial_gradient('L').point(lut).resize((2 * radius, 2 * radius), Image.Resampling.BILINEAR)
+
+    def _render(self, width, height, anchor, draw_fn, background=(0, 0, 0, 0), scale=1):
+        """Draw at the supersampled size with draw_fn(draw, scale), then downsample to an anti-aliased sprite
+        ``scale`` times the size given"""
+        if self.vector:
+            canvas = VectorCanvas(width, height)
+            draw_fn(canvas, 1)
+            return Sprite(canvas, anchor)
+        s = self.supersample * scale
+        canvas = Image.new('RGBA', (round(width * s), round(height * s)), background)
+        draw_fn(ImageDraw.Draw(canvas), s)
+        return Sprite(canvas.resize((max(1, round(width * scale)), max(1, round(height * scale))), Image.Resampling.LANCZOS),
+                      (anchor[0] * scale, anchor[1] * scale))
+
+    def _scaled(self, key, build, level, size):
+        """Sprite for key resized from level to size; the resized copy is cached too"""
+        if size == level:
+            return self.sprite(key, build)
+
+        def scale():
+            sprite = self.sprite(key, build)
+            factor = size / level
+            if self.vector:
+                canvas = sprite.image.transformed((factor, 0, 0, factor, 0, 0), level * factor, level * factor)
+                return Sprite(canvas, (sprite.anchor[0] * factor, sprite.anchor[1] * factor))
+            image = sprite.image.resize((max(1, round(sprite.image.width * factor)),
+                                         max(1, round(sprite.image.height * factor))), Image.Resampling.BILINEAR)
+            return Sprite(image, (sprite.anchor[0] * factor, sprite.anchor[1] * factor))
+
+        return self.sprite(key + (size,), scale)
+
+
+def freeze(value):
+    """Hashable form of a spec made of dicts, lists and tuples"""
+    if isinstance(value, dict):
+        return tuple(sorted((key, freeze(item)) for key, item in value.items()))
+    if isinstance(value, (list, tuple)):
+        return tuple(freeze(item) for item in value)
+    return value
+
+
+def scale_spec(value, factor):
+    """Multiply every length in a spec by factor, keeping whole numbers whole; strings and None pass through"""
+    if isinstance(value, dict):
+        return {key: scale_spec(item, factor) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return type(value)(scale_spec(item, factor) for item in value)
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, int):
+        return round(value * factor)
+    if isinstance(value, float):
+        return value * factor
+    return value
+
+_sprite_atlases = {}
+_sprite_atlas_lock = threading.Lock()
+
+
+def get_sprite_atlas(vector=False):
+    """Return the process-wide sprite atlas (or vector sprite atlas)"""
+    with _sprite_atlas_lock:
+        if vector not in _sprite_atlases:
+            _sprite_atlases[vector] = SpriteAtlas(vector=vector)
+        return _sprite_atlases[vector]
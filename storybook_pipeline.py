@@ -0,0 +1,333 @@
+import os
+import tempfile
+from PIL import Image
+from config import AUDIO_LANGUAGE, DEFAULT_PDF_PROFILE, PDF_PROFILES, PDF_THUMBNAIL_WIDTH
+from content_store import get_content_store, file_digest
+from enhanced_story_generator import EnhancedStoryGenerator
+from illustration_renderer import create_illustration_renderer, page_seed, illustration_size
+from vector_illustration import save_vector
+from professional_pdf_generator import ProfessionalPDFGenerator
+from audio_generator import AudioGenerator
+from web_exporter import WebBookExporter
+
+
+class StorybookPipeline:
+    """Runs each book stage through the content store so unchanged inputs reuse earlier outputs"""
+
+    def __init__(self, book_dir, story_gen=None, image_gen=None, pdf_gen=None, audio_gen=None, content_store=None,
+                 web_exporter=None):
+        self.book_dir = book_dir
+        self.story_gen = story_gen or EnhancedStoryGenerator()
+        self.image_gen = image_gen or create_illustration_renderer()
+        self.pdf_gen = pdf_gen or ProfessionalPDFGenerator()
+        self.audio_gen = audio_gen or AudioGenerator(book_dir)
+        self.web_exporter = web_exporter or WebBookExporter()
+        self.content_store = content_store or get_content_store()
+        # Page previews of the most recent create_pdf: title, story pages, back cover (None where one failed)
+        self.last_thumbnail_paths = []
+
+    def generate_story_text(self, prompt, seed):
+        """Story pages, character description and title for a (prompt, seed) pair.
+
+        Parts the model fails to give are filled with the generator's canned
+        text; such a story is left out of the cache so the next request asks the
+        model again.
+        """
+        inputs = {
+            'prompt': prompt,
+            'seed': seed,
+            'template_version': self.story_gen.TEMPLATE_VERSION,
+            'model': self.story_gen.MODEL_NAME
+        }
+
+        story = {}
+
+        def build():
+            # Each part is None where the model failed; such a story is returned with canned text but not cached
+            story['pages'] = self.story_gen.generate_story(prompt, seed, fallback=False)
+            if story['pages']:
+                story['character_description'] = self.story_gen.generate_character_description(
+                    ' '.join(story['pages']), prompt, fallback=False)
+                story['title'] = self.story_gen.generate_story_title(story['pages'], prompt, fallback=False)
+            if all(story.get(key) for key in ('pages', 'character_description', 'title')):
+                return dict(story)
+            return None
+
+        cached = self.content_store.get_or_create_json('story', inputs, build)
+        if cached or not story:
+            return cached
+        pages = story['pages'] or self.story_gen.fallback_story(prompt)
+        return {
+            'pages': pages,
+            'character_description': story.get('character_description') or self.story_gen.fallback_character_description(),
+            'title': story.get('title') or self.story_gen.fallback_title(prompt)
+        }
+
+    def generate_page_image(self, page_text, character_description, page_number, story_context="", seed=None, variant=0,
+                            dpi=None):
+        """Illustration for one page at dpi (see illustration_dpi), returned as (path, PIL image).
+
+        A page drawn because the model gave no image is saved in the book
+        directory instead of the cache, so the next build asks the model again.
+        """
+        inputs = {
+            'page_text': page_text,
+            'character_description': character_description,
+            'page_number': page_number,
+            'story_context': story_context,
+            'seed': seed,
+            'variant': variant,
+            'renderer': type(self.image_gen).__name__,
+            'renderer_version': getattr(self.image_gen, 'RENDERER_VERSION', 0),
+            'size': list(illustration_size(dpi))
+        }
+        rendered = {}
+
+        def build(path):
+            rendered['image'] = self.image_gen.generate_page_image(page_text, character_description, page_number, story_context,
+                                                                   page_seed(seed, page_number, variant), dpi, fallback=False)
+            if rendered['image'] is None:
+                # The model gave no picture; the page drawn in its place is kept with the book but not cached
+                rendered['image'] = self.image_gen.draw_page_image(page_text, character_description, page_number,
+                                                                   story_context, page_seed(seed, page_number, variant), dpi)
+                rendered['uncached'] = True
+                return False
+            return self.image_gen.save_image(rendered['image'], path)
+
+        path = self.content_store.get_or_create('page_image', inputs, 'png', build)
+        if not path and rendered.get('uncached'):
+            path = os.path.join(self.book_dir, f"page_{page_number}_{variant}.png")
+            if not self.image_gen.save_image(rendered['image'], path):
+                path = None
+        if not path:
+            return None, None
+        image = rendered.get('image') or self._load_image(path)
+        return path, image
+
+    def generate_page_vector(self, page_text, character_description, page_number, story_context="", seed=None, variant=0):
+        """Vector form of the page's illustration for PDFs (see save_vector), as a path.
+
+        Returns None for styles that can't draw their pages as vectors.
+        """
+        if not getattr(self.image_gen, 'VECTOR', False):
+            return None
+        inputs = {
+            'page_text': page_text,
+            'character_description': character_description,
+            'page_number': page_number,
+            'story_context': story_context,
+            'seed': seed,
+            'variant': variant,
+            'renderer': type(self.image_gen).__name__,
+            'renderer_version': getattr(self.image_gen, 'RENDERER_VERSION', 0)
+        }
+
+        def build(path):
+            canvas = self.image_gen.generate_page_vector(page_text, character_description, page_number, story_context,
+                                                         page_seed(seed, page_number, variant))
+            return canvas is not None and save_vector(canvas, path)
+
+        return self.content_store.get_or_create('page_vector', inputs, 'json', build)
+
+    def illustration_dpi(self, pdf_profile=DEFAULT_PDF_PROFILE, vector_path=None):
+        """DPI to draw a page's illustration at for a PDF profile.
+
+        Profiles that upsample images to their DPI (print) get illustrations
+        drawn at that DPI instead; the others use the default size. When the
+        PDF draws the page from its vector form (``vector_path``, see
+        generate_page_vector), the bitmap only serves previews and thumbnails,
+        so it stays at the default size too.
+        """
+        profile = PDF_PROFILES.get(pdf_profile, {})
+        if vector_path and profile.get('vector_images'):
+            return None
+        return profile['image_dpi'] if profile.get('upsample') else None
+
+    def story_context(self, prompt, character_description):
+        """Context string passed to the illustrator for every page"""
+        return f"Story: {prompt[:100]}... Character: {character_description[:100]}..."
+
+    def regenerate_page(self, book, page_number, page_text=None, rewrite_text=False, new_illustration=False):
+        """Redo one page and patch the PDF and narration from the cached parts of the others.
+
+        ``book`` is the dict kept by the app (prompt, seed, title, character_description,
+        pages, image_paths, vector_paths, variants, narration_title). Returns the updated book and the
+        page's new image, or (None, None) on failure.
+        """
+        index = page_number - 1
+        pages = list(book['pages'])
+        image_paths = list(book['image_paths'])
+        vector_paths = list(book.get('vector_paths') or [None] * len(pages))
+        variants = list(book.get('variants') or [0] * len(pages))
+
+        if rewrite_text:
+            pages[index] = self.story_gen.regenerate_page_text(pages, index, book['prompt'])
+        elif page_text is not None:
+            pages[index] = page_text.strip()
+        if new_illustration:
+            variants[index] += 1
+
+        # Only this page's illustration is rendered; the PDF and narration reuse every other cached part
+        story_context = self.story_context(book['prompt'], book['character_description'])
+        vector_paths[index] = self.generate_page_vector(pages[index], book['character_description'], page_number,
+                                                        story_context, book['seed'], variants[index])
+        image_path, image = self.generate_page_image(
+            pages[index], book['character_description'], page_number, story_context, book['seed'], variants[index],
+            self.illustration_dpi(book.get('pdf_profile', DEFAULT_PDF_PROFILE), vector_paths[index])
+        )
+        if not image_path:
+            return None, None
+        image_paths[index] = image_path
+
+        pdf_path = self.create_pdf(pages, image_paths, book['title'], book['character_description'],
+                                   book.get('pdf_profile', DEFAULT_PDF_PROFILE), vector_paths)
+        if not pdf_path:
+            return None, None
+
+        updated = dict(book, pages=pages, image_paths=image_paths, vector_paths=vector_paths, variants=variants,
+                       pdf_path=pdf_path, thumbnail_paths=self.last_thumbnail_paths)
+        updated['audio_path'] = self.generate_narration(pages, book['narration_title'])
+        return updated, image
+
+    def create_pdf(self, story_pages, image_paths, story_title, character_description, profile=DEFAULT_PDF_PROFILE,
+                   vector_paths=None):
+        """Storybook PDF for these pages, illustrations and title, built with an output profile.
+
+        The title page, each story page and the back cover are cached as separate
+        PDF fragments, so a changed page or title only lays out its own fragment
+        before the book is reassembled from the rest. Each fragment's page
+        preview is cached beside it and listed in ``last_thumbnail_paths``.
+        Pages with a vector illustration (see generate_page_vector) draw it as
+        shapes when the profile allows vector images; the others place image_paths.
+        """
+        if not PDF_PROFILES.get(profile, {}).get('vector_images'):
+            vector_paths = None
+        vector_paths = list(vector_paths or [])
+        vector_paths += [None] * (len(story_pages) - len(vector_paths))
+
+        parts = [self._pdf_fragment('title', {'title': story_title, 'character_description': character_description},
+                                    profile, lambda path, thumbnail_path: self.pdf_gen.create_title_fragment(
+                                        story_title, character_description, path, profile, thumbnail_path))]
+
+        for page_number, (page_text, image_path, vector_path) in enumerate(zip(story_pages, image_paths, vector_paths), 1):
+            parts.append(self._pdf_fragment(
+                'page',
+                {
+                    'page_text': page_text,
+                    'image': file_digest(image_path) if image_path and os.path.exists(image_path) else None,
+                    'vector': file_digest(vector_path) if vector_path and os.path.exists(vector_path) else None,
+                    'page_number': page_number
+                },
+                profile,
+                lambda path, thumbnail_path, page_text=page_text, image_path=image_path, page_number=page_number,
+                       vector_path=vector_path:
+                    self.pdf_gen.create_page_fragment(page_text, image_path, page_number, path, profile, thumbnail_path,
+                                                      vector_path)
+            ))
+
+        parts.append(self._pdf_fragment('back_cover', {'title': story_title}, profile,
+                                        lambda path, thumbnail_path: self.pdf_gen.create_back_cover_fragment(
+                                            story_title, path, profile, thumbnail_path)))
+        fragment_paths = [fragment_path for fragment_path, _ in parts]
+        if not all(fragment_paths):
+            self.last_thumbnail_paths = []
+            return None
+        self.last_thumbnail_paths = [thumbnail_path for _, thumbnail_path in parts]
+
+        inputs = {
+            # Fragment file names are the hashes of their inputs
+            'fragments': [os.path.basename(path) for path in fragment_paths],
+            'title': story_title,
+            'profile': profile,
+            'renderer': type(self.pdf_gen).__name__,
+            'renderer_version': getattr(self.pdf_gen, 'RENDERER_VERSION', 0)
+        }
+
+        def build(path):
+            return self.pdf_gen.assemble_fragments(fragment_paths, path, story_title, profile)
+
+        return self.content_store.get_or_create('pdf', inputs, 'pdf', build)
+
+    def _pdf_fragment(self, part, inputs, profile, builder):
+        """Cached PDF fragment for one part of the book and its page preview, as (pdf path, png path).
+
+        ``builder(path, thumbnail_path)`` lays the part out once and writes both files.
+        """
+        inputs = dict(inputs, part=part, profile=profile, renderer=type(self.pdf_gen).__name__,
+                      renderer_version=getattr(self.pdf_gen, 'RENDERER_VERSION', 0))
+        built = {}
+
+        def build(path):
+            # Temporary name next to the fragment's; left-over '.tmp.' files are cleared by the store
+            built['thumbnail'] = f"{os.path.splitext(path)[0]}.png"
+            return builder(path, built['thumbnail'])
+
+        def build_thumbnail(path):
+            if built.get('thumbnail') and os.path.exists(built['thumbnail']):
+                os.replace(built['thumbnail'], path)
+                return True
+            # The fragment came from the cache; lay it out again just for its preview
+            with tempfile.TemporaryDirectory(prefix="pdf_thumbnail_") as work_dir:
+                return builder(os.path.join(work_dir, "fragment.pdf"), path)
+
+        try:
+            fragment_path = self.content_store.get_or_create('pdf_fragment', inputs, 'pdf', build)
+            if not fragment_path:
+                return None, None
+            thumbnail_path = self.content_store.get_or_create('pdf_thumbnail', dict(inputs, width=PDF_THUMBNAIL_WIDTH),
+                                                              'png', build_thumbnail)
+            return fragment_path, thumbnail_path
+        finally:
+            if built.get('thumbnail') and os.path.exists(built['thumbnail']):
+                os.remove(built['thumbnail'])
+
+    def generate_narration(self, story_pages, story_title):
+        """Full narration assembled from cached per-segment audio"""
+        segment_paths = self.narration_segment_paths(story_pages, story_title)
+        if not segment_paths:
+            return None
+
+        output_path = os.path.join(self.book_dir, "story_audio.mp3")
+        return self.audio_gen.combine_audio_segments(segment_paths, output_path)
+
+    def narration_segment_paths(self, story_pages, story_title):
+        """Cached audio for the intro, each page and the outro, or None if any segment fails"""
+        segment_paths = []
+        for text in self.audio_gen.narration_segments(story_pages, story_title):
+            segment_path = self._generate_segment(text)
+            if not segment_path:
+                return None
+            segment_paths.append(segment_path)
+        return segment_paths
+
+    def export_web(self, story_pages, images, story_title, character_description, narration_title):
+        """HTML bundle (zipped) and EPUB for on-screen reading, written to the book directory.
+
+        Uses the in-memory page images and links each page's cached narration clip.
+        """
+        segment_paths = self.narration_segment_paths(story_pages, narration_title)
+        page_audio_paths = segment_paths[1:-1] if segment_paths else None
+
+        html_path = self.web_exporter.export_html(story_pages, images, self.book_dir, story_title,
+                                                  character_description, page_audio_paths)
+        epub_path = self.web_exporter.export_epub(story_pages, images, os.path.join(self.book_dir, "storybook.epub"),
+                                                  story_title, character_description, page_audio_paths)
+        return html_path, epub_path
+
+    def _generate_segment(self, text):
+        """Audio for one narration segment"""
+        inputs = {'text': text, 'language': AUDIO_LANGUAGE, 'engine': 'gtts'}
+        return self.content_store.get_or_create(
+            'audio_segment', inputs, 'mp3',
+            lambda path: self.audio_gen.generate_segment_audio(text, path)
+        )
+
+    def _load_image(self, path):
+        """Read a cached illustration fully into memory"""
+        try:
+            with Image.open(path) as image:
+                image.load()
+                return image.copy()
+        except Exception as e:
+            print(f"Error loading cached image {path}: {e}")
+            return None
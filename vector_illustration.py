@@ -0,0 +1,298 @@
+import json
+import math
+from PIL import ImageColor
+from reportlab.graphics import renderPDF
+from reportlab.graphics.shapes import Drawing, Group, Rect, Ellipse, Polygon, PolyLine, String
+from reportlab.lib.attrmap import AttrMap, AttrMapValue
+from reportlab.lib.colors import Color
+from reportlab.lib.validators import isColorOrNone, isNumber
+from reportlab.pdfbase import pdfmetrics
+from reportlab.platypus import Flowable
+from config import VECTOR_GRADIENT_BANDS
+from font_registry import get_font_registry
+
+# Points per arc when an arc is recorded as a polyline
+ARC_SEGMENTS = 16
+# Stacked discs that approximate a radial glow
+GLOW_RINGS = 8
+# Bold text is drawn with the regular face outlined this fraction of the font size, so a page's few bold
+# labels don't embed a second TrueType subset
+FAUX_BOLD_STROKE = 0.04
+
+
+class VectorCanvas:
+    """Records an illustration as shapes instead of pixels.
+
+    Takes the ImageDraw calls the styles and sprites make (rectangle,
+    rounded_rectangle, ellipse, polygon, line, arc, text, textbbox) in design
+    pixels, plus colour bands for gradients and groups for placed sprites.
+    The shapes are plain JSON (see data) and become a ReportLab drawing in the
+    PDF (see vector_drawing), so a page prints sharp at any size.
+    """
+
+    def __init__(self, width, height, background=None):
+        self.width = width
+        self.height = height
+        self.background = background
+        self.shapes = []
+        # 3x4 colour matrix applied to every colour when the data is written (the style's colour effects)
+        self.color_matrix = None
+
+    def rectangle(self, xy, fill=None, outline=None, width=1):
+        self._box_shape('rect', xy, fill, outline, width)
+
+    def rounded_rectangle(self, xy, radius=0, fill=None, outline=None, width=1):
+        self._box_shape('rect', xy, fill, outline, width, radius=radius)
+
+    def ellipse(self, xy, fill=None, outline=None, width=1):
+        self._box_shape('ellipse', xy, fill, outline, width)
+
+    def polygon(self, xy, fill=None, outline=None, width=1):
+        self.shapes.append({'shape': 'polygon', 'points': _points(xy), 'fill': _paint(fill),
+                            'outline': _paint(outline), 'width': width if outline else 0})
+
+    def line(self, xy, fill=None, width=0):
+        # ImageDraw lines are at least a pixel wide and run through the centres of the pixels they name
+        self.shapes.append({'shape': 'line', 'points': [v + 0.5 for v in _points(xy)], 'stroke': _paint(fill),
+                            'width': max(1, width)})
+
+    def arc(self, xy, start, end, fill=None, width=1):
+        """Elliptical arc, clockwise from start to end degrees as ImageDraw draws it, recorded as a polyline"""
+        x1, y1, x2, y2 = _box(xy)
+        cx, cy, rx, ry = (x1 + x2 + 1) / 2, (y1 + y2 + 1) / 2, (x2 - x1 + 1 - width) / 2, (y2 - y1 + 1 - width) / 2
+        points = []
+        for i in range(ARC_SEGMENTS + 1):
+            angle = math.radians(start + (end - start) * i / ARC_SEGMENTS)
+            points += [cx + rx * math.cos(angle), cy + ry * math.sin(angle)]
+        self.shapes.append({'shape': 'line', 'points': points, 'stroke': _paint(fill), 'width': width})
+
+    def text(self, xy, text, fill=None, font=None):
+        font_name, size, bold = _pdf_font(font)
+        self.shapes.append({'shape': 'text', 'x': xy[0], 'y': xy[1], 'text': text, 'font': font_name, 'size': size,
+                            'fill': _paint(fill), 'stroke': _paint(fill) if bold else None,
+                            'width': size * FAUX_BOLD_STROKE if bold else 0})
+
+    def textbbox(self, xy, text, font=None):
+        font_name, size, _ = _pdf_font(font)
+        return xy[0], xy[1], xy[0] + pdfmetrics.stringWidth(text, font_name, size), xy[1] + size
+
+    def bands(self, rows):
+        """Gradient from (y, left, right, colour) rows, one per pixel row, drawn as at most
+        VECTOR_GRADIENT_BANDS trapezoids"""
+        if not rows:
+            return
+        step = max(1, math.ceil(len(rows) / VECTOR_GRADIENT_BANDS))
+        for start in range(0, len(rows), step):
+            first, last = rows[start], rows[min(start + step, len(rows)) - 1]
+            # Each band reaches half a pixel into the next so viewers show no seams between them
+            bottom = last[0] + (1.5 if start + step < len(rows) else 1)
+            self.shapes.append({'shape': 'polygon', 'points': [first[1], first[0], first[2], first[0],
+                                                               last[2], bottom, last[1], bottom],
+                                'fill': _paint(rows[(start + min(start + step, len(rows)) - 1) // 2][3]),
+                                'outline': None, 'width': 0})
+
+    def glow(self, cx, cy, radius, color, strength):
+        """Soft disc fading from strength at the centre to nothing at radius"""
+        opacity = 1 - (1 - strength) ** (1 / GLOW_RINGS)
+        r, g, b = ImageColor.getrgb(color)[:3] if isinstance(color, str) else color[:3]
+        for ring in range(GLOW_RINGS):
+            ring_radius = radius * (GLOW_RINGS - ring) / GLOW_RINGS
+            self.shapes.append({'shape': 'ellipse', 'box': [cx - ring_radius, cy - ring_radius, cx + ring_radius, cy + ring_radius],
+                                'fill': ['#%02x%02x%02x' % (r, g, b), opacity], 'outline': None, 'width': 0})
+
+    def place(self, canvas, x, y, transform=(1, 0, 0, 1, 0, 0)):
+        """Draw another canvas (a sprite) with its origin at (x, y), after an optional affine transform"""
+        a, b, c, d, e, f = transform
+        self.shapes.append({'shape': 'group', 'transform': [a, b, c, d, e + x, f + y], 'shapes': canvas.shapes})
+
+    def transformed(self, transform, width, height):
+        """New canvas of width x height showing this one through an affine transform"""
+        canvas = VectorCanvas(width, height)
+        canvas.place(self, 0, 0, transform)
+        return canvas
+
+    def data(self):
+        """JSON-serialisable form: size, background and shapes, with the colour matrix applied"""
+        return {'width': self.width, 'height': self.height,
+                'background': _transform_paint(_paint(self.background), self.color_matrix),
+                'shapes': _transform_shapes(self.shapes, self.color_matrix)}
+
+    def _box_shape(self, shape, xy, fill, outline, width, radius=0):
+        width = width if outline else 0
+        self.shapes.append({'shape': shape, 'box': list(_box(xy)), 'radius': radius, 'fill': _paint(fill),
+                            'outline': _paint(outline), 'width': width})
+
+
+def save_vector(canvas, filename):
+    """Write a canvas's shapes as JSON"""
+    try:
+        with open(filename, 'w', encoding='utf-8') as f:
+            json.dump(canvas.data(), f, separators=(',', ':'))
+        return True
+    except Exception as e:
+        print(f"Error saving vector illustration {filename}: {e}")
+        return False
+
+
+def load_vector(filename):
+    """Vector data written by save_vector"""
+    with open(filename, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def vector_drawing(data, width, height):
+    """ReportLab Drawing of width x height points for vector data written by save_vector"""
+    drawing = Drawing(width, height)
+    # Design pixels run downwards from the top left; PDF points run upwards from the bottom left
+    root = Group(transform=(width / data['width'], 0, 0, -height / data['height'], 0, height))
+    if data['background']:
+        root.add(Rect(0, 0, data['width'], data['height'], strokeColor=None, **_fill(data['background'])))
+    for shape in data['shapes']:
+        root.add(_reportlab_shape(shape))
+    drawing.add(root)
+    return drawing
+
+
+class _OutlinedString(String):
+    """String that carries its own stroke, for text drawn filled and outlined (textRenderMode 2)"""
+
+    _attrMap = AttrMap(BASE=String, strokeColor=AttrMapValue(isColorOrNone), strokeWidth=AttrMapValue(isNumber),
+                       strokeOpacity=AttrMapValue(isNumber))
+
+
+class VectorImage(Flowable):
+    """Flowable that draws a vector illustration at a fixed size, centred like platypus Image.
+
+    ``filename`` is a raster copy of the same illustration, used for page
+    previews (see PageLayoutRecorder).
+    """
+
+    def __init__(self, data, width, height, filename=None):
+        Flowable.__init__(self)
+        self.drawing = vector_drawing(data, width, height)
+        self.drawWidth = width
+        self.drawHeight = height
+        self.filename = filename
+        self.hAlign = 'CENTER'
+
+    def wrap(self, availWidth, availHeight):
+        return self.drawWidth, self.drawHeight
+
+    def draw(self):
+        # Clip to the picture's box like a raster image; sprites and text may reach past the edges
+        self.canv.saveState()
+        path = self.canv.beginPath()
+        path.rect(0, 0, self.drawWidth, self.drawHeight)
+        self.canv.clipPath(path, stroke=0, fill=0)
+        renderPDF.draw(self.drawing, self.canv, 0, 0)
+        self.canv.restoreState()
+
+
+def _reportlab_shape(shape):
+    kind = shape['shape']
+    if kind == 'group':
+        group = Group(transform=tuple(shape['transform']))
+        for child in shape['shapes']:
+            group.add(_reportlab_shape(child))
+        return group
+    if kind == 'text':
+        # Text is drawn upright: flip back around its baseline
+        baseline = shape['y'] + pdfmetrics.getAscent(shape['font'], shape['size'])
+        if shape.get('stroke'):
+            string = _OutlinedString(0, 0, shape['text'], fontName=shape['font'], fontSize=shape['size'], textRenderMode=2,
+                                     strokeWidth=shape['width'], **_fill(shape['fill']), **_stroke(shape['stroke']))
+        else:
+            string = String(0, 0, shape['text'], fontName=shape['font'], fontSize=shape['size'], **_fill(shape['fill']))
+        return Group(string, transform=(1, 0, 0, -1, shape['x'], baseline))
+    if kind == 'line':
+        return PolyLine(shape['points'], strokeWidth=shape['width'], strokeLineCap=0, **_stroke(shape['stroke']))
+    if kind == 'polygon':
+        return Polygon(shape['points'], strokeWidth=shape['width'], **_fill(shape['fill']), **_stroke(shape['outline']))
+
+    # Boxes are inclusive pixel boxes with the outline drawn inside them, as ImageDraw draws it
+    x1, y1, x2, y2 = shape['box']
+    inset = shape['width'] / 2
+    x, y, w, h = x1 + inset, y1 + inset, x2 - x1 + 1 - 2 * inset, y2 - y1 + 1 - 2 * inset
+    paint = dict(strokeWidth=shape['width'], **_fill(shape['fill']), **_stroke(shape['outline']))
+    if kind == 'ellipse':
+        return Ellipse(x + w / 2, y + h / 2, w / 2, h / 2, **paint)
+    radius = max(0, shape.get('radius', 0) - inset)
+    return Rect(x, y, w, h, rx=radius, ry=radius, **paint)
+
+
+def _fill(paint):
+    if not paint:
+        return {'fillColor': None}
+    return {'fillColor': Color(*_rgb(paint[0])), 'fillOpacity': paint[1]}
+
+
+def _stroke(paint):
+    if not paint:
+        return {'strokeColor': None}
+    return {'strokeColor': Color(*_rgb(paint[0])), 'strokeOpacity': paint[1]}
+
+
+def _rgb(hex_color):
+    return tuple(int(hex_color[i:i + 2], 16) / 255 for i in (1, 3, 5))
+
+
+def _paint(color):
+    """[hex colour, opacity] for a PIL colour (name, hex, RGB or RGBA tuple), or None"""
+    if color is None:
+        return None
+    rgba = ImageColor.getrgb(color) if isinstance(color, str) else tuple(int(v) for v in color)
+    opacity = rgba[3] / 255 if len(rgba) > 3 else 1
+    return ['#%02x%02x%02x' % rgba[:3], opacity]
+
+
+def _transform_paint(paint, matrix):
+    if not paint or not matrix:
+        return paint
+    rgb = _rgb(paint[0])
+    channels = [min(255, max(0, round(sum(matrix[i * 4 + j] * rgb[j] * 255 for j in range(3)) + matrix[i * 4 + 3])))
+                for i in range(3)]
+    return ['#%02x%02x%02x' % tuple(channels), paint[1]]
+
+
+def _transform_shapes(shapes, matrix):
+    if not matrix:
+        return shapes
+    result = []
+    for shape in shapes:
+        shape = dict(shape)
+        for key in ('fill', 'outline', 'stroke'):
+            if key in shape:
+                shape[key] = _transform_paint(shape[key], matrix)
+        if shape['shape'] == 'group':
+            shape['shapes'] = _transform_shapes(shape['shapes'], matrix)
+        result.append(shape)
+    return result
+
+
+def _box(xy):
+    if len(xy) == 2:
+        (x1, y1), (x2, y2) = xy
+        return x1, y1, x2, y2
+    return tuple(xy)
+
+
+def _points(xy):
+    """Flat [x1, y1, x2, y2, ...] from either form ImageDraw accepts"""
+    if xy and isinstance(xy[0], (list, tuple)):
+        return [v for point in xy for v in point]
+    return list(xy)
+
+
+def _pdf_font(font):
+    """(ReportLab font name, size, bold) matching a PIL font; PIL's default font maps to the regular face at 10.
+
+    Bold faces map to their non-bold counterpart with bold True (see FAUX_BOLD_STROKE).
+    """
+    registry = get_font_registry()
+    fonts = registry.pdf_fonts()
+    path = getattr(font, 'path', None)
+    style = next((style for style in fonts if path and registry.font_path(style) == path), 'regular')
+    bold = style in ('bold', 'bold_italic')
+    if bold:
+        style = 'italic' if style == 'bold_italic' else 'regular'
+    return fonts[style], getattr(font, 'size', 10), bold
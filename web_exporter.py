@@ -0,0 +1,304 @@
+import os
+import io
+import time
+import uuid
+import html
+import shutil
+import zipfile
+import hashlib
+from datetime import datetime, timezone
+from PIL import Image
+from config import AUDIO_LANGUAGE, WEB_IMAGE_WIDTHS, WEB_IMAGE_QUALITY
+from image_encoding import encode_image
+
+_STYLESHEET = """
+body { margin: 0; font-family: Georgia, 'DejaVu Serif', serif; color: #2C3E50; background: #fdfcf8; line-height: 1.6; }
+main { max-width: 46rem; margin: 0 auto; padding: 1.5rem 1rem 3rem; }
+h1 { color: #2E86AB; text-align: center; font-size: clamp(1.8rem, 6vw, 2.6rem); margin: 1rem 0 0.25rem; }
+.subtitle { text-align: center; color: #666666; margin-top: 0; }
+.characters { background: #F8F9FA; border: 1px solid #E9ECEF; border-radius: 0.5rem; padding: 0.75rem 1rem; }
+.page { margin: 2.5rem 0; }
+.page-number { text-align: right; color: #7F8C8D; font-style: italic; margin: 0; }
+.page img { display: block; width: 100%; height: auto; border-radius: 0.5rem; }
+.page p.text { font-size: 1.15rem; }
+.page audio { width: 100%; }
+.the-end { text-align: center; color: #95A5A6; font-style: italic; }
+"""
+
+
+class WebBookExporter:
+    """Exports a story as a responsive HTML bundle and an EPUB, for reading on screen"""
+
+    def __init__(self, image_widths=WEB_IMAGE_WIDTHS, image_quality=WEB_IMAGE_QUALITY):
+        self.image_widths = sorted(image_widths)
+        self.image_quality = image_quality
+        self.last_export_report = None
+
+    def export_html(self, story_pages, images, output_dir, story_title, character_description="", page_audio_paths=None):
+        """Write index.html plus image and audio files, and return the path of a zip of the bundle.
+
+        ``images`` are PIL images (the ones already in memory) or paths. Each is
+        written at several widths as WebP and offered through srcset with lazy
+        loading, so phones fetch small files and only for pages they scroll to.
+        ``page_audio_paths`` optionally gives one narration clip per page.
+        """
+        started = time.perf_counter()
+        try:
+            bundle_dir = os.path.join(output_dir, "web")
+            shutil.rmtree(bundle_dir, ignore_errors=True)
+            os.makedirs(os.path.join(bundle_dir, "images"))
+
+            sections = []
+            for page_number, page_text in enumerate(story_pages, 1):
+                image = self._load(images[page_number - 1] if page_number <= len(images) else None)
+                figure = ""
+                if image is not None:
+                    variants = []
+                    for width in self._variant_widths(image):
+                        filename = f"images/page_{page_number}_{width}w.webp"
+                        self._resize(image, width).save(os.path.join(bundle_dir, filename), 'WEBP',
+                                                        quality=self.image_quality, method=2)
+                        variants.append((filename, width))
+                    height = round(image.height * variants[-1][1] / image.width)
+                    srcset = ", ".join(f"{filename} {width}w" for filename, width in variants)
+                    loading = "eager" if page_number == 1 else "lazy"
+                    figure = (f'<img src="{variants[-1][0]}" srcset="{srcset}" sizes="(max-width: 46rem) 100vw, 46rem" '
+                              f'width="{variants[-1][1]}" height="{height}" loading="{loading}" decoding="async" '
+                              f'alt="Illustration for page {page_number}">')
+
+                audio = self._copy_audio(page_audio_paths, page_number, bundle_dir)
+                if audio:
+                    audio = f'<audio controls preload="none" src="{audio}"></audio>'
+
+                sections.append(f"""
+<section class="page" id="page-{page_number}">
+<p class="page-number">Page {page_number}</p>
+{figure}
+<p class="text">{html.escape(page_text)}</p>
+{audio}
+</section>""")
+
+            characters = ""
+            if character_description:
+                characters = f'<p class="characters"><strong>Meet the Characters:</strong> {html.escape(character_description)}</p>'
+
+            document = f"""<!DOCTYPE html>
+<html lang="{AUDIO_LANGUAGE}">
+<head>
+<meta charset="utf-8">
+<meta name="viewport" content="width=device-width, initial-scale=1">
+<title>{html.escape(story_title)}</title>
+<style>{_STYLESHEET}</style>
+</head>
+<body>
+<main>
+<h1>{html.escape(story_title)}</h1>
+<p class="subtitle">A Magical Children's Story</p>
+{characters}
+{''.join(sections)}
+<p class="the-end">The End</p>
+</main>
+</body>
+</html>
+"""
+            with open(os.path.join(bundle_dir, "index.html"), 'w', encoding='utf-8') as f:
+                f.write(document)
+
+            zip_path = os.path.join(output_dir, "storybook_web.zip")
+            with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED) as bundle:
+                for dirpath, _, filenames in os.walk(bundle_dir):
+                    for filename in sorted(filenames):
+                        path = os.path.join(dirpath, filename)
+                        # Images and audio are already compressed
+                        compression = zipfile.ZIP_DEFLATED if filename.endswith(('.html', '.css')) else zipfile.ZIP_STORED
+                        bundle.write(path, os.path.relpath(path, bundle_dir), compress_type=compression)
+
+            self._report('html', zip_path, started)
+            return zip_path
+
+        except Exception as e:
+            print(f"Error exporting HTML book: {e}")
+            return None
+
+    def export_epub(self, story_pages, images, output_filename, story_title, character_description="", page_audio_paths=None):
+        """Write an EPUB 3 book with one chapter per page, returning its path"""
+        started = time.perf_counter()
+        try:
+            manifest = []
+            spine = []
+            files = {}
+
+            files['OEBPS/style.css'] = _STYLESHEET.encode('utf-8')
+            manifest.append(('css', 'style.css', 'text/css', ''))
+
+            characters = ""
+            if character_description:
+                characters = f'<p class="characters"><strong>Meet the Characters:</strong> {html.escape(character_description)}</p>'
+            files['OEBPS/title.xhtml'] = self._xhtml(story_title, f"""<h1>{html.escape(story_title)}</h1>
+<p class="subtitle">A Magical Children's Story</p>
+{characters}""")
+            manifest.append(('title', 'title.xhtml', 'application/xhtml+xml', ''))
+            spine.append('title')
+
+            for page_number, page_text in enumerate(story_pages, 1):
+                image = self._load(images[page_number - 1] if page_number <= len(images) else None)
+                figure = ""
+                if image is not None:
+                    # Readers scale images themselves; one variant at full width is enough
+                    data, media_type, extension = self._encode_for_epub(self._resize(image, self.image_widths[-1]))
+                    image_href = f"images/page_{page_number}.{extension}"
+                    files[f'OEBPS/{image_href}'] = data
+                    manifest.append((f'img{page_number}', image_href, media_type, ''))
+                    figure = f'<img src="{image_href}" alt="Illustration for page {page_number}"/>'
+
+                audio = ""
+                audio_path = self._page_audio(page_audio_paths, page_number)
+                if audio_path:
+                    audio_href = f"audio/page_{page_number}.mp3"
+                    with open(audio_path, 'rb') as f:
+                        files[f'OEBPS/{audio_href}'] = f.read()
+                    manifest.append((f'audio{page_number}', audio_href, 'audio/mpeg', ''))
+                    audio = f'<audio controls="controls" preload="none" src="{audio_href}"></audio>'
+
+                files[f'OEBPS/page_{page_number}.xhtml'] = self._xhtml(f"Page {page_number}", f"""<section class="page" id="page-{page_number}">
+<p class="page-number">Page {page_number}</p>
+{figure}
+<p class="text">{html.escape(page_text)}</p>
+{audio}
+</section>""")
+                manifest.append((f'page{page_number}', f'page_{page_number}.xhtml', 'application/xhtml+xml', ''))
+                spine.append(f'page{page_number}')
+
+            nav_items = "\n".join(f'<li><a href="page_{page_number}.xhtml">Page {page_number}</a></li>'
+                                  for page_number in range(1, len(story_pages) + 1))
+            files['OEBPS/nav.xhtml'] = self._xhtml("Contents", f"""<nav epub:type="toc" id="toc">
+<h1>Contents</h1>
+<ol>
+<li><a href="title.xhtml">{html.escape(story_title)}</a></li>
+{nav_items}
+</ol>
+</nav>""")
+            manifest.append(('nav', 'nav.xhtml', 'application/xhtml+xml', ' properties="nav"'))
+
+            files['OEBPS/content.opf'] = self._package_document(story_pages, story_title, manifest, spine)
+            files['META-INF/container.xml'] = b"""<?xml version="1.0" encoding="UTF-8"?>
+<container version="1.0" xmlns="urn:oasis:names:tc:opendocument:xmlns:container">
+<rootfiles>
+<rootfile full-path="OEBPS/content.opf" media-type="application/oebps-package+xml"/>
+</rootfiles>
+</container>
+"""
+
+            with zipfile.ZipFile(output_filename, 'w', zipfile.ZIP_DEFLATED) as epub:
+                # The mimetype entry must come first and be stored uncompressed
+                epub.writestr('mimetype', 'application/epub+zip', compress_type=zipfile.ZIP_STORED)
+                for name, data in files.items():
+                    compression = zipfile.ZIP_STORED if name.startswith(('OEBPS/images/', 'OEBPS/audio/')) else zipfile.ZIP_DEFLATED
+                    epub.writestr(name, data, compress_type=compression)
+
+            self._report('epub', output_filename, started)
+            return output_filename
+
+        except Exception as e:
+            print(f"Error exporting EPUB: {e}")
+            return None
+
+    def _package_document(self, story_pages, story_title, manifest, spine):
+        """content.opf for the EPUB"""
+        # Stable identifier, so re-exporting the same story gives the same book id
+        digest = hashlib.sha256("\n".join([story_title] + list(story_pages)).encode('utf-8')).hexdigest()
+        book_id = uuid.UUID(digest[:32])
+        modified = datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+        items = "\n".join(f'<item id="{item_id}" href="{href}" media-type="{media_type}"{properties}/>'
+                          for item_id, href, media_type, properties in manifest)
+        itemrefs = "\n".join(f'<itemref idref="{item_id}"/>' for item_id in spine)
+        return f"""<?xml version="1.0" encoding="UTF-8"?>
+<package xmlns="http://www.idpf.org/2007/opf" version="3.0" unique-identifier="book-id" xml:lang="{AUDIO_LANGUAGE}">
+<metadata xmlns:dc="http://purl.org/dc/elements/1.1/">
+<dc:identifier id="book-id">urn:uuid:{book_id}</dc:identifier>
+<dc:title>{html.escape(story_title)}</dc:title>
+<dc:language>{AUDIO_LANGUAGE}</dc:language>
+<dc:creator>AI Storybook Creator</dc:creator>
+<meta property="dcterms:modified">{modified}</meta>
+</metadata>
+<manifest>
+{items}
+</manifest>
+<spine>
+{itemrefs}
+</spine>
+</package>
+""".encode('utf-8')
+
+    def _xhtml(self, title, body):
+        return f"""<?xml version="1.0" encoding="UTF-8"?>
+<!DOCTYPE html>
+<html xmlns="http://www.w3.org/1999/xhtml" xmlns:epub="http://www.idpf.org/2007/ops" xml:lang="{AUDIO_LANGUAGE}" lang="{AUDIO_LANGUAGE}">
+<head>
+<meta charset="utf-8"/>
+<title>{html.escape(title)}</title>
+<link rel="stylesheet" type="text/css" href="style.css"/>
+</head>
+<body>
+{body}
+</body>
+</html>
+""".encode('utf-8')
+
+    def _load(self, image):
+        """Accept an in-memory PIL image or a path"""
+        if image is None or isinstance(image, Image.Image):
+            return image
+        try:
+            with Image.open(image) as loaded:
+                loaded.load()
+                return loaded.copy()
+        except Exception as e:
+            print(f"Error loading image {image} for export: {e}")
+            return None
+
+    def _variant_widths(self, image):
+        """Widths to offer in srcset, never upscaling past the source"""
+        widths = [width for width in self.image_widths if width < image.width]
+        widths.append(min(image.width, self.image_widths[-1]))
+        return sorted(set(widths))
+
+    def _resize(self, image, width):
+        if image.mode not in ('RGB', 'L'):
+            image = image.convert('RGB')
+        if width >= image.width:
+            return image
+        return image.resize((width, round(image.height * width / image.width)), Image.LANCZOS)
+
+    def _encode_for_epub(self, image):
+        """JPEG or PNG, whichever is smaller; both are core EPUB media types"""
+        jpeg = io.BytesIO()
+        image.save(jpeg, 'JPEG', quality=self.image_quality, optimize=True)
+        # Images are stored uncompressed in the EPUB zip, so the lossless candidate is a fully optimized PNG
+        png, _ = encode_image(image, 'archive')
+        if len(png) < jpeg.tell():
+            return png, 'image/png', 'png'
+        return jpeg.getvalue(), 'image/jpeg', 'jpg'
+
+    def _page_audio(self, page_audio_paths, page_number):
+        if not page_audio_paths or page_number > len(page_audio_paths):
+            return None
+        path = page_audio_paths[page_number - 1]
+        return path if path and os.path.exists(path) else None
+
+    def _copy_audio(self, page_audio_paths, page_number, bundle_dir):
+        """Copy a page's narration clip into the bundle, returning its relative URL"""
+        audio_path = self._page_audio(page_audio_paths, page_number)
+        if not audio_path:
+            return ""
+        os.makedirs(os.path.join(bundle_dir, "audio"), exist_ok=True)
+        href = f"audio/page_{page_number}.mp3"
+        shutil.copyfile(audio_path, os.path.join(bundle_dir, href))
+        return href
+
+    def _report(self, export_format, path, started):
+        self.last_export_report = {
+            'format': export_format,
+            'bytes': os.path.getsize(path),
+            'build_seconds': round(time.perf_counter() - started, 3)
+        }
@@ -1,630 +1,79 @@
-import requests
-from PIL import Image, ImageDraw, ImageFont, ImageFilter, ImageEnhance
-import io
-import base64
-import time
-import random
-import json
-from config import GEMINI_API_KEY, IMAGE_WIDTH, IMAGE_HEIGHT
+from illustration_renderer import IllustrationRenderer, GRASS_COLORS
 
-class WorkingAIImageGenerator:
-    def __init__(self):
-        self.api_key = GEMINI_API_KEY
-        
-        # Professional color palettes for children's books
-        self.color_palettes = {
-            'warm': ['#FF6B6B', '#4ECDC4', '#45B7D1', '#96CEB4', '#FFEAA7', '#DDA0DD'],
-            'cool': ['#A8E6CF', '#DCEDC8', '#FFD3B6', '#FFAAA5', '#FF8B94', '#B8E6B8'],
-            'vibrant': ['#FF6B9D', '#4ECDC4', '#45B7D1', '#96CEB4', '#FFEAA7', '#DDA0DD'],
-            'pastel': ['#FFB3BA', '#BAFFC9', '#BAE1FF', '#FFFFBA', '#FFB3F7', '#B3F7FF']
-        }
-        
-        # Try multiple AI image generation services
-        self.services = ['dalle', 'stable_diffusion', 'custom_ai']
-    
-    def generate_page_image(self, page_text, character_description, page_number, story_context=""):
-        """Generate a real AI image for a specific story page"""
-        try:
-            # Try multiple AI services in sequence
-            for service in self.services:
-                try:
-                    ai_image = self._generate_with_service(service, page_text, character_description, page_number, story_context)
-                    if ai_image:
-                        return self._enhance_image_quality(ai_image)
-                except Exception as e:
-                    print(f"Service {service} failed: {e}")
-                    continue
-            
-            # If all AI services fail, create a sophisticated hand-drawn illustration
-            return self._create_sophisticated_illustration(page_text, page_number, character_description)
-            
-        except Exception as e:
-            print(f"Error generating AI image for page {page_number}: {e}")
-            return self._create_sophisticated_illustration(page_text, page_number, character_description)
-    
-    def _generate_with_service(self, service, page_text, character_description, page_number, story_context):
-        """Generate image using a specific AI service"""
-        if service == 'dalle':
-            return self._generate_with_dalle(page_text, character_description, page_number, story_context)
-        elif service == 'stable_diffusion':
-            return self._generate_with_stable_diffusion(page_text, character_description, page_number, story_context)
-        elif service == 'custom_ai':
-            return self._generate_with_custom_ai(page_text, character_description, page_number, story_context)
-        return None
-    
-    def _generate_with_dalle(self, page_text, character_description, page_number, story_context):
-        """Generate image using DALL-E style prompts (simulated)"""
-        try:
-            # Create a sophisticated prompt
-            prompt = self._create_ai_prompt(page_text, character_description, page_number, story_context)
-            
-            # For now, we'll create a sophisticated illustration based on the prompt
-            # In a real implementation, you would call OpenAI's DALL-E API here
-            return self._create_ai_style_illustration(prompt, page_number)
-            
-        except Exception as e:
-            print(f"DALL-E generation failed: {e}")
-            return None
-    
-    def _generate_with_stable_diffusion(self, page_text, character_description, page_number, story_context):
-        """Generate image using Stable Diffusion style (simulated)"""
-        try:
-            # Create a sophisticated prompt
-            prompt = self._create_ai_prompt(page_text, character_description, page_number, story_context)
-            
-            # For now, we'll create a sophisticated illustration based on the prompt
-            # In a real implementation, you would call Stable Diffusion API here
-            return self._create_ai_style_illustration(prompt, page_number)
-            
-        except Exception as e:
-            print(f"Stable Diffusion generation failed: {e}")
-            return None
-    
-    def _generate_with_custom_ai(self, page_text, character_description, page_number, story_context):
-        """Generate image using custom AI approach"""
-        try:
-            # Create a sophisticated prompt
-            prompt = self._create_ai_prompt(page_text, character_description, page_number, story_context)
-            
-            # For now, we'll create a sophisticated illustration based on the prompt
-            # In a real implementation, you would call your preferred AI image service here
-            return self._create_ai_style_illustration(prompt, page_number)
-            
-        except Exception as e:
-            print(f"Custom AI generation failed: {e}")
-            return None
-    
-    def _create_ai_prompt(self, page_text, character_description, page_number, story_context):
-        """Create a sophisticated prompt for AI image generation"""
-        styles = [
-            "watercolor children's book illustration",
-            "digital art children's book style",
-            "hand-drawn children's book illustration",
-            "mixed media children's book art",
-            "contemporary children's book style"
-        ]
-        
-        style = styles[(page_number - 1) % len(styles)]
-        
-        prompt = f"""
-        {style} for page {page_number}:
-        Story: {page_text}
-        Character: {character_description}
-        Context: {story_context}
-        
-        Create a beautiful, detailed children's book illustration with:
-        - Main character prominently featured
-        - Rich, colorful background
-        - Magical atmosphere
-        - Professional quality suitable for publishing
-        """
-        
-        return prompt
-    
-    def _create_ai_style_illustration(self, prompt, page_number):
-        """Create a sophisticated AI-style illustration based on the prompt"""
-        try:
-            # Create high-resolution canvas
-            canvas_width = IMAGE_WIDTH * 4
-            canvas_height = IMAGE_HEIGHT * 4
-            
-            # Create sophisticated background
-            img = self._create_ai_background(canvas_width, canvas_height, page_number)
-            draw = ImageDraw.Draw(img)
-            
-            # Add AI-style elements based on the prompt
-            self._add_ai_style_elements(draw, canvas_width, canvas_height, prompt, page_number)
-            
-            # Add sophisticated character
-            self._add_sophisticated_character(draw, canvas_width, canvas_height, prompt)
-            
-            # Add environmental storytelling
-            self._add_environmental_storytelling(draw, canvas_width, canvas_height, prompt)
-            
-            # Apply AI-style post-processing
-            img = self._apply_ai_style_effects(img)
-            
-            # Resize to final dimensions
-            img = img.resize((IMAGE_WIDTH, IMAGE_HEIGHT), Image.Resampling.LANCZOS)
-            
-            return img
-            
-        except Exception as e:
-            print(f"Error creating AI-style illustration: {e}")
-            return None
-    
-    def _create_ai_background(self, width, height, page_number):
-        """Create a sophisticated AI-style background"""
-        # Create base image with complex gradients
-        img = Image.new('RGB', (width, height), color='#f0f8ff')
-        draw = ImageDraw.Draw(img)
-        
-        # Create multiple gradient layers for depth
-        self._create_complex_gradients(draw, width, height, page_number)
-        
-        # Add sophisticated texture patterns
-        self._add_ai_textures(draw, width, height)
-        
-        return img
-    
-    def _create_complex_gradients(self, draw, width, height, page_number):
-        """Create complex, AI-style gradients"""
-        # Sky gradient with multiple color stops
-        for y in range(height):
-            if y < height * 0.2:
-                # Deep sky
-                r = int(25 + (y / (height * 0.2)) * 30)
-                g = int(25 + (y / (height * 0.2)) * 50)
-                b = int(112 + (y / (height * 0.2)) * 40)
-            elif y < height * 0.5:
-                # Mid sky
-                r = int(55 + ((y - height * 0.2) / (height * 0.3)) * 60)
-                g = int(75 + ((y - height * 0.2) / (height * 0.3)) * 80)
-                b = int(152 + ((y - height * 0.2) / (height * 0.3)) * 60)
-            elif y < height * 0.8:
-                # Horizon
-                r = int(115 + ((y - height * 0.5) / (height * 0.3)) * 80)
-                g = int(155 + ((y - height * 0.5) / (height * 0.3)) * 60)
-                b = int(212 + ((y - height * 0.5) / (height * 0.3)) * 40)
-            else:
-                # Ground
-                r = int(195 + ((y - height * 0.8) / (height * 0.2)) * 60)
-                g = int(215 + ((y - height * 0.8) / (height * 0.2)) * 40)
-                b = int(252 + ((y - height * 0.8) / (height * 0.2)) * 3)
-            
-            color = (r, g, b)
-            draw.line([(0, y), (width, y)], fill=color)
-    
-    def _add_ai_textures(self, draw, width, height):
-        """Add sophisticated AI-style textures"""
-        # Add cloud formations
-        for i in range(12):
-            x = random.randint(0, width)
-            y = random.randint(0, int(height * 0.6))
-            size = random.randint(40, 120)
-            opacity = random.randint(15, 35)
-            
-            # Create realistic cloud shapes
-            self._draw_realistic_cloud(draw, x, y, size, opacity)
-        
-        # Add atmospheric effects
-        for i in range(8):
-            x = random.randint(0, width)
-            y = random.randint(0, int(height * 0.4))
-            size = random.randint(20, 60)
-            color = random.choice(self.color_palettes['pastel'])
-            
-            # Create light rays or sparkles
-            self._draw_atmospheric_effect(draw, x, y, size, color)
-    
-    def _draw_realistic_cloud(self, draw, x, y, size, opacity):
-        """Draw a realistic cloud shape"""
-        # Create multiple overlapping circles for cloud effect
-        for i in range(5):
-            offset_x = random.randint(-size//3, size//3)
-            offset_y = random.randint(-size//4, size//4)
-            cloud_size = random.randint(size//2, size)
-            
-            # Blend with existing color
-            for px in range(x + offset_x - cloud_size//2, x + offset_x + cloud_size//2):
-                for py in range(y + offset_y - cloud_size//2, y + offset_y + cloud_size//2):
-                    if 0 <= px < draw.im.width and 0 <= py < draw.im.height:
-                        if (px - (x + offset_x))**2 + (py - (y + offset_y))**2 < (cloud_size//2)**2:
-                            try:
-                                current_color = draw.getpixel((px, py))
-                                # Blend with white cloud
-                                new_color = tuple(int(c * (1 - opacity/100) + 255 * (opacity/100)) for c in current_color)
-                                draw.point((px, py), fill=new_color)
-                            except:
-                                pass
-    
-    def _draw_atmospheric_effect(self, draw, x, y, size, color):
-        """Draw atmospheric effects like light rays or sparkles"""
-        # Create star-like sparkles
-        points = []
-        for i in range(8):
-            angle = i * 45 * 3.14159 / 180
-            radius = size if i % 2 == 0 else size // 2
-            px = x + radius * (angle * 0.5)
-            py = y + radius * (angle * 0.5)
-            points.append((px, py))
-        
-        if len(points) >= 3:
-            try:
-                draw.polygon(points, fill=color, outline='#ffffff', width=1)
-            except:
-                pass
-    
-    def _add_ai_style_elements(self, draw, width, height, prompt, page_number):
-        """Add AI-style visual elements based on the prompt"""
-        # Add sophisticated border
-        border_color = '#1a4b84'
-        border_width = 15
-        
-        # Create rounded corner effect
-        corner_radius = 80
-        self._draw_rounded_corners(draw, width, height, border_color, border_width, corner_radius)
-        
-        # Add inner decorative border
-        inner_border = border_width * 2
-        draw.rectangle([inner_border, inner_border, width-inner_border, height-inner_border], 
-                      outline='#4a90e2', width=8)
-        
-        # Add sophisticated page number
-        self._add_sophisticated_page_number(draw, width, height, page_number)
-    
-    def _draw_rounded_corners(self, draw, width, height, color, border_width, radius):
-        """Draw sophisticated rounded corners"""
-        # Top-left corner
-        draw.ellipse([border_width, border_width, border_width + 2*radius, border_width + 2*radius], 
-                    fill=color, outline='#2E86AB', width=3)
-        
-        # Top-right corner
-        draw.ellipse([width - border_width - 2*radius, border_width, width - border_width, border_width + 2*radius], 
-                    fill=color, outline='#2E86AB', width=3)
-        
-        # Bottom-left corner
-        draw.ellipse([border_width, height - border_width - 2*radius, border_width + 2*radius, height - border_width], 
-                    fill=color, outline='#2E86AB', width=3)
-        
-        # Bottom-right corner
-        draw.ellipse([width - border_width - 2*radius, height - border_width - 2*radius, width - border_width, height - border_width], 
-                    fill=color, outline='#2E86AB', width=3)
-        
-        # Fill the straight edges
-        draw.rectangle([border_width + radius, border_width, width - border_width - radius, height - border_width], 
-                      fill=color)
-        draw.rectangle([border_width, border_width + radius, width - border_width, height - border_width - radius], 
-                      fill=color)
-    
-    def _add_sophisticated_page_number(self, draw, width, height, page_number):
-        """Add a sophisticated page number design"""
-        # Create elegant page number background
-        page_num_bg = (width - 180, 40, width - 40, 120)
-        
-        # Create gradient background for page number
-        for y in range(page_num_bg[1], page_num_bg[3]):
-            progress = (y - page_num_bg[1]) / (page_num_bg[3] - page_num_bg[1])
-            r = int(255 * (1 - progress) + 215 * progress)
-            g = int(215 * (1 - progress) + 165 * progress)
-            b = int(0 * (1 - progress) + 0 * progress)
-            color = (r, g, b)
-            draw.line([(page_num_bg[0], y), (page_num_bg[2], y)], fill=color)
-        
-        # Add page number text
-        page_text = f"Page {page_number}"
-        text_bbox = draw.textbbox((0, 0), page_text)
-        text_width = text_bbox[2] - text_bbox[0]
-        text_x = page_num_bg[0] + (page_num_bg[2] - page_num_bg[0] - text_width) // 2
-        text_y = page_num_bg[1] + 35
-        draw.text((text_x, text_y), page_text, fill='#8b4513')
-    
-    def _add_sophisticated_character(self, draw, width, height, prompt):
-        """Add a sophisticated character based on the prompt"""
-        # Character center position
-        char_center_x = width // 2
-        char_center_y = height * 0.4
-        char_size = 140
-        
-        # Create sophisticated character body
-        self._draw_sophisticated_character_body(draw, char_center_x, char_center_y, char_size)
-        
-        # Add character head
-        head_center = (char_center_x, char_center_y - char_size//2 - 40)
-        head_radius = 50
-        draw.ellipse([head_center[0] - head_radius, head_center[1] - head_radius,
-                     head_center[0] + head_radius, head_center[1] + head_radius], 
-                    fill='#ffdab9', outline='#daa520', width=4)
-        
-        # Add sophisticated facial features
-        self._add_sophisticated_face(draw, head_center, head_radius)
-    
-    def _draw_sophisticated_character_body(self, draw, center_x, center_y, size):
-        """Draw a sophisticated character body"""
-        # Create rounded rectangle body with gradient
-        body_rect = [center_x - size//2, center_y - size//2,
-                    center_x + size//2, center_y + size//2]
-        
-        # Create gradient fill for body
-        for y in range(body_rect[1], body_rect[3]):
-            progress = (y - body_rect[1]) / (body_rect[3] - body_rect[1])
-            r = int(255 * (1 - progress) + 182 * progress)
-            g = int(182 * (1 - progress) + 105 * progress)
-            b = int(193 * (1 - progress) + 180 * progress)
-            color = (r, g, b)
-            
-            # Draw horizontal line with rounded ends
-            line_width = size * (1 - progress * 0.3)
-            start_x = center_x - line_width//2
-            end_x = center_x + line_width//2
-            
-            # Create rounded line effect
-            for x in range(int(start_x), int(end_x)):
-                if 0 <= x < draw.im.width and 0 <= y < draw.im.height:
-                    draw.point((x, y), fill=color)
-    
-    def _add_sophisticated_face(self, draw, head_center, head_radius):
-        """Add sophisticated facial features"""
-        # Eyes with depth
-        eye_color = '#4169e1'
-        left_eye = (head_center[0] - 20, head_center[1] - 8)
-        right_eye = (head_center[0] + 20, head_center[1] - 8)
-        
-        # Eye shadows
-        draw.ellipse([left_eye[0] - 12, left_eye[1] - 12, left_eye[0] + 12, left_eye[1] + 12], 
-                    fill='#2c3e50', outline='#34495e', width=2)
-        draw.ellipse([right_eye[0] - 12, right_eye[1] - 12, right_eye[0] + 12, right_eye[1] + 12], 
-                    fill='#2c3e50', outline='#34495e', width=2)
-        
-        # Main eyes
-        draw.ellipse([left_eye[0] - 10, left_eye[1] - 10, left_eye[0] + 10, left_eye[1] + 10], 
-                    fill=eye_color, outline='#000080', width=3)
-        draw.ellipse([right_eye[0] - 10, right_eye[1] - 10, right_eye[0] + 10, right_eye[1] + 10], 
-                    fill=eye_color, outline='#000080', width=3)
-        
-        # Eye highlights
-        draw.ellipse([left_eye[0] - 3, left_eye[1] - 3, left_eye[0] + 3, left_eye[1] + 3], 
-                    fill='#ffffff', outline='#ffffff', width=1)
-        draw.ellipse([right_eye[0] - 3, right_eye[1] - 3, right_eye[0] + 3, right_eye[1] + 3], 
-                    fill='#ffffff', outline='#ffffff', width=1)
-        
-        # Sophisticated smile
-        smile_bbox = [head_center[0] - 25, head_center[1] + 8, head_center[0] + 25, head_center[1] + 28]
-        draw.arc(smile_bbox, start=0, end=180, fill='#ff69b4', width=4)
-    
-    def _add_environmental_storytelling(self, draw, width, height, prompt):
-        """Add environmental storytelling elements"""
-        # Add floating magical elements
-        for i in range(8):
-            x = random.randint(60, width - 60)
-            y = random.randint(60, int(height * 0.6))
-            size = random.randint(20, 40)
-            color = random.choice(self.color_palettes['vibrant'])
-            
-            # Create magical orbs
-            self._draw_magical_orb(draw, x, y, size, color)
-        
-        # Add ground details
-        ground_y = height * 0.75
-        for i in range(0, width, 35):
-            grass_height = random.randint(15, 35)
-            grass_color = random.choice(['#228B22', '#32CD32', '#90EE90', '#98FB98'])
-            draw.line([i, ground_y, i + random.randint(-15, 15), ground_y - grass_height], 
-                     fill=grass_color, width=3)
-    
-    def _draw_magical_orb(self, draw, x, y, size, color):
-        """Draw a magical orb with glow effect"""
-        # Outer glow
-        glow_size = size * 2
-        for i in range(glow_size):
-            opacity = int(100 * (1 - i / glow_size))
-            orb_color = tuple(int(c * opacity / 100) for c in color)
-            draw.ellipse([x - i//2, y - i//2, x + i//2, y + i//2], 
-                        fill=orb_color, outline=orb_color, width=1)
-        
-        # Main orb
-        draw.ellipse([x - size//2, y - size//2, x + size//2, y + size//2], 
-                    fill=color, outline='#ffffff', width=2)
-        
-        # Orb highlight
-        highlight_size = size // 3
-        draw.ellipse([x - highlight_size//2, y - highlight_size//2, 
-                     x + highlight_size//2, y + highlight_size//2], 
-                    fill='#ffffff', outline='#ffffff', width=1)
-    
-    def _apply_ai_style_effects(self, img):
-        """Apply AI-style post-processing effects"""
-        try:
-            # Enhance contrast for AI-style look
-            enhancer = ImageEnhance.Contrast(img)
-            img = enhancer.enhance(1.3)
-            
-            # Enhance sharpness
-            enhancer = ImageEnhance.Sharpness(img)
-            img = enhancer.enhance(1.2)
-            
-            # Enhance colors
-            enhancer = ImageEnhance.Color(img)
-            img = enhancer.enhance(1.2)
-            
-            # Add subtle blur for professional look
-            img = img.filter(ImageFilter.GaussianBlur(radius=0.3))
-            
-        except Exception as e:
-            print(f"Error applying AI-style effects: {e}")
-        
-        return img
-    
-    def _create_sophisticated_illustration(self, page_text, page_number, character_description):
-        """Create a sophisticated hand-drawn style illustration as fallback"""
-        try:
-            # Create high-resolution canvas
-            canvas_width = IMAGE_WIDTH * 3
-            canvas_height = IMAGE_HEIGHT * 3
-            
-            # Create sophisticated background
-            img = self._create_sophisticated_background(canvas_width, canvas_height, page_number)
-            draw = ImageDraw.Draw(img)
-            
-            # Add sophisticated elements
-            self._add_sophisticated_elements(draw, canvas_width, canvas_height, page_number)
-            
-            # Add story text
-            self._add_sophisticated_text(draw, page_text, canvas_width, canvas_height)
-            
-            # Add character
-            self._add_sophisticated_character(draw, canvas_width, canvas_height, "Character")
-            
-            # Apply effects
-            img = self._apply_sophisticated_effects(img)
-            
-            # Resize
-            img = img.resize((IMAGE_WIDTH, IMAGE_HEIGHT), Image.Resampling.LANCZOS)
-            
-            return img
-            
-        except Exception as e:
-            print(f"Error creating sophisticated illustration: {e}")
-            return self._create_fallback_image(page_number)
-    
-    def _create_sophisticated_background(self, width, height, page_number):
-        """Create a sophisticated background"""
-        img = Image.new('RGB', (width, height), color='#e8f4fd')
-        draw = ImageDraw.Draw(img)
-        
-        # Create sophisticated gradients
-        for y in range(height):
-            progress = y / height
-            r = int(232 + progress * 23)
-            g = int(244 + progress * 11)
-            b = int(253 + progress * 2)
-            color = (r, g, b)
-            draw.line([(0, y), (width, y)], fill=color)
-        
-        return img
-    
-    def _add_sophisticated_elements(self, draw, width, height, page_number):
-        """Add sophisticated decorative elements"""
-        # Sophisticated border
-        border_color = '#2E86AB'
-        border_width = 10
-        
-        draw.rectangle([border_width, border_width, width-border_width, height-border_width], 
-                      outline=border_color, width=border_width)
-        
-        # Inner border
-        inner_border = border_width * 2
-        draw.rectangle([inner_border, inner_border, width-inner_border, height-inner_border], 
-                      outline='#6baed6', width=5)
-        
-        # Corner decorations
-        corner_size = 50
-        corner_color = '#ffd700'
-        
-        corners = [(20, 20), (width-20-corner_size, 20), 
-                  (20, height-20-corner_size), (width-20-corner_size, height-20-corner_size)]
-        
-        for corner in corners:
-            draw.ellipse([corner[0], corner[1], corner[0] + corner_size, corner[1] + corner_size], 
-                        fill=corner_color, outline='#ff8c00', width=3)
-    
-    def _add_sophisticated_text(self, draw, page_text, width, height):
-        """Add sophisticated text"""
-        text_lines = self._wrap_text_sophisticated(page_text, 70)
-        
-        line_height = 50
-        start_y = height * 0.65
-        
-        # Text background
-        text_bg_height = len(text_lines) * line_height + 50
-        text_bg_y = start_y - 25
-        draw.rectangle([40, text_bg_y, width - 40, text_bg_y + text_bg_height], 
-                      fill='rgba(255, 255, 255, 0.95)', outline='#4a90e2', width=3)
-        
-        # Add text
-        for i, line in enumerate(text_lines):
-            y_pos = start_y + i * line_height
-            draw.text((45, y_pos), line, fill='#2c3e50')
-    
-    def _wrap_text_sophisticated(self, text, max_width):
-        """Wrap text with sophisticated line breaking"""
-        words = text.split()
-        lines = []
-        current_line = ""
-        
-        for word in words:
-            if len(current_line + " " + word) <= max_width:
-                current_line += (" " + word) if current_line else word
-            else:
-                if current_line:
-                    lines.append(current_line)
-                current_line = word
-        
-        if current_line:
-            lines.append(current_line)
-        
-        return lines
-    
-    def _apply_sophisticated_effects(self, img):
-        """Apply sophisticated post-processing effects"""
-        try:
-            enhancer = ImageEnhance.Contrast(img)
-            img = enhancer.enhance(1.1)
-            
-            enhancer = ImageEnhance.Sharpness(img)
-            img = enhancer.enhance(1.05)
-            
-        except Exception as e:
-            print(f"Error applying sophisticated effects: {e}")
-        
-        return img
-    
-    def _create_fallback_image(self, page_number):
-        """Create a sophisticated fallback image"""
-        img = Image.new('RGB', (IMAGE_WIDTH, IMAGE_HEIGHT), color='#e6f3ff')
-        draw = ImageDraw.Draw(img)
-        
-        # Sophisticated border
-        draw.rectangle([0, 0, IMAGE_WIDTH-1, IMAGE_HEIGHT-1], outline='#4a90e2', width=4)
-        
-        # Add text
-        draw.text((20, 20), f"Page {page_number}", fill='#4a90e2')
-        draw.text((20, 60), "AI Illustration", fill='#666666')
-        draw.text((20, 90), "Generation Complete", fill='#666666')
-        
-        return img
-    
-    def _enhance_image_quality(self, image):
-        """Enhance the quality of generated images"""
-        try:
-            # Resize to standard dimensions
-            image = image.resize((IMAGE_WIDTH, IMAGE_HEIGHT), Image.Resampling.LANCZOS)
-            
-            # Apply final enhancement
-            image = self._apply_ai_style_effects(image)
-            
-            return image
-            
-        except Exception as e:
-            print(f"Error enhancing image quality: {e}")
-            return image
-    
-    def save_image(self, image, filename):
-        """Save image with maximum quality"""
-        try:
-            image.save(filename, 'PNG', quality=100, optimize=False)
-            return True
-        except Exception as e:
-            print(f"Error saving image {filename}: {e}")
-            return False
-    
-    def image_to_base64(self, image):
-        """Convert image to high-quality base64"""
-        try:
-            buffer = io.BytesIO()
-            image.save(buffer, format='PNG', quality=100, optimize=False)
-            img_str = base64.b64encode(buffer.getvalue()).decode()
-            return f"data:image/png;base64,{img_str}"
-        except Exception as e:
-            print(f"Error converting image to base64: {e}")
-            return None
+
+class WorkingAIImageGenerator(IllustrationRenderer):
+    """Dusk sky with drifting clouds and pastel sparkles, a rounded frame, a gold page plate,
+    the character and glowing orbs, drawn at four times the output size"""
+
+    STYLE_NAME = 'working_ai'
+    SUPERSAMPLE = 4
+    BACKGROUND = '#f0f8ff'
+    EFFECTS = (('contrast', 1.3), ('sharpness', 1.2), ('color', 1.2), ('blur', 0.3))
+    FALLBACK_BACKGROUND = '#e6f3ff'
+    FALLBACK_BORDER = ('#4a90e2', 4)
+    FALLBACK_LINES = ("AI Illustration", "Generation Complete")
+    CHARACTER = {'size': 140, 'head_gap': 40, 'head_radius': 50, 'head_outline': 4,
+                 'face': {'eye_offset': (20, -8), 'eye_radius': 10, 'smile_box': (25, 8, 28), 'shadow_radius': 12,
+                          'highlight_radius': 3, 'eye_outline': 3, 'shadow_outline': 2, 'smile_width': 4}}
+
+    def _base_layer_key(self, page_number):
+        # The sky is the same on every page
+        return 'sky'
+
+    def _draw_base_layer(self, img, draw, width, height, page_number):
+        self.fill_rows(img, 0, 0, width, [self._sky_color(y, height) for y in range(height)])
+
+    def _draw_page(self, img, draw, width, height, page_text, character_description, page_number, story_context, rng):
+        # Clouds and sparkles
+        for _ in range(12):
+            x = rng.randint(0, width)
+            y = rng.randint(0, int(height * 0.6))
+            size = rng.randint(40, 120)
+            opacity = rng.randint(15, 35)
+            self.draw_soft_cloud(img, x, y, size, puffs=5, opacity=opacity / 100, rng=rng)
+        for _ in range(8):
+            x = rng.randint(0, width)
+            y = rng.randint(0, int(height * 0.4))
+            size = rng.randint(20, 60)
+            self.draw_star(img, x, y, size, fill=rng.choice(self.color_palettes['pastel']), outline='#ffffff')
+
+        # Rounded frame with an inner border
+        border = 15
+        draw.rounded_rectangle([border, border, width - border, height - border], radius=80, outline='#1a4b84', width=border)
+        draw.rectangle([border * 2, border * 2, width - border * 2, height - border * 2], outline='#4a90e2', width=8)
+
+        # Page number on a gold plate
+        plate = (width - 180, 40, width - 40, 120)
+        self.fill_rows(img, plate[0], plate[1], plate[2] - plate[0],
+                       [(int(255 - 40 * t), int(215 - 50 * t), 0)
+                        for t in ((y - plate[1]) / (plate[3] - plate[1]) for y in range(plate[1], plate[3]))])
+        self.draw_centered_text(draw, plate, f"Page {page_number}", 35)
+
+        # Character
+        self.draw_character(img, width // 2, height * 0.4, self.CHARACTER, page_number, character_description)
+
+        # Glowing orbs and grass
+        for _ in range(8):
+            x = rng.randint(60, width - 60)
+            y = rng.randint(60, int(height * 0.6))
+            size = rng.randint(20, 40)
+            color = rng.choice(self.color_palettes['vibrant'])
+            self.draw_orb(img, x, y, size//2, color, (size//3)//2, outline_width=2, glow_radius=size)
+        self.draw_grass(img, 0, height * 0.75, width, 35, (15, 35), 15, colors=GRASS_COLORS + ['#98FB98'], line_width=3,
+                        rng=rng)
+
+    def _sky_color(self, y, height):
+        """Deep sky, mid sky, horizon and ground bands"""
+        if y < height * 0.2:
+            t = y / (height * 0.2)
+            color = (25 + t * 30, 25 + t * 50, 112 + t * 40)
+        elif y < height * 0.5:
+            t = (y - height * 0.2) / (height * 0.3)
+            color = (55 + t * 60, 75 + t * 80, 152 + t * 60)
+        elif y < height * 0.8:
+            t = (y - height * 0.5) / (height * 0.3)
+            color = (115 + t * 80, 155 + t * 60, 212 + t * 40)
+        else:
+            t = (y - height * 0.8) / (height * 0.2)
+            color = (195 + t * 60, 215 + t * 40, 252 + t * 3)
+        return tuple(min(255, int(c)) for c in color)